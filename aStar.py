@@ -5,8 +5,13 @@
 # This file is based on the version provided in the COMP4030 course materials (aStar.py).
 # Minor adjustments were made to variable naming and formatting for improved readability and integration.
 
+import heapq
+import math
 import numpy as np
 import random
+from sim_log import get_logger
+
+logger = get_logger("astar")
 
 def makeSpecificGrid():
     grid = np.zeros((10,10),dtype=np.int16)
@@ -36,18 +41,128 @@ def makeSpecificGrid2():
     return grid
 
 
-def aStarSearch(grid):
-    heuristicGrid = np.zeros((10,10),dtype=np.int16)
-    for xx in range(10):
-        for yy in range(10):
+# Neighbour offsets (row, col, step length) for 4- and 8-connected grids
+NEIGHBOURS_4 = ((-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0))
+NEIGHBOURS_8 = NEIGHBOURS_4 + ((-1, -1, math.sqrt(2)), (-1, 1, math.sqrt(2)),
+                               (1, -1, math.sqrt(2)), (1, 1, math.sqrt(2)))
+
+
+def aStarPlan(costGrid, start, goal, connectivity=4, blocked=None):
+    """
+    Heap-based A* search over a grid of any shape.
+
+    Parameters:
+        costGrid (np.ndarray): 2D array with the cost of entering each cell (must be > 0).
+        start (tuple): (row, col) cell the path starts from.
+        goal (tuple): (row, col) cell the path should reach.
+        connectivity (int): 4 for orthogonal moves only, 8 to also allow diagonal moves.
+        blocked (np.ndarray): Optional boolean mask of cells that cannot be entered.
+
+    Returns:
+        list: (row, col) cells from start to goal inclusive, or [] if the goal is unreachable.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+    rows, cols = costGrid.shape
+    start, goal = (int(start[0]), int(start[1])), (int(goal[0]), int(goal[1]))
+    for cell in (start, goal):
+        if not (0 <= cell[0] < rows and 0 <= cell[1] < cols):
+            raise ValueError(f"cell {cell} is outside the {rows}x{cols} grid")
+
+    flatCost = np.asarray(costGrid, dtype=np.float64).ravel()
+    flatBlocked = np.zeros(rows * cols, dtype=bool) if blocked is None else np.asarray(blocked, dtype=bool).ravel()
+    if flatBlocked[start[0] * cols + start[1]] or flatBlocked[goal[0] * cols + goal[1]]:
+        return []
+    minCost = float(flatCost[~flatBlocked].min())
+    # Flat Python lists are much faster to index in the inner loop than numpy arrays
+    cost = flatCost.tolist()
+    isBlocked = flatBlocked.tolist()
+
+    # Admissible heuristic: grid distance scaled by the cheapest cell cost
+    goalRow, goalCol = goal
+    diagonal = connectivity == 8
+    def heuristic(row, col):
+        dr, dc = abs(row - goalRow), abs(col - goalCol)
+        if diagonal:
+            return minCost * (max(dr, dc) + (math.sqrt(2) - 1) * min(dr, dc))
+        return minCost * (dr + dc)
+
+    neighbours = NEIGHBOURS_8 if diagonal else NEIGHBOURS_4
+    startIdx, goalIdx = start[0] * cols + start[1], goal[0] * cols + goal[1]
+    bestCost = [math.inf] * (rows * cols)
+    bestCost[startIdx] = 0.0
+    parent = [-1] * (rows * cols)
+    closed = bytearray(rows * cols)
+    openHeap = [(heuristic(*start), 0.0, startIdx)]
+
+    while openHeap:
+        _, g, idx = heapq.heappop(openHeap)
+        if closed[idx]:
+            continue  # Stale heap entry, a cheaper route was already expanded
+        if idx == goalIdx:
+            break
+        closed[idx] = 1
+        row, col = divmod(idx, cols)
+        for dr, dc, stepLength in neighbours:
+            nr, nc = row + dr, col + dc
+            if not (0 <= nr < rows and 0 <= nc < cols):
+                continue
+            nIdx = nr * cols + nc
+            if closed[nIdx] or isBlocked[nIdx]:
+                continue
+            # Do not cut corners past blocked cells on diagonal moves
+            if dr and dc and (isBlocked[row * cols + nc] or isBlocked[nr * cols + col]):
+                continue
+            newCost = g + stepLength * cost[nIdx]
+            if newCost < bestCost[nIdx]:
+                bestCost[nIdx] = newCost
+                parent[nIdx] = idx
+                heapq.heappush(openHeap, (newCost + heuristic(nr, nc), newCost, nIdx))
+    else:
+        return []
+
+    path = []
+    idx = goalIdx
+    while idx != -1:
+        path.append(divmod(idx, cols))
+        idx = parent[idx]
+    path.reverse()
+    return path
+
+
+def dirtCostGrid(grid):
+    """Converts a dirt-count map into entry costs: dirty cells are cheaper, so paths bend towards them."""
+    return 1.0 / (1.0 + np.maximum(np.asarray(grid, dtype=np.float64), 0.0))
+
+
+def aStarSearch(grid, blocked=None):
+    """
+    Compatibility wrapper for the original planner: routes from the bottom-right cell
+    to (0, 0) over a dirt map, preferring cells that hold more dirt.
+    An optional boolean mask of blocked cells is passed on to aStarPlan.
+    """
+    rows, cols = grid.shape
+    path = aStarPlan(dirtCostGrid(grid), (rows - 1, cols - 1), (0, 0), blocked=blocked)
+    if not path:
+        logger.warning("A* found no path. Returning empty path.")
+    return path
+
+
+# Original list-sorting implementation, generalised to any grid shape.
+# Kept only as the reference point for benchmarks.py.
+def aStarSearchLegacy(grid):
+    rows, cols = grid.shape
+    heuristicGrid = np.zeros((rows,cols),dtype=np.int32)
+    for xx in range(rows):
+        for yy in range(cols):
             heuristicGrid[xx][yy] = 10*(xx + yy)
     #print(heuristicGrid)
-    bestForPosition = np.zeros((10,10),dtype=np.int16)
+    bestForPosition = np.zeros((rows,cols),dtype=np.int32)
     #visitedList = {}
     #visitedList[(9,9)] = heuristicGrid[9,9]
     currentlyActiveList = []
-    currentPosition = (9,9)
-    currentlyActiveList.append( (currentPosition,heuristicGrid[9][9]) ) # coordinates, a* value
+    currentPosition = (rows-1,cols-1)
+    currentlyActiveList.append( (currentPosition,heuristicGrid[rows-1][cols-1]) ) # coordinates, a* value
 
     ## Build bestForPosition table
     while currentlyActiveList:
@@ -82,13 +197,13 @@ def aStarSearch(grid):
         #input()
     ## construct best path
     #print(bestForPosition)
-    pathGrid = np.zeros( (10,10), dtype=np.int8) #just for illustration
+    pathGrid = np.zeros( (rows,cols), dtype=np.int8) #just for illustration
     path = []
-    currentPosition = (9,9)
-    path.append( (9,9) )
-    pathGrid[9][9] = True
+    currentPosition = (rows-1,cols-1)
+    path.append( (rows-1,cols-1) )
+    pathGrid[rows-1][cols-1] = True
 
-    MAX_PATH_STEPS = 200
+    MAX_PATH_STEPS = 2 * (rows + cols)
     step_count = 0
 
     while currentPosition != (0,0):
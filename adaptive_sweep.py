@@ -0,0 +1,306 @@
+# adaptive_sweep.py
+# Description:
+# Parameter sweeps over (strategy, num_bots, num_dirt, max_steps) grids that spend runs
+# where the results are still uncertain, instead of a fixed number per point.
+
+# Every grid point keeps running statistics of one result metric (dirt collected by
+# default). A point stops once the t confidence interval of its mean is narrower than
+# the target width (sequential stopping), or when it reaches max_runs; points whose
+# results barely vary therefore stop after min_runs. The next run always goes to the
+# point that most needs one: first every point's min_runs, then points whose strategy is
+# not yet separated from the other strategies at the same (num_bots, num_dirt,
+# max_steps), then the widest projected intervals. Runs are streamed to a process pool,
+# at most one per worker in flight, until every point has stopped or the simulation
+# budget is spent. A point's results are folded into its statistics in run-id order,
+# and runs that finish after it has stopped are left out (they are still written to the
+# CSV and cache), so without a budget or stop_when_separated the summary does not depend
+# on the number of workers or the order in which runs finish.
+
+# Run k of every strategy at the same num_bots and num_dirt uses the same seed, so the
+# strategies are compared on the same dirt layouts and spawns (common random numbers).
+# Two strategies are separated when the confidence interval of their paired
+# differences, over the run ids both have finished, excludes zero.
+
+# Usage:
+#   python adaptive_sweep.py --bots 3 6 --dirt 40 80 --target-ci 4
+#   python adaptive_sweep.py --bots 3 10 30 --steps 500 1000 --target-ci 2 --budget 2000 --workers 8
+
+import argparse
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from batch_runner import (
+    BASE_SEED, MAX_STEPS, NUM_BOTS, NUM_DIRT, SIM_LOG_LEVEL, WORLD_SIZE, derive_seed, run_single, strategies
+)
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, run_key
+from results_sink import ResultsWriter
+from results_stats import RunningStats
+from sim_log import configure_logging, get_logger
+from world import WorldConfig
+
+METRIC = "dirt_collected"
+CONFIDENCE = 0.95
+MIN_RUNS = 5             # Runs every point gets before its interval is trusted
+MAX_RUNS = 100           # Runs after which a point stops whatever its interval
+SWEEP_CSV = "results_sweep.csv"
+SUMMARY_COLUMNS = ["strategy", "num_bots", "num_dirt", "max_steps", "runs", "mean", "std", "ci_low",
+                   "ci_high", "separated", "status"]
+
+logger = get_logger("sweep")
+
+SweepPoint = namedtuple("SweepPoint", ["strategy", "num_bots", "num_dirt", "max_steps"])
+
+
+def sweep_grid(strategies, num_bots=(NUM_BOTS,), num_dirt=(NUM_DIRT,), max_steps=(MAX_STEPS,)):
+    """Every combination of the given values, strategies varying fastest."""
+    return [SweepPoint(strategy, bots, dirt, steps)
+            for bots in num_bots for dirt in num_dirt for steps in max_steps for strategy in strategies]
+
+
+def sweep_seed(point, run_id, base_seed=BASE_SEED):
+    """Seed of a point's run; the same for every strategy (and max_steps) at that num_bots and num_dirt."""
+    return derive_seed(f"sweep:{point.num_bots}:{point.num_dirt}", run_id, base_seed)
+
+
+class AdaptiveSweep:
+    def __init__(self, points, target_ci, metric=METRIC, confidence=CONFIDENCE, min_runs=MIN_RUNS,
+                 max_runs=MAX_RUNS, budget=None, stop_when_separated=False, base_seed=BASE_SEED, world=None,
+                 event_driven=False, flow_fields=False):
+        """
+        Parameters:
+            points (list): SweepPoints to run (see sweep_grid()).
+            target_ci (float): Confidence interval width, in metric units, at which a point stops.
+            metric (str): Result key whose mean is estimated.
+            confidence (float): Confidence level of the intervals and of the separation tests.
+            min_runs (int): Runs every point gets first (at least 2).
+            max_runs (int): Runs after which a point stops even if its interval is still wider.
+            budget (int): Optional limit on simulations run; results from the cache do not count.
+            stop_when_separated (bool): Also stop a point once it is separated from every other
+                strategy at its (num_bots, num_dirt, max_steps), whatever its interval width.
+            world (WorldConfig): World of every run (default: the original 10x10 world).
+            event_driven, flow_fields: As for batch_runner.run_batch().
+        """
+        if target_ci <= 0:
+            raise ValueError(f"target_ci must be positive, got {target_ci}")
+        if not 2 <= min_runs <= max_runs:
+            raise ValueError(f"need 2 <= min_runs <= max_runs, got {min_runs} and {max_runs}")
+        self.points = list(dict.fromkeys(points))
+        self.target_half = target_ci / 2
+        self.metric = metric
+        self.confidence = confidence
+        self.min_runs, self.max_runs = min_runs, max_runs
+        self.budget = budget
+        self.stop_when_separated = stop_when_separated
+        self.base_seed = base_seed
+        self.world = world
+        self.event_driven, self.flow_fields = event_driven, flow_fields
+
+        self.stats = {point: RunningStats() for point in self.points}
+        self.values = {point: {} for point in self.points}  # Point -> {run_id: metric value}
+        self.pending = dict.fromkeys(self.points, 0)  # Runs started but not yet folded in
+        self.next_run = dict.fromkeys(self.points, 0)
+        self.next_fold = dict.fromkeys(self.points, 0)
+        self.arrived = {point: {} for point in self.points}  # Point -> {run_id: result} awaiting earlier runs
+        self.groups = {}  # (num_bots, num_dirt, max_steps) -> points of every strategy there
+        for point in self.points:
+            self.groups.setdefault(point[1:], []).append(point)
+        self.separated = {point: len(self.groups[point[1:]]) == 1 for point in self.points}
+        self.simulated = self.cached = 0
+
+    def _task(self, point):
+        run_id = self.next_run[point]
+        self.next_run[point] += 1
+        return {"strategy": point.strategy, "run_id": run_id, "num_bots": point.num_bots,
+                "num_dirt": point.num_dirt, "max_steps": point.max_steps,
+                "seed": sweep_seed(point, run_id, self.base_seed), "world": self.world, "comms": None,
+                "event_driven": self.event_driven, "flow_fields": self.flow_fields}
+
+    def add(self, point, result):
+        """Folds one finished run of point into its statistics."""
+        value = float(result[self.metric])
+        self.stats[point].add(value)
+        self.values[point][result["run_id"]] = value
+        group = self.groups[point[1:]]
+        if len(group) > 1:
+            for member in group:
+                self.separated[member] = all(self._paired_separated(member, other)
+                                             for other in group if other != member)
+
+    def _receive(self, point, result):
+        # Folds in the point's results in run-id order, dropping those past its stopping point
+        arrived = self.arrived[point]
+        arrived[result["run_id"]] = result
+        while self.next_fold[point] in arrived:
+            result = arrived.pop(self.next_fold[point])
+            self.next_fold[point] += 1
+            self.pending[point] -= 1
+            if self.status(point) is None:
+                self.add(point, result)
+            else:
+                logger.debug("  %s run #%d finished after the point stopped; left out", point, result["run_id"] + 1)
+
+    def _paired_separated(self, a, b):
+        # The interval of the paired differences a - b excludes zero
+        values_a, values_b = self.values[a], self.values[b]
+        diffs = RunningStats()
+        for run_id in values_a.keys() & values_b.keys():
+            diffs.add(values_a[run_id] - values_b[run_id])
+        return diffs.count >= self.min_runs and abs(diffs.mean) > diffs.half_width(self.confidence)
+
+    def status(self, point):
+        """Why point has stopped ("ci_width", "separated" or "max_runs"), or None while it needs runs."""
+        stats = self.stats[point]
+        if stats.count < self.min_runs:
+            return None
+        if stats.half_width(self.confidence) <= self.target_half:
+            return "ci_width"
+        if self.stop_when_separated and self.separated[point]:
+            return "separated"
+        if stats.count >= self.max_runs:
+            return "max_runs"
+        return None
+
+    def _priority(self, point):
+        # Smallest first; None if point should get no more runs now. Runs in flight count as
+        # if they had finished with the same spread, so slow runs do not attract duplicates.
+        if self.status(point) is not None:
+            return None
+        planned = self.stats[point].count + self.pending[point]
+        if planned >= self.max_runs:
+            return None
+        if planned < self.min_runs:
+            return (0, planned, 0.0)
+        projected = self.stats[point].half_width(self.confidence, planned)
+        if projected <= self.target_half:
+            return None
+        return (1, self.separated[point], -projected / self.target_half)
+
+    def next_point(self):
+        """The point that should get the next run, or None if none needs one now."""
+        ranked = ((priority, i) for i, priority in enumerate(map(self._priority, self.points))
+                  if priority is not None)
+        best = min(ranked, default=None)
+        return None if best is None else self.points[best[1]]
+
+    def _budget_left(self, in_flight):
+        return self.budget is None or self.simulated + in_flight < self.budget
+
+    def run(self, workers=None, cache=None, csv_path=SWEEP_CSV, sim_log_level=SIM_LOG_LEVEL, log_sample_every=1):
+        """
+        Runs the sweep until every point has stopped or the budget is spent, and returns summary().
+        New runs are appended to csv_path (if not None) and added to the cache, if one is given.
+        """
+        workers = workers or os.cpu_count() or 1
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=configure_logging,
+                                           initargs=(sim_log_level, log_sample_every))
+        else:
+            get_logger("sim").setLevel(sim_log_level)
+        writer = ResultsWriter(csv_path) if csv_path is not None else None
+        in_flight = {}  # Future -> (point, cache key)
+        try:
+            while True:
+                while len(in_flight) < workers and self._budget_left(len(in_flight)):
+                    point = self.next_point()
+                    if point is None:
+                        break
+                    task = self._task(point)
+                    key = run_key(task) if cache is not None else None
+                    result = cache.get(key) if cache is not None else None
+                    self.pending[point] += 1
+                    if result is not None:
+                        self.cached += 1
+                        self._receive(point, dict(result, run_id=task["run_id"]))
+                    elif executor is None:
+                        self._finish(point, run_single(task), writer, cache, key)
+                    else:
+                        in_flight[executor.submit(run_single, task)] = (point, key)
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    point, key = in_flight.pop(future)
+                    self._finish(point, future.result(), writer, cache, key)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if writer is not None:
+                writer.close()
+        logger.info("Sweep finished: %d simulations, %d results from the cache", self.simulated, self.cached)
+        return self.summary()
+
+    def _finish(self, point, result, writer, cache, key):
+        self.simulated += 1
+        self._receive(point, result)
+        if writer is not None:
+            writer.add(result)
+        if cache is not None:
+            cache.put(key, result)
+        logger.debug("  %s run #%d: %s %s", point, result["run_id"] + 1, self.metric, result[self.metric])
+
+    def summary(self):
+        """One dict per point (SUMMARY_COLUMNS); status "open" for points stopped by the budget."""
+        rows = []
+        for point in self.points:
+            stats = self.stats[point]
+            half = stats.half_width(self.confidence) if stats.count > 1 else math.nan
+            rows.append(dict(point._asdict(), runs=stats.count, mean=stats.mean if stats.count else math.nan,
+                             std=stats.std if stats.count > 1 else math.nan, ci_low=stats.mean - half,
+                             ci_high=stats.mean + half, separated=self.separated[point],
+                             status=self.status(point) or "open"))
+        return rows
+
+
+def format_summary(rows, metric=METRIC):
+    lines = [f"{'strategy':>16} {'bots':>5} {'dirt':>5} {'steps':>6} {'runs':>5} {metric:>15} "
+             f"{'CI':>17} {'separated':>9} {'status':>9}"]
+    for row in rows:
+        lines.append(f"{row['strategy']:>16} {row['num_bots']:>5} {row['num_dirt']:>5} {row['max_steps']:>6} "
+                     f"{row['runs']:>5} {row['mean']:>15.2f} {row['ci_low']:>8.2f}..{row['ci_high']:<7.2f} "
+                     f"{'yes' if row['separated'] else 'no':>9} {row['status']:>9}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep a parameter grid, running each point until its mean is known.")
+    parser.add_argument("--strategies", nargs="+", default=strategies, help="strategies to compare")
+    parser.add_argument("--bots", type=int, nargs="+", default=[NUM_BOTS], help="num_bots values")
+    parser.add_argument("--dirt", type=int, nargs="+", default=[NUM_DIRT], help="num_dirt values")
+    parser.add_argument("--steps", type=int, nargs="+", default=[MAX_STEPS], help="max_steps values")
+    parser.add_argument("--metric", default=METRIC, help="result column whose mean is estimated")
+    parser.add_argument("--target-ci", type=float, required=True, help="confidence interval width to reach per point")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE, help="confidence level")
+    parser.add_argument("--min-runs", type=int, default=MIN_RUNS, help="runs every point gets first")
+    parser.add_argument("--max-runs", type=int, default=MAX_RUNS, help="runs after which a point stops")
+    parser.add_argument("--budget", type=int, default=None, help="stop after this many simulations")
+    parser.add_argument("--stop-when-separated", action="store_true",
+                        help="also stop points whose strategy is separated from the others")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=BASE_SEED, help="base seed for per-run seeds")
+    parser.add_argument("--world-size", type=int, default=WORLD_SIZE, help="world size in cells per side")
+    parser.add_argument("--event-driven", action="store_true", help="skip steps in which nothing can happen")
+    parser.add_argument("--flow-fields", action="store_true", help="plan with distance fields shared by all bots")
+    parser.add_argument("--csv", default=SWEEP_CSV, help="CSV the new runs are appended to")
+    parser.add_argument("--log-level", default="INFO", help="log level for sweep progress messages")
+    parser.add_argument("--sim-log-level", default=SIM_LOG_LEVEL, help="log level inside each simulation run")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="result cache directory")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="delete least recently used cached results above this size")
+    parser.add_argument("--no-cache", action="store_true", help="run every point, ignoring the result cache")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    grid = sweep_grid(args.strategies, args.bots, args.dirt, args.steps)
+    sweep = AdaptiveSweep(grid, args.target_ci, metric=args.metric, confidence=args.confidence,
+                          min_runs=args.min_runs, max_runs=args.max_runs, budget=args.budget,
+                          stop_when_separated=args.stop_when_separated, base_seed=args.seed,
+                          world=WorldConfig.square(args.world_size), event_driven=args.event_driven,
+                          flow_fields=args.flow_fields)
+    print(f"Sweeping {len(grid)} points to a {args.confidence:.0%} CI width of {args.target_ci}...")
+    rows = sweep.run(workers=args.workers, sim_log_level=args.sim_log_level, csv_path=args.csv,
+                     cache=None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_max_mb * 2**20)))
+    print(format_summary(rows, args.metric))
+    print(f"{sweep.simulated} simulations ({sweep.cached} results from the cache) for {len(grid)} points")
@@ -4,51 +4,295 @@
 # Course: COMP4030 Designing Intelligent Agents
 
 # Description:
-# Runs simulations for baseline, shared_map, and coordination strategies.
-# Ensures consistent experimental parameters and logs results to a CSV file.
+# Runs simulations for baseline, shared_map, coordination, and task_allocation strategies.
+# Ensures consistent experimental parameters and logs results to a CSV file
+# (plus a columnar .npz copy, see results_sink.py).
+
+# Per-strategy statistics and visit heatmaps are accumulated as runs complete
+# (see results_stats.py), so plotting never has to reload the raw rows.
+
+# Runs are fanned out over a process pool. Each run gets its own seed derived from
+# (strategy, run_id), so the results do not depend on how many workers are used.
+
+# Finished runs are kept in a content-addressed result cache (see result_cache.py).
+# Runs already in the cache are not simulated again, so re-running a sweep, or resuming
+# an interrupted one, only runs the points that are new. A cached run is still written
+# to the results (and statistics) if the CSV has no row for it, e.g. after the CSV was
+# deleted or moved aside for an old column layout.
+
+# Every strategy gets NUM_RUNS runs here; adaptive_sweep.py instead runs each point of a
+# parameter grid until its confidence interval is narrow enough.
 
 # Uses run_experiment() from multi_robot_coordination_experiment.py and visual_tools.py for plotting.
 
+import argparse
+import csv
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from multi_robot_coordination_experiment import (
     run_experiment,
+    save_visit_grids,
     STRATEGY_BASELINE,
     STRATEGY_SHARED_MAP,
-    STRATEGY_COORDINATION
+    STRATEGY_COORDINATION,
+    STRATEGY_TASK_ALLOCATION
 )
-from visual_tools import save_all_charts
+from comms import CommsConfig
+from result_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, run_key
+from results_sink import RESULT_COLUMNS, ResultsWriter, move_aside
+from profiling import PROFILERS, append_timing_csv
+from results_stats import ResultsAggregator
+from sim_log import configure_logging, get_logger
+from world import WorldConfig
 
 # Configuration Parameters
 NUM_RUNS = 10           # Number of runs per strategy
 NUM_BOTS = 3            # Number of robots in each run
 NUM_DIRT = 40           # Number of dirt patches to clean
 MAX_STEPS = 1000        # Maximum steps per simulation
+WORLD_SIZE = 10         # World is WORLD_SIZE x WORLD_SIZE cells of 100px
+BASE_SEED = 0           # Change to draw a fresh, but still reproducible, set of runs
+RESULTS_CSV = "results.csv"
+RESULTS_COLUMNAR = "results.npz"  # Columnar copy for fast loading; '.parquet' also works
+RESULTS_STATS = "results_stats.npz"  # Streaming per-strategy statistics and summed heatmaps
+TIMING_CSV = "results_timing.csv"    # Per-phase timing of instrumented runs (one row per run and phase)
+SIM_LOG_LEVEL = "WARNING"         # Simulation log level inside runs; DEBUG prints every step
+# Columns that identify a run's row in the CSV, when deciding whether a cached run is recorded
+ROW_KEY_COLUMNS = ("strategy", "run_id", "seed", "num_bots", "num_dirt", "max_steps", "world_rows", "world_cols")
+
+logger = get_logger("batch")
 
 # List of strategies to evaluate
 strategies = [
     STRATEGY_BASELINE,
     STRATEGY_SHARED_MAP,
-    STRATEGY_COORDINATION
+    STRATEGY_COORDINATION,
+    STRATEGY_TASK_ALLOCATION
 ]
 
+
+def derive_seed(strategy, run_id, base_seed=BASE_SEED):
+    """
+    Returns a 32-bit seed that depends only on (base_seed, strategy, run_id).
+    Uses a hash digest rather than hash(), which is salted per process for strings.
+    """
+    digest = hashlib.sha256(f"{base_seed}:{strategy}:{run_id}".encode()).digest()
+    return int.from_bytes(digest[:4], "little")
+
+
+def run_single(task):
+    """Worker entry point: runs one headless experiment described by a task dict."""
+    return run_experiment(
+        strategy=task["strategy"],
+        run_id=task["run_id"],
+        num_bots=task["num_bots"],
+        num_dirt=task["num_dirt"],
+        max_steps=task["max_steps"],
+        headless=True,
+        seed=task["seed"],
+        save_outputs=False,
+        world=task.get("world"),
+        trajectory_path=task.get("trajectory_path"),
+        instrument=task.get("instrument", False),
+        profiler=task.get("profiler"),
+        profile_path=task.get("profile_path"),
+        comms=task.get("comms"),
+        event_driven=task.get("event_driven", False),
+        flow_fields=task.get("flow_fields", False)
+    )
+
+
+def _recorded_rows(csv_path):
+    """ROW_KEY_COLUMNS values (as strings) of the rows already in csv_path."""
+    if csv_path is None or not os.path.exists(csv_path):
+        return set()
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        if next(reader, []) != RESULT_COLUMNS:
+            return set()  # ResultsWriter moves a file with another layout aside
+        positions = [RESULT_COLUMNS.index(column) for column in ROW_KEY_COLUMNS]
+        return {tuple(row[i] for i in positions) for row in reader}
+
+
+def _row_key(result):
+    return tuple("" if result.get(column) is None else str(result[column]) for column in ROW_KEY_COLUMNS)
+
+
+def _iter_results(tasks, workers, sim_log_level, log_sample_every):
+    # Yields results in task order, running in-process when only one worker is requested
+    if workers == 1:
+        get_logger("sim").setLevel(sim_log_level)
+        yield from map(run_single, tasks)
+        return
+    # Workers configure their own logging, so they stay silent even if forked from a verbose parent
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_logging,
+                             initargs=(sim_log_level, log_sample_every)) as executor:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        yield from executor.map(run_single, tasks, chunksize=chunksize)
+
+
+def run_batch(strategies, num_runs=NUM_RUNS, num_bots=NUM_BOTS, num_dirt=NUM_DIRT,
+              max_steps=MAX_STEPS, workers=None, base_seed=BASE_SEED,
+              csv_path=RESULTS_CSV, columnar_path=RESULTS_COLUMNAR, stats_path=RESULTS_STATS,
+              sim_log_level=SIM_LOG_LEVEL, log_sample_every=1, world=None, keep_results=True,
+              trajectory_dir=None, timing_csv=None, profiler=None, profile_dir="profiles", comms=None,
+              cache=None, event_driven=False, flow_fields=False):
+    """
+    Runs every (strategy, run_id) pair, in parallel when workers > 1.
+    All runs use the same WorldConfig (default: the original 10x10 world).
+    Results are written in task order from this process only, through a ResultsWriter,
+    and folded into the statistics at stats_path (added to any earlier batches' statistics).
+    Returns the list of result dicts from run_experiment(); with keep_results=False only
+    the last one is kept, so memory use does not grow with the number of runs.
+    With a trajectory_dir, each worker records its runs there as '<strategy>_run<id>_seed<seed>.npy'.
+    With a timing_csv, every run is instrumented and its per-phase timing appended there; with a
+    profiler ("cprofile" or "pyinstrument") every run is profiled into profile_dir.
+    With comms (a CommsConfig), the shared-map and coordination bots communicate by message
+    (see comms.py); task_allocation does not support it and is skipped.
+    event_driven=True skips the steps in which nothing can happen (see Simulation); results are
+    identical, so cached results are shared with fixed-step runs. It is ignored with comms.
+    flow_fields=True plans with distance fields shared by all bots (see flow_field.py).
+    With a cache (a ResultCache), runs found in it are returned from it without being
+    simulated, and new runs are added to it as they finish. A cached run is written to the
+    outputs and statistics only if csv_path has no row with its ROW_KEY_COLUMNS values.
+    Traced runs (trajectory, timing or profiler) always run and are not cached.
+    Statistics of the runs finished so far are saved even if the batch is interrupted.
+    """
+    if comms is not None and STRATEGY_TASK_ALLOCATION in strategies:
+        logger.warning("Skipping %s: its allocator is centralised and cannot use comms", STRATEGY_TASK_ALLOCATION)
+        strategies = [strategy for strategy in strategies if strategy != STRATEGY_TASK_ALLOCATION]
+    if comms is not None and event_driven:
+        logger.warning("Ignoring event-driven stepping: messages are exchanged every step")
+        event_driven = False
+    tasks = [
+        {"strategy": strategy, "run_id": run_id, "num_bots": num_bots, "num_dirt": num_dirt,
+         "max_steps": max_steps, "seed": derive_seed(strategy, run_id, base_seed), "world": world,
+         "comms": comms, "event_driven": event_driven, "flow_fields": flow_fields}
+        for strategy in strategies
+        for run_id in range(num_runs)
+    ]
+    if trajectory_dir is not None:
+        os.makedirs(trajectory_dir, exist_ok=True)
+        for task in tasks:
+            name = f"{task['strategy']}_run{task['run_id']}_seed{task['seed']}.npy"
+            task["trajectory_path"] = os.path.join(trajectory_dir, name)
+    if timing_csv is not None:
+        for task in tasks:
+            task["instrument"] = True
+    if profiler is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+        extension = "html" if profiler == "pyinstrument" else "prof"
+        for task in tasks:
+            task["profiler"] = profiler
+            task["profile_path"] = os.path.join(
+                profile_dir, f"{task['strategy']}_run{task['run_id']}_seed{task['seed']}.{extension}")
+    workers = workers or os.cpu_count() or 1
+
+    traced = trajectory_dir is not None or timing_csv is not None or profiler is not None
+    use_cache = cache is not None and not traced
+    keys = [run_key(task) for task in tasks] if use_cache else [None] * len(tasks)
+    cached = {}  # Task index -> cached result
+    if use_cache:
+        for i, key in enumerate(keys):
+            result = cache.get(key)
+            if result is not None:
+                cached[i] = dict(result, run_id=tasks[i]["run_id"])
+        logger.info("%d of %d runs found in the result cache", len(cached), len(tasks))
+    unrecorded = set()  # Indices of cached runs the CSV has no row for
+    if cached:
+        recorded = _recorded_rows(csv_path)
+        unrecorded = {i for i, result in cached.items() if _row_key(result) not in recorded}
+        logger.info("%d cached runs already have rows in %s; writing the other %d",
+                    len(cached) - len(unrecorded), csv_path, len(unrecorded))
+    fresh = _iter_results([task for i, task in enumerate(tasks) if i not in cached], workers,
+                          sim_log_level, log_sample_every)
+
+    results = []
+    stats = ResultsAggregator()
+    try:
+        with ResultsWriter(csv_path, columnar_path) as writer:
+            for i, key in enumerate(keys):
+                if i in cached:
+                    result = cached[i]
+                    if i in unrecorded:
+                        writer.add(result)
+                        stats.add(result)
+                else:
+                    result = next(fresh)
+                    logger.info("  %s run #%d: %d dirt", result["strategy"], result["run_id"] + 1,
+                                result["dirt_collected"])
+                    writer.add(result)
+                    stats.add(result)
+                    if timing_csv is not None:
+                        append_timing_csv(timing_csv, [result])
+                    if use_cache:
+                        cache.put(key, result)
+                if not keep_results:
+                    results.clear()
+                results.append(result)
+    finally:
+        if stats_path is not None and stats.strategies:
+            _save_stats(stats, stats_path)
+    if results:
+        # Same as the serial runner: the heatmap inputs come from the last run
+        save_visit_grids(results[-1]["visit_grids"], results[-1]["obstacle_mask"])
+    return results
+
+
+def _save_stats(stats, stats_path):
+    # Statistics accumulate across batches, like the rows appended to the CSV
+    if os.path.exists(stats_path):
+        try:
+            previous = ResultsAggregator.load(stats_path)
+            previous.merge(stats)
+            stats = previous
+        except ValueError as error:
+            legacy_path = move_aside(stats_path)
+            logger.warning("Could not add to %s (%s); moved it to %s", stats_path, error, legacy_path)
+    stats.save(stats_path)
+
+
 # Main Execution Loop
 if __name__ == "__main__":
-    # Run experiments for each strategy
-    for strategy in strategies:
-        print(f"Running strategy: {strategy}")
-        for run_id in range(NUM_RUNS):
-            print(f"  Run #{run_id + 1}...")
-            # Run a single experiment in headless mode (no GUI), opposite if headless=False
-            run_experiment(
-                strategy=strategy,
-                run_id=run_id,
-                num_bots=NUM_BOTS,
-                num_dirt=NUM_DIRT,
-                max_steps=MAX_STEPS,
-                headless=True
-            )
+    parser = argparse.ArgumentParser(description="Run batch experiments for all strategies.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=BASE_SEED, help="base seed for per-run seeds")
+    parser.add_argument("--log-level", default="INFO", help="log level for batch progress messages")
+    parser.add_argument("--sim-log-level", default=SIM_LOG_LEVEL, help="log level inside each simulation run")
+    parser.add_argument("--log-sample", type=int, default=1, help="emit only every n-th repeated DEBUG/INFO message")
+    parser.add_argument("--world-size", type=int, default=WORLD_SIZE, help="world size in cells per side")
+    parser.add_argument("--trajectory-dir", default=None, help="record every run's trajectory into this directory")
+    parser.add_argument("--timing", action="store_true", help=f"time each simulation phase, appending to {TIMING_CSV}")
+    parser.add_argument("--profile", choices=PROFILERS, default=None, help="profile every run into ./profiles")
+    parser.add_argument("--comms-latency", type=int, default=None, help="communicate by message, delivered after this many steps")
+    parser.add_argument("--comms-bandwidth", type=int, default=None, help="message entries per bot per step (implies messages)")
+    parser.add_argument("--comms-range", type=float, default=None, help="message range in pixels (implies messages)")
+    parser.add_argument("--event-driven", action="store_true", help="skip steps in which nothing can happen")
+    parser.add_argument("--flow-fields", action="store_true", help="plan with distance fields shared by all bots")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="result cache directory")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="delete least recently used cached results above this size")
+    parser.add_argument("--no-cache", action="store_true", help="run every point, ignoring the result cache")
+    args = parser.parse_args()
+    configure_logging(args.log_level, args.log_sample)
+    comms = None
+    if (args.comms_latency, args.comms_bandwidth, args.comms_range) != (None, None, None):
+        comms = CommsConfig(args.comms_latency or 1, args.comms_bandwidth, args.comms_range)
+
+    print(f"Running {len(strategies)} strategies x {NUM_RUNS} runs...")
+    # Run experiments for each strategy in headless mode (no GUI)
+    run_batch(strategies, workers=args.workers, base_seed=args.seed,
+              sim_log_level=args.sim_log_level, log_sample_every=args.log_sample,
+              world=WorldConfig.square(args.world_size), keep_results=False,
+              trajectory_dir=args.trajectory_dir, timing_csv=TIMING_CSV if args.timing else None,
+              profiler=args.profile, comms=comms, event_driven=args.event_driven,
+              flow_fields=args.flow_fields,
+              cache=None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_max_mb * 2**20)))
     # After all experiments, generate summary charts
     print("\nAll experiments complete. Generating summary plot...")
+    # Imported here so worker processes and library users never load the plotting stack
+    from visual_tools import save_all_charts
     save_all_charts()
     print("Done!")
-
-
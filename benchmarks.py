@@ -0,0 +1,845 @@
+# benchmarks.py
+# Description:
+# Performance benchmarks for the simulator components.
+# Each benchmark prints a small table and returns its measurements as a list of dicts.
+
+# The suite benchmark sweeps the hot paths over bots x dirt x world size; with --baseline
+# its throughput and peak memory are checked against a stored run, and the script exits
+# with status 1 when any configuration regressed by more than --threshold.
+
+# Usage:
+#   python benchmarks.py            # run every benchmark
+#   python benchmarks.py astar      # run a single benchmark by name
+#   python benchmarks.py suite --json bench.json                     # machine-readable results
+#   python benchmarks.py suite --save-baseline                       # store benchmark_baseline.json
+#   python benchmarks.py suite --baseline benchmark_baseline.json    # fail on >25% regressions
+
+import argparse
+import gc
+import json
+import math
+import os
+import pickle
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from adaptive_sweep import AdaptiveSweep, sweep_grid
+from aStar import aStarPlan, aStarSearch, aStarSearchLegacy, dirtCostGrid
+from comms import CommsConfig
+from multi_robot_coordination_experiment import (
+    Bot, Counter, Dirt, PICKUP_RADIUS, PROXIMITY_RADIUS, Simulation, run_experiment,
+    STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION
+)
+from dirt_grid import DirtGrid
+from profiling import PhaseTimer
+from renderer import TkRenderer
+from results_sink import ResultsWriter, load_results
+from results_stats import ResultsAggregator, t_quantile
+from sim_log import configure_logging
+from snapshot import WorldSnapshot, paired_runs
+from planner import BeliefMap, DStarLite
+from spatial_index import SpatialHash
+from swarm import Swarm
+from trajectory import Trajectory
+from world import DEFAULT_WORLD, WorldConfig
+
+# The legacy planner re-sorts its whole open list on every expansion, so it is
+# only timed on grids small enough to finish in reasonable time.
+LEGACY_MAX_SIZE = 100
+
+# Cumulative import time budget (ms) for modules loaded by every batch worker process;
+# most of it is numpy. pandas, matplotlib, seaborn and tkinter must stay lazy imports.
+IMPORT_BUDGET_MS = 250
+IMPORT_MODULES = ("multi_robot_coordination_experiment", "batch_runner", "visual_tools")
+
+# Sweep of the regression suite, and how much worse than the baseline a result may be
+SUITE_BOTS = (3, 30)
+SUITE_DIRT = (40, 400)
+SUITE_SIZES = (10, 50)
+BASELINE_FILE = "benchmark_baseline.json"
+REGRESSION_THRESHOLD = 0.25  # Fractional drop in ops/sec (or growth in peak memory) that fails the check
+SUITE_MIN_TIME = 0.1         # Seconds each timed repeat runs for, calling fast functions several times
+
+
+def _time_call(fn, repeats):
+    """Returns the best wall time (seconds) over several calls of fn()."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_astar(sizes=(10, 100, 1000), repeats=3, seed=0, legacy_max_size=LEGACY_MAX_SIZE):
+    """
+    Compares the heap-based aStarSearch against the original list-sorting planner
+    on random dirt maps of increasing size.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    print(f"{'size':>10} {'heap A* (s)':>14} {'legacy (s)':>14} {'speedup':>10}")
+    for size in sizes:
+        grid = rng.integers(0, 3, size=(size, size)).astype(np.int16)
+        new_time = _time_call(lambda: aStarSearch(grid), repeats)
+        legacy_time = None
+        if size <= legacy_max_size:
+            legacy_time = _time_call(lambda: aStarSearchLegacy(grid), repeats)
+        speedup = f"{legacy_time / new_time:.1f}x" if legacy_time else "-"
+        legacy_text = f"{legacy_time:.4f}" if legacy_time else "skipped"
+        print(f"{size:>4}x{size:<5} {new_time:>14.4f} {legacy_text:>14} {speedup:>10}")
+        rows.append({"size": size, "astar_s": new_time, "legacy_s": legacy_time})
+    return rows
+
+
+def bench_move(bot_counts=(3, 100, 1000, 5000), steps=100, seed=0):
+    """
+    Compares per-bot calls of the legacy Bot.move (the reference kinematics, no longer used
+    by Simulation) against one vectorized Swarm.step per tick.
+    """
+    random.seed(seed)
+    rows = []
+    print(f"{'bots':>6} {'legacy Bot.move (s)':>20} {'Swarm.step (s)':>16} {'speedup':>10}")
+    for count in bot_counts:
+        swarm = Swarm(count)
+        bots = [Bot(f"bot{i}", [], Counter(), swarm) for i in range(count)]
+        for i, bot in enumerate(bots):
+            bot.sl, bot.sr = ((5.0, 5.0), (-2.0, 2.0), (3.0, 1.0))[i % 3]
+
+        def per_bot():
+            for _ in range(steps):
+                for bot in bots:
+                    bot.move(None, 0.1)
+
+        def vectorized():
+            for _ in range(steps):
+                swarm.step(0.1)
+
+        loop_time = _time_call(per_bot, 1)
+        swarm_time = _time_call(vectorized, 1)
+        print(f"{count:>6} {loop_time:>20.4f} {swarm_time:>16.4f} {loop_time / swarm_time:>9.1f}x")
+        rows.append({"bots": count, "move_s": loop_time, "swarm_step_s": swarm_time})
+    return rows
+
+
+def bench_spatial(scenarios=((40, 3), (1000, 50), (10000, 500)), repeats=3, seed=0):
+    """
+    Times one tick of the 20px pickup test and the 100px proximity test for every bot,
+    using linear scans versus SpatialHash radius queries.
+    """
+    rng = random.Random(seed)
+    rows = []
+    print(f"{'dirt':>6} {'bots':>5} {'linear (s/tick)':>16} {'indexed (s/tick)':>17} {'speedup':>10}")
+    for num_dirt, num_bots in scenarios:
+        dirt_list = [Dirt(rng.randint(50, 950), rng.randint(50, 950), f"dirt{i}") for i in range(num_dirt)]
+        bots = [(rng.uniform(100, 700), rng.uniform(100, 700), i) for i in range(num_bots)]
+        dirt_index, bot_index = SpatialHash(PICKUP_RADIUS), SpatialHash(PROXIMITY_RADIUS)
+        for dirt in dirt_list:
+            dirt_index.insert(dirt, dirt.centreX, dirt.centreY)
+        for bot in bots:
+            bot_index.insert(bot, bot[0], bot[1])
+
+        def linear_tick():
+            for bot in bots:
+                x, y, _ = bot
+                next((d for d in dirt_list if math.hypot(x - d.centreX, y - d.centreY) < PICKUP_RADIUS), None)
+                next((o for o in bots if o is not bot and math.hypot(x - o[0], y - o[1]) < PROXIMITY_RADIUS), None)
+
+        def indexed_tick():
+            for bot in bots:
+                x, y, _ = bot
+                dirt_index.first_within(x, y, PICKUP_RADIUS)
+                bot_index.first_within(x, y, PROXIMITY_RADIUS, exclude=bot)
+
+        linear_time = _time_call(linear_tick, repeats)
+        indexed_time = _time_call(indexed_tick, repeats)
+        print(f"{num_dirt:>6} {num_bots:>5} {linear_time:>16.5f} {indexed_time:>17.5f} {linear_time / indexed_time:>9.1f}x")
+        rows.append({"dirt": num_dirt, "bots": num_bots, "linear_s": linear_time, "indexed_s": indexed_time})
+    return rows
+
+
+def bench_dirt_map(dirt_counts=(40, 1000, 10000), num_bots=3, repeats=5, seed=0):
+    """
+    Builds every bot's shared dirt map by rescanning all dirt objects and OR-ing the
+    counts, versus reading views of the world-owned DirtGrid and count-merging them.
+    """
+    rng = random.Random(seed)
+    rows = []
+    print(f"{'dirt':>6} {'rescan (s)':>12} {'grid view (s)':>14} {'speedup':>10}")
+    for num_dirt in dirt_counts:
+        dirt_list = [Dirt(rng.randint(50, 950), rng.randint(50, 950), f"dirt{i}") for i in range(num_dirt)]
+        dirt_grid = DirtGrid(10, 10, 100)
+        for dirt in dirt_list:
+            dirt_grid.add(dirt.centreX, dirt.centreY)
+        scanning = [Bot(f"bot{i}", dirt_list, Counter()) for i in range(num_bots)]
+        viewing = [Bot(f"bot{i}", dirt_list, Counter(), dirt_grid=dirt_grid) for i in range(num_bots)]
+
+        def rescan():
+            shared = np.zeros((10, 10), dtype=np.int16)
+            for bot in scanning:
+                shared |= bot.scan_dirt_map()
+
+        def grid_view():
+            shared = BeliefMap(np.zeros((10, 10), dtype=np.int16))
+            for bot in viewing:
+                shared.merge(bot.scan_dirt_map())
+
+        rescan_time = _time_call(rescan, repeats)
+        view_time = _time_call(grid_view, repeats)
+        print(f"{num_dirt:>6} {rescan_time:>12.5f} {view_time:>14.5f} {rescan_time / view_time:>9.1f}x")
+        rows.append({"dirt": num_dirt, "rescan_s": rescan_time, "grid_view_s": view_time})
+    return rows
+
+
+def bench_trajectory(bot_counts=(3, 100), max_steps=1000, repeats=5, seed=0):
+    """
+    Step time with and without trajectory recording (target: under ~5% overhead), plus
+    the cost of saving the run and rebuilding its heatmaps from the memory-mapped file.
+    """
+    rows = []
+    print(f"{'bots':>5} {'plain (s)':>10} {'recorded (s)':>13} {'overhead':>9} {'save (s)':>9} {'replay heatmap (s)':>19}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for num_bots in bot_counts:
+            def run(record):
+                sim = Simulation(STRATEGY_COORDINATION, 0, num_bots, 40, max_steps, seed, stop_conditions=(),
+                                 record=record)
+                sim.run()
+                return sim
+
+            # Alternate the two so drift in machine load affects both equally
+            plain_time = recorded_time = float("inf")
+            for _ in range(repeats):
+                plain_time = min(plain_time, _time_call(lambda: run(False), 1))
+                recorded_time = min(recorded_time, _time_call(lambda: run(True), 1))
+            sim = run(True)
+            path = f"{tmp}/bots{num_bots}.npy"
+            save_time = _time_call(lambda: sim.save_trajectory(path), 1)
+            replay_time = _time_call(lambda: Trajectory(path).visit_grids(), repeats)
+            overhead = recorded_time / plain_time - 1
+            print(f"{num_bots:>5} {plain_time:>10.4f} {recorded_time:>13.4f} {overhead:>8.1%} {save_time:>9.4f} "
+                  f"{replay_time:>19.4f}")
+            rows.append({"bots": num_bots, "plain_s": plain_time, "recorded_s": recorded_time,
+                         "overhead": overhead, "save_s": save_time, "replay_heatmap_s": replay_time})
+    return rows
+
+
+def bench_logging(num_bots=3, num_dirt=40, max_steps=1000, repeats=3, seed=0):
+    """
+    Headless steps/sec with per-step DEBUG output (the old print behaviour, written
+    to a file so the terminal is not flooded) versus the silent default.
+    """
+    def steps_per_sec():
+        best = 0.0
+        for _ in range(repeats):
+            result = run_experiment(STRATEGY_COORDINATION, 0, num_bots=num_bots, num_dirt=num_dirt,
+                                    max_steps=max_steps, headless=True, seed=seed, save_outputs=False)
+            best = max(best, result["steps_per_sec"])
+        return best
+
+    with tempfile.TemporaryFile("w") as sink:
+        configure_logging("DEBUG", stream=sink)
+        verbose = steps_per_sec()
+    configure_logging("WARNING")
+    silent = steps_per_sec()
+    print(f"{num_bots} bots / {num_dirt} dirt / {max_steps} steps")
+    print(f"{'per-step logging':>18}: {verbose:>10.0f} steps/s")
+    print(f"{'silent (default)':>18}: {silent:>10.0f} steps/s  ({silent / verbose:.1f}x)")
+    return [{"mode": "debug", "steps_per_sec": verbose}, {"mode": "silent", "steps_per_sec": silent}]
+
+
+def bench_replan(sizes=(10, 50, 100, 200), updates=20, seed=0):
+    """
+    Cost of replanning while the bot advances one cell per update and one dirt cell
+    is cleaned: a fresh A* search each time versus repairing a D* Lite search.
+    'anywhere' cleans a random dirty cell (other bots working elsewhere); 'on path'
+    cleans a cell on the current route, the worst case for the repair.
+    """
+    rows = []
+    print(f"{'size':>10} {'cleaned':>9} {'A* replan (ms)':>16} {'D* Lite (ms)':>14} {'speedup':>10}")
+    for size in sizes:
+        for on_path in (False, True):
+            rng = np.random.default_rng(seed)
+            dirt = rng.integers(0, 3, size=(size, size))
+            start, goal = (size - 1, size - 1), (0, 0)
+            search = DStarLite(dirtCostGrid(dirt), start, goal)
+            path = search.plan(start)
+            astar_total = dstar_total = 0.0
+            for _ in range(updates):
+                if on_path:
+                    cell = path[len(path) // 2]
+                else:
+                    dirty = np.argwhere(dirt > 0)
+                    cell = tuple(int(v) for v in dirty[rng.integers(len(dirty))])
+                dirt[cell] = 0
+                start = path[1] if len(path) > 1 else start
+
+                begin = time.perf_counter()
+                aStarPlan(dirtCostGrid(dirt), start, goal)
+                astar_total += time.perf_counter() - begin
+
+                begin = time.perf_counter()
+                search.update_cell(cell, 1.0)
+                path = search.plan(start)
+                dstar_total += time.perf_counter() - begin
+            astar_ms, dstar_ms = 1000 * astar_total / updates, 1000 * dstar_total / updates
+            label = "on path" if on_path else "anywhere"
+            print(f"{size:>4}x{size:<5} {label:>9} {astar_ms:>16.3f} {dstar_ms:>14.3f} {astar_ms / dstar_ms:>9.1f}x")
+            rows.append({"size": size, "cleaned": label, "astar_ms": astar_ms, "dstar_lite_ms": dstar_ms})
+    return rows
+
+
+def bench_strategies(num_runs=10, num_bots=3, num_dirt=40, max_steps=3000, seed=0):
+    """
+    Throughput (dirt collected per simulation step) of every strategy over the same seeds.
+    """
+    rows = []
+    print(f"{'strategy':>16} {'avg dirt':>9} {'dirt/step':>10} {'steps/s':>9}")
+    for strategy in (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION):
+        dirt = steps = elapsed = 0
+        for run_id in range(num_runs):
+            result = run_experiment(strategy, run_id, num_bots=num_bots, num_dirt=num_dirt, max_steps=max_steps,
+                                    headless=True, seed=seed + run_id, save_outputs=False)
+            dirt += result["dirt_collected"]
+            steps += result["steps"]
+            elapsed += result["elapsed_time"]
+        print(f"{strategy:>16} {dirt / num_runs:>9.1f} {dirt / steps:>10.4f} {steps / elapsed:>9.0f}")
+        rows.append({"strategy": strategy, "avg_dirt": dirt / num_runs, "dirt_per_step": dirt / steps})
+    return rows
+
+
+def bench_world_size(sizes=(10, 50, 100, 200, 500), num_runs=2, num_bots=3, dirt_per_cell=0.4,
+                     max_steps=300, seed=0):
+    """
+    How each strategy scales with the world size: steps per second and dirt per step on
+    square worlds of 100px cells, with dirt density (not count) held constant.
+    """
+    rows = []
+    print(f"{'world':>9} {'strategy':>16} {'dirt':>7} {'dirt/step':>10} {'steps/s':>9}")
+    for size in sizes:
+        world = WorldConfig.square(size)
+        num_dirt = max(1, int(dirt_per_cell * size * size))
+        for strategy in (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION):
+            dirt = steps = elapsed = 0
+            for run_id in range(num_runs):
+                result = run_experiment(strategy, run_id, num_bots=num_bots, num_dirt=num_dirt, max_steps=max_steps,
+                                        headless=True, seed=seed + run_id, save_outputs=False, world=world)
+                dirt += result["dirt_collected"]
+                steps += result["steps"]
+                elapsed += result["elapsed_time"]
+            print(f"{size:>4}x{size:<4} {strategy:>16} {num_dirt:>7} {dirt / steps:>10.4f} {steps / elapsed:>9.0f}")
+            rows.append({"size": size, "strategy": strategy, "num_dirt": num_dirt,
+                         "dirt_per_step": dirt / steps, "steps_per_sec": steps / elapsed})
+    return rows
+
+
+def bench_phases(sizes=(10, 50, 200), num_bots=3, dirt_per_cell=0.4, max_steps=300, seed=0,
+                 phases=("setup", "think", "plan", "proximity", "move", "index", "pickup")):
+    """
+    Share of step time spent in each simulation phase per strategy and world size, from
+    the PhaseTimer instrumentation, to show which subsystem grows as worlds get larger.
+    """
+    rows = []
+    print(f"{'world':>9} {'strategy':>16} {'steps/s':>8} {'p99 (us)':>9} " + " ".join(f"{p:>9}" for p in phases))
+    for size in sizes:
+        world = WorldConfig.square(size)
+        num_dirt = max(1, int(dirt_per_cell * size * size))
+        for strategy in (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION):
+            timer = PhaseTimer(max_steps)
+            Simulation(strategy, 0, num_bots, num_dirt, max_steps, seed, stop_conditions=(), world=world,
+                       timer=timer).run()
+            report = timer.report()
+            shares = [report["phases"].get(phase, {}).get("share", 0.0) for phase in phases]
+            print(f"{size:>4}x{size:<4} {strategy:>16} {report['steps_per_sec']:>8.0f} {report['step_us_p99']:>9.0f} "
+                  + " ".join(f"{share:>9.1%}" for share in shares))
+            rows.append({"size": size, "strategy": strategy, **report})
+    return rows
+
+
+def bench_comms(latencies=(1, 10, 50), bandwidths=(None, 2), ranges=(None, 300), num_runs=3, num_bots=3,
+                num_dirt=40, max_steps=1500, seed=0):
+    """
+    Throughput of the communicating strategies under message latency (steps), bandwidth
+    (entries per bot per step) and range (px) limits, against their in-memory shared state.
+    """
+    settings = [None] + [CommsConfig(latency, bandwidth, comms_range)
+                         for latency in latencies for bandwidth in bandwidths for comms_range in ranges]
+    rows = []
+    print(f"{'strategy':>14} {'latency':>8} {'bandwidth':>10} {'range':>6} {'dirt/step':>10} {'steps/s':>8} {'msgs/step':>10}")
+    for strategy in (STRATEGY_SHARED_MAP, STRATEGY_COORDINATION):
+        for comms in settings:
+            dirt = steps = elapsed = messages = 0
+            for run_id in range(num_runs):
+                result = run_experiment(strategy, run_id, num_bots=num_bots, num_dirt=num_dirt, max_steps=max_steps,
+                                        headless=True, seed=seed + run_id, save_outputs=False, comms=comms)
+                dirt += result["dirt_collected"]
+                steps += result["steps"]
+                elapsed += result["elapsed_time"]
+                messages += result.get("comms", {}).get("messages", 0)
+            label = ("shared", "-", "-") if comms is None else \
+                (comms.latency, comms.bandwidth or "inf", comms.range or "inf")
+            print(f"{strategy:>14} {label[0]:>8} {label[1]:>10} {label[2]:>6} {dirt / steps:>10.4f} "
+                  f"{steps / elapsed:>8.0f} {messages / steps:>10.2f}")
+            rows.append({"strategy": strategy, "latency": None if comms is None else comms.latency,
+                         "bandwidth": None if comms is None else comms.bandwidth,
+                         "range": None if comms is None else comms.range,
+                         "dirt_per_step": dirt / steps, "steps_per_sec": steps / elapsed})
+    return rows
+
+
+def bench_event(bot_counts=(3, 10), world_sizes=(10, 30), num_runs=3, num_dirt=40, max_steps=1500, seed=0):
+    """
+    Fixed versus event-driven stepping: steps/sec, and steps advanced per step() call. Also
+    checks that both give the same steps, dirt collected and visit grids in every run.
+    """
+    strategies = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION)
+    rows = []
+    print(f"{'strategy':>16} {'bots':>5} {'world':>6} {'fixed steps/s':>14} {'event steps/s':>14} "
+          f"{'speedup':>8} {'steps/call':>11} {'same':>5}")
+    for size in world_sizes:
+        world = WorldConfig.square(size)
+        for num_bots in bot_counts:
+            for strategy in strategies:
+                elapsed = {False: 0.0, True: 0.0}
+                steps = calls = 0
+                same = True
+                for run_id in range(num_runs):
+                    results = {}
+                    for event_driven in (False, True):
+                        timer = PhaseTimer(max_steps)
+                        sim = Simulation(strategy, run_id, num_bots, num_dirt, max_steps, seed + run_id,
+                                         world=world, timer=timer, event_driven=event_driven)
+                        start = time.perf_counter()
+                        results[event_driven] = sim.run()
+                        elapsed[event_driven] += time.perf_counter() - start
+                    fixed, event = results[False], results[True]
+                    steps += event["steps"]
+                    calls += timer.steps
+                    same = same and all(fixed[key] == event[key] for key in ("steps", "dirt_collected", "per_bot_dirt")) \
+                        and all(np.array_equal(a, b) for a, b in zip(fixed["visit_grids"], event["visit_grids"]))
+                fixed_rate, event_rate = steps / elapsed[False], steps / elapsed[True]
+                print(f"{strategy:>16} {num_bots:>5} {size:>6} {fixed_rate:>14.0f} {event_rate:>14.0f} "
+                      f"{event_rate / fixed_rate:>7.2f}x {steps / calls:>11.1f} {'yes' if same else 'NO':>5}")
+                rows.append({"strategy": strategy, "num_bots": num_bots, "world_size": size,
+                             "fixed_steps_per_sec": fixed_rate, "event_steps_per_sec": event_rate,
+                             "steps_per_call": steps / calls, "same_outcome": same})
+    return rows
+
+
+def bench_fields(bot_counts=(3, 30, 300, 1000), size=50, num_dirt=400, max_steps=50, dstar_max_bots=300, seed=0):
+    """
+    Planning cost of shared-map bots as the swarm grows: one D* Lite search (plus an A*
+    sweep at setup) per bot, against distance fields shared by all bots (flow_field.py).
+    Setup is dominated by the initial sweep plans. D* Lite is skipped above dstar_max_bots.
+    """
+    world = WorldConfig.square(size)
+    rows = []
+    print(f"{'bots':>6} {'planner':>8} {'setup (s)':>10} {'plan (s)':>9} {'replans':>8} {'us/replan':>10} "
+          f"{'fields':>7}")
+    for num_bots in bot_counts:
+        for flow_fields in (False, True):
+            if not flow_fields and num_bots > dstar_max_bots:
+                continue
+            timer = PhaseTimer(max_steps)
+            sim = Simulation(STRATEGY_SHARED_MAP, 0, num_bots, num_dirt, max_steps, seed, stop_conditions=(),
+                             world=world, timer=timer, flow_fields=flow_fields)
+            result = sim.run()
+            phases = timer.report()["phases"]
+            setup_s = phases["setup"]["total_s"]
+            plan = phases.get("plan", {"total_s": 0.0, "calls": 0})
+            fields = result["fields"]["misses"] if flow_fields else "-"
+            label = "fields" if flow_fields else "dstar"
+            per_replan = plan["total_s"] * 1e6 / max(plan["calls"], 1)
+            print(f"{num_bots:>6} {label:>8} {setup_s:>10.3f} {plan['total_s']:>9.3f} {plan['calls']:>8} "
+                  f"{per_replan:>10.1f} {fields:>7}")
+            rows.append({"num_bots": num_bots, "planner": label, "setup_s": setup_s, "plan_s": plan["total_s"],
+                         "replans": plan["calls"], "us_per_replan": per_replan})
+    return rows
+
+
+def bench_snapshot(configs=((3, 10), (30, 50), (300, 100)), num_pairs=20, num_dirt=40, max_steps=1000, seed=0):
+    """
+    Setup cost of a fresh Simulation against taking a snapshot and forking it, and the
+    spread of the shared_map - baseline difference in dirt collected between independently
+    seeded runs and paired forks of one starting state (snapshot.py).
+    """
+    rows = []
+    print(f"{'bots':>6} {'world':>6} {'fresh (ms)':>11} {'snapshot (ms)':>14} {'fork (ms)':>10} {'pickled KB':>11}")
+    for num_bots, size in configs:
+        world = WorldConfig.square(size)
+        start = time.perf_counter()
+        sim = Simulation(STRATEGY_SHARED_MAP, 0, num_bots, num_dirt * num_bots // 3, max_steps, seed, world=world)
+        fresh = time.perf_counter() - start
+        start = time.perf_counter()
+        snap = WorldSnapshot.take(sim)
+        taken = time.perf_counter() - start
+        start = time.perf_counter()
+        snap.fork()
+        forked = time.perf_counter() - start
+        size_kb = len(pickle.dumps(snap, protocol=pickle.HIGHEST_PROTOCOL)) / 1024
+        print(f"{num_bots:>6} {size:>6} {fresh * 1e3:>11.1f} {taken * 1e3:>14.1f} {forked * 1e3:>10.1f} {size_kb:>11.0f}")
+        rows.append({"num_bots": num_bots, "world_size": size, "fresh_s": fresh, "snapshot_s": taken,
+                     "fork_s": forked, "snapshot_kb": size_kb})
+
+    strategies = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP)
+    independent, paired = [], []
+    for pair in range(num_pairs):
+        results = [run_experiment(strategy, pair, num_dirt=num_dirt, max_steps=max_steps, headless=True,
+                                  seed=seed + 2 * pair + i, save_outputs=False)
+                   for i, strategy in enumerate(strategies)]
+        independent.append(results[1]["dirt_collected"] - results[0]["dirt_collected"])
+        results = paired_runs(strategies, pair, num_dirt=num_dirt, max_steps=max_steps, seed=seed + pair)
+        paired.append(results[1]["dirt_collected"] - results[0]["dirt_collected"])
+    for label, diffs in (("independent", independent), ("paired", paired)):
+        mean, std = float(np.mean(diffs)), float(np.std(diffs, ddof=1))
+        print(f"{label:>12}: shared_map - baseline dirt {mean:+.2f}, std {std:.2f} over {num_pairs} pairs")
+        rows.append({"design": label, "pairs": num_pairs, "mean_difference": mean, "std_difference": std})
+    return rows
+
+
+def bench_sweep(num_bots=(3, 10), max_steps=(300, 1000), target_ci=2.0, fixed_runs=10, max_runs=100, seed=0):
+    """
+    Simulations an adaptive sweep (adaptive_sweep.py) needs to bring every grid point to a
+    target CI width, against a fixed number of runs per point: the fixed_runs a batch uses,
+    and the fewest that would bring every point to the target given the sweep's estimates.
+    """
+    strategies = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION)
+    grid = sweep_grid(strategies, num_bots, max_steps=max_steps)
+    sweep = AdaptiveSweep(grid, target_ci, max_runs=max_runs, base_seed=seed)
+    start = time.perf_counter()
+    summary = sweep.run(workers=1, csv_path=None)
+    elapsed = time.perf_counter() - start
+
+    def runs_needed(std):
+        n = 2
+        while n < max_runs and t_quantile(0.975, n - 1) * std / math.sqrt(n) > target_ci / 2:
+            n += 1
+        return n
+
+    needed = [runs_needed(row["std"]) for row in summary]
+    fixed_met = sum(sweep.stats[point].half_width(count=fixed_runs) <= target_ci / 2 for point in grid)
+    print(f"{'strategy':>16} {'bots':>5} {'steps':>6} {'runs':>5} {'std':>6} {'CI width':>9}")
+    for row in summary:
+        print(f"{row['strategy']:>16} {row['num_bots']:>5} {row['max_steps']:>6} {row['runs']:>5} "
+              f"{row['std']:>6.2f} {row['ci_high'] - row['ci_low']:>9.2f}")
+    print(f"adaptive: {sweep.simulated} simulations in {elapsed:.1f} s, every point within CI width {target_ci}")
+    print(f"fixed {fixed_runs} per point: {fixed_runs * len(grid)} simulations, "
+          f"{fixed_met} of {len(grid)} points within the target")
+    print(f"fixed, enough for every point: {max(needed)} per point, {max(needed) * len(grid)} simulations")
+    return [{"design": "adaptive", "simulations": sweep.simulated, "points_met": len(grid), "elapsed_s": elapsed},
+            {"design": f"fixed_{fixed_runs}", "simulations": fixed_runs * len(grid), "points_met": fixed_met},
+            {"design": "fixed_worst_case", "simulations": max(needed) * len(grid), "points_met": len(grid)}]
+
+
+class _CountingCanvas:
+    """Stands in for a Tk canvas: counts the calls a renderer makes, without drawing."""
+
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+
+    def _create(self, *args, **kwargs):
+        self.calls += 1
+        self.items += 1
+        return self.items
+
+    create_oval = create_rectangle = create_text = _create
+
+    def coords(self, item, *args):
+        self.calls += 1
+
+    def itemconfigure(self, item, **kwargs):
+        self.calls += 1
+
+    def delete(self, item):
+        self.calls += 1
+
+
+def bench_render(bot_counts=(3, 100), render_every=(1, 5), num_dirt=40, max_steps=300, seed=0):
+    """
+    Canvas calls and render time per simulation step of TkRenderer, with a canvas stub
+    so it runs without a display. Every call on a real canvas is a round trip into Tcl,
+    so calls per step is the figure that tracks GUI cost.
+    """
+    rows = []
+    print(f"{'bots':>6} {'every':>6} {'frames':>7} {'calls/step':>11} {'render (us/step)':>17}")
+    for num_bots in bot_counts:
+        for every in render_every:
+            canvas, timer = _CountingCanvas(), PhaseTimer(max_steps)
+            sim = Simulation(STRATEGY_COORDINATION, 0, num_bots, num_dirt, max_steps, seed, stop_conditions=(),
+                             timer=timer, renderer=TkRenderer(canvas, DEFAULT_WORLD, every))
+            setup_calls = canvas.calls
+            sim.run()
+            render_us = timer.report()["phases"]["render"]["total_s"] * 1e6 / sim.step_count
+            calls = (canvas.calls - setup_calls) / sim.step_count
+            print(f"{num_bots:>6} {every:>6} {sim.renderer.frames:>7} {calls:>11.2f} {render_us:>17.1f}")
+            rows.append({"num_bots": num_bots, "render_every": every, "frames": sim.renderer.frames,
+                         "calls_per_step": calls, "render_us_per_step": render_us})
+    return rows
+
+
+def _peak_memory(fn):
+    """
+    Returns the peak traced allocation (bytes) during one call of fn(). The garbage
+    collector is paused so the peak does not depend on when a collection happens to run.
+    """
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    return peak
+
+
+def bench_aggregate(row_counts=(10000, 100000), seed=0):
+    """
+    Per-strategy summary of a results CSV: pandas load + groupby versus streaming the
+    rows through a ResultsAggregator. Streaming memory does not grow with the row count.
+    """
+    rng = random.Random(seed)
+    strategies = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION)
+    rows = []
+    print(f"{'rows':>8} {'pandas (s)':>11} {'pandas MB':>10} {'stream (s)':>11} {'stream MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in row_counts:
+            path = f"{tmp}/results_{count}.csv"
+            with ResultsWriter(path, flush_every=10000) as writer:
+                for run_id in range(count):
+                    writer.add({"strategy": strategies[run_id % 4], "run_id": run_id, "seed": run_id,
+                                "num_bots": 3, "num_dirt": 40, "max_steps": 1000, "steps": 1000,
+                                "dirt_collected": rng.randint(0, 40), "elapsed_time": rng.uniform(0.1, 1.0)})
+
+            def with_pandas():
+                df = load_results(path)
+                df.groupby("strategy")[["dirt_collected", "elapsed_time"]].agg(["mean", "std", "median"])
+
+            def streaming():
+                ResultsAggregator.from_csv(path).summary()
+
+            with_pandas()  # Imports pandas outside the measurement
+            pandas_time, pandas_peak = _time_call(with_pandas, 1), _peak_memory(with_pandas)
+            stream_time, stream_peak = _time_call(streaming, 1), _peak_memory(streaming)
+            print(f"{count:>8} {pandas_time:>11.3f} {pandas_peak / 1e6:>10.1f} {stream_time:>11.3f} {stream_peak / 1e6:>10.2f}")
+            rows.append({"rows": count, "pandas_s": pandas_time, "pandas_peak_bytes": pandas_peak,
+                         "stream_s": stream_time, "stream_peak_bytes": stream_peak})
+    return rows
+
+
+def _import_time_ms(module):
+    # -X importtime writes "import time: self [us] | cumulative | imported package" lines to stderr
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def bench_imports(modules=IMPORT_MODULES, repeats=3, budget_ms=IMPORT_BUDGET_MS):
+    """
+    Cumulative import time of the modules a headless worker loads, each in a fresh
+    interpreter. Raises if any module is over budget_ms.
+    """
+    rows = []
+    print(f"{'module':>36} {'import (ms)':>12} {'budget':>8}")
+    for module in modules:
+        import_ms = min(_import_time_ms(module) for _ in range(repeats))
+        status = "ok" if import_ms <= budget_ms else "OVER"
+        print(f"{module:>36} {import_ms:>12.1f} {status:>8}")
+        rows.append({"module": module, "import_ms": import_ms, "within_budget": import_ms <= budget_ms})
+    over = [row["module"] for row in rows if not row["within_budget"]]
+    if over:
+        raise RuntimeError(f"import time over {budget_ms} ms budget: {', '.join(over)}")
+    return rows
+
+
+def _suite_row(benchmark, unit, params, fn, ops, repeats, min_time=SUITE_MIN_TIME):
+    """
+    Times fn(), which performs ops operations, and traces its peak memory in one extra call.
+    Like timeit's autorange, each repeat calls fn() often enough to run for min_time; the
+    best repeat is kept.
+    """
+    calls = 1
+    while True:
+        elapsed = _time_call(lambda: [fn() for _ in range(calls)], 1)
+        if elapsed >= min_time:
+            break
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9)) + 1)
+    seconds = min(elapsed, _time_call(lambda: [fn() for _ in range(calls)], repeats)) / calls
+    peak = _peak_memory(fn)
+    key = f"{benchmark}[" + ",".join(f"{name}={value}" for name, value in params.items()) + "]"
+    return {"key": key, "benchmark": benchmark, **params, "unit": unit, "seconds": seconds,
+            "ops_per_sec": ops / seconds, "peak_bytes": peak}
+
+
+def _sim_world(size, num_bots, num_dirt, strategy=STRATEGY_COORDINATION, seed=0):
+    return Simulation(strategy, 0, num_bots, num_dirt, 1, seed, stop_conditions=(), world=WorldConfig.square(size))
+
+
+def bench_suite(bots=SUITE_BOTS, dirt=SUITE_DIRT, sizes=SUITE_SIZES, max_steps=200, repeats=5, seed=0):
+    """
+    Throughput and peak memory of aStarSearch, Swarm.step, collect_nearby_dirt,
+    check_proximity, Simulation.step and a full headless run_experiment, each swept over the
+    parameters it depends on (bots, dirt, world size). Rows have a stable 'key' for
+    comparing against a baseline.
+    """
+    rows = []
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        for num_dirt in dirt:
+            grid = np.zeros((size, size), dtype=np.int16)
+            np.add.at(grid, (rng.integers(0, size, num_dirt), rng.integers(0, size, num_dirt)), 1)
+            rows.append(_suite_row("aStarSearch", "searches", {"size": size, "dirt": num_dirt},
+                                   lambda: aStarSearch(grid), 1, repeats))
+
+    for num_bots in bots:
+        sim = _sim_world(10, num_bots, 0, seed=seed)
+        for i, bot in enumerate(sim.agents):
+            bot.sl, bot.sr = ((5.0, 5.0), (-2.0, 2.0), (3.0, 1.0))[i % 3]
+
+        rows.append(_suite_row("Swarm.step", "bot-steps", {"bots": num_bots},
+                               lambda swarm=sim.swarm: swarm.step(0.1), num_bots, repeats))
+
+    for size in sizes:
+        for num_bots in bots:
+            for num_dirt in dirt:
+                sim = _sim_world(size, num_bots, num_dirt, seed=seed)
+                for bot in sim.agents:
+                    while bot.collect_nearby_dirt(None) is not None:
+                        pass
+
+                # Dirt within reach is gone, so every timed call is a miss, as in most real steps
+                def collect(agents=sim.agents):
+                    for bot in agents:
+                        bot.collect_nearby_dirt(None)
+
+                rows.append(_suite_row("collect_nearby_dirt", "calls",
+                                       {"size": size, "bots": num_bots, "dirt": num_dirt}, collect, num_bots, repeats))
+
+    for num_bots in bots:
+        sim = _sim_world(10, num_bots, 0, seed=seed)
+
+        def proximity(brains=[bot.brain for bot in sim.agents]):
+            for brain in brains:
+                brain.check_proximity()
+
+        rows.append(_suite_row("check_proximity", "calls", {"bots": num_bots}, proximity, num_bots, repeats))
+
+    for size in sizes:
+        for num_bots in bots:
+            for num_dirt in dirt:
+                # One simulation stepped on through every call, as in a run (no stop conditions)
+                sim = _sim_world(size, num_bots, num_dirt, seed=seed)
+                rows.append(_suite_row("Simulation.step", "steps", {"size": size, "bots": num_bots, "dirt": num_dirt},
+                                       sim.step, 1, repeats))
+
+    for size in sizes:
+        for num_bots in bots:
+            for num_dirt in dirt:
+                def experiment(size=size, num_bots=num_bots, num_dirt=num_dirt):
+                    run_experiment(STRATEGY_COORDINATION, 0, num_bots=num_bots, num_dirt=num_dirt,
+                                   max_steps=max_steps, headless=True, seed=seed, save_outputs=False,
+                                   stop_conditions=(), world=WorldConfig.square(size))
+
+                rows.append(_suite_row("run_experiment", "steps", {"size": size, "bots": num_bots, "dirt": num_dirt},
+                                       experiment, max_steps, repeats))
+
+    print(f"{'benchmark':>52} {'ops/s':>12} {'unit':>10} {'peak (KB)':>10}")
+    for row in rows:
+        print(f"{row['key']:>52} {row['ops_per_sec']:>12.0f} {row['unit']:>10} {row['peak_bytes'] / 1e3:>10.1f}")
+    return rows
+
+
+def compare_to_baseline(rows, baseline_rows, threshold=REGRESSION_THRESHOLD):
+    """
+    Returns a message for every row whose ops/sec fell, or whose peak memory grew, by more
+    than threshold (a fraction) relative to the baseline row with the same key.
+    """
+    baseline = {row["key"]: row for row in baseline_rows}
+    regressions = []
+    for row in rows:
+        before = baseline.get(row["key"])
+        if before is None:
+            continue
+        if row["ops_per_sec"] < before["ops_per_sec"] * (1 - threshold):
+            regressions.append(f"{row['key']}: {row['ops_per_sec']:.0f} {row['unit']}/s, "
+                               f"baseline {before['ops_per_sec']:.0f} ({row['ops_per_sec'] / before['ops_per_sec'] - 1:+.0%})")
+        if row["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{row['key']}: peak {row['peak_bytes'] / 1e3:.1f} KB, "
+                               f"baseline {before['peak_bytes'] / 1e3:.1f} KB ({row['peak_bytes'] / before['peak_bytes'] - 1:+.0%})")
+    return regressions
+
+
+def write_json(path, results):
+    """Writes {benchmark name: rows} plus a description of the machine to path."""
+    document = {"machine": {"python": platform.python_version(), "numpy": np.__version__,
+                            "platform": platform.platform(), "cpus": os.cpu_count()},
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, default=float)  # default converts numpy scalars
+
+
+BENCHMARKS = {
+    "astar": bench_astar,
+    "move": bench_move,
+    "spatial": bench_spatial,
+    "dirt_map": bench_dirt_map,
+    "logging": bench_logging,
+    "trajectory": bench_trajectory,
+    "replan": bench_replan,
+    "strategies": bench_strategies,
+    "world_size": bench_world_size,
+    "aggregate": bench_aggregate,
+    "phases": bench_phases,
+    "render": bench_render,
+    "comms": bench_comms,
+    "event": bench_event,
+    "fields": bench_fields,
+    "snapshot": bench_snapshot,
+    "sweep": bench_sweep,
+    "suite": bench_suite,
+    "imports": bench_imports,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run simulator benchmarks.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--json", default=None, help="write every benchmark's rows to this JSON file")
+    parser.add_argument("--baseline", default=None, help="fail if the suite regressed against this JSON file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="allowed fractional regression against the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write the results to {BASELINE_FILE}")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    names = args.names or list(BENCHMARKS)
+    if (args.baseline or args.save_baseline) and "suite" not in names:
+        parser.error("--baseline and --save-baseline need the suite benchmark")
+    results = {}
+    for name in names:
+        print(f"\n== {name} ==")
+        results[name] = BENCHMARKS[name]()
+    if args.json:
+        write_json(args.json, results)
+    if args.save_baseline:
+        write_json(BASELINE_FILE, {"suite": results["suite"]})
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline_rows = json.load(f)["results"].get("suite", [])
+        regressions = compare_to_baseline(results["suite"], baseline_rows, args.threshold)
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}")
+        for message in regressions:
+            print(f"  {message}")
+        if regressions:
+            sys.exit(1)
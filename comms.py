@@ -0,0 +1,143 @@
+# comms.py
+# Description:
+# Message-passing communication between bots, with latency, bandwidth and range limits.
+
+# Without comms, the shared-map strategies read one BeliefMap that every bot writes to,
+# and coordinating bots look up each other's positions directly: communication is
+# instant and perfect. With a MessageBus, each bot keeps its own BeliefMap and learns
+# about the others only through messages:
+# - map changes: the cells it cleaned or found swept, applied by receivers as the same
+#   clean/clear operations (perception is complete at the start of a run, so every bot
+#   already holds the initial dirt map and only changes need to be sent);
+# - its position, for the coordination strategy's proximity check.
+# Messages are sent at the end of a step's think phase and delivered latency steps later
+# to every bot within range of the sender at the time it sent them. Each bot may send
+# bandwidth entries per step (a position or one map cell each); the rest wait in its
+# outbox. Bots read only their own delivered messages and belief. Delivery order depends
+# only on sender slots, so results do not depend on the order in which bots act.
+
+from collections import deque, namedtuple
+
+import numpy as np
+
+OP_CLEAN = 0  # Remove amount dirt from the cell
+OP_CLEAR = 1  # The cell was found swept; set it to 0
+
+Position = namedtuple("Position", "x y")
+# recipients is a boolean mask over bot slots, or None when the message reaches every bot
+Message = namedtuple("Message", "sender sent_step position changes recipients")
+
+
+class CommsConfig:
+    def __init__(self, latency=1, bandwidth=None, range=None):
+        """
+        Parameters:
+            latency (int): Steps from sending a message to its delivery; at least 1.
+            bandwidth (int): Entries (a position or one map cell) a bot may send per step; None for unlimited.
+            range (float): Maximum sender-receiver distance in pixels; None for unlimited.
+        """
+        if latency < 1:
+            raise ValueError(f"latency must be at least 1 step, got {latency}")
+        if bandwidth is not None and bandwidth < 1:
+            raise ValueError(f"bandwidth must be at least 1 entry per step, got {bandwidth}")
+        if range is not None and range <= 0:
+            raise ValueError(f"range must be positive, got {range}")
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.range = range
+
+    def __repr__(self):
+        return f"CommsConfig(latency={self.latency}, bandwidth={self.bandwidth}, range={self.range})"
+
+
+class Radio:
+    """One bot's connection to a MessageBus: its outbox, and what it heard in the latest step."""
+
+    def __init__(self, bus, bot):
+        self.bus = bus
+        self.bot = bot
+        self.outbox = deque()  # (op, cell, amount) map changes not sent yet
+        self.neighbours = []   # Positions heard in the latest delivery
+
+    def cleaned(self, cell, amount=1):
+        self.outbox.append((OP_CLEAN, cell, amount))
+
+    def cleared(self, cell):
+        self.outbox.append((OP_CLEAR, cell, 0))
+
+    def sync(self, belief):
+        """Applies the map changes delivered this step to belief and collects the positions heard."""
+        slot = self.bot.slot
+        self.neighbours = []
+        for message in self.bus.delivered:
+            if message.sender == slot or (message.recipients is not None and not message.recipients[slot]):
+                continue
+            if message.position is not None:
+                self.neighbours.append(message.position)
+            for op, cell, amount in message.changes:
+                if op == OP_CLEAR:
+                    belief.clear(cell)
+                else:
+                    belief.clean(cell, amount)
+
+
+class MessageBus:
+    def __init__(self, config=None, swarm=None, share_positions=False):
+        """
+        Parameters:
+            config (CommsConfig): Latency, bandwidth and range (default: next-step delivery, no limits).
+            swarm (Swarm): Bot poses, for positions and range checks.
+            share_positions (bool): Whether bots broadcast their position every step.
+        """
+        self.config = config if config is not None else CommsConfig()
+        self.swarm = swarm
+        self.share_positions = share_positions
+        self.radios = []
+        self.in_flight = {}   # Delivery step -> messages, in sending order
+        self.delivered = []   # Messages delivered in the current step
+        self.stats = {"messages": 0, "entries": 0, "receptions": 0, "out_of_range": 0, "max_backlog": 0}
+
+    def connect(self, bot):
+        radio = Radio(self, bot)
+        self.radios.append(radio)
+        return radio
+
+    def _recipients(self, x, y):
+        if self.config.range is None:
+            return None
+        n = self.swarm.count
+        dx, dy = self.swarm.x[:n] - x, self.swarm.y[:n] - y
+        return dx * dx + dy * dy <= self.config.range * self.config.range
+
+    def deliver(self, step):
+        """Makes the messages due at step available to Radio.sync()."""
+        self.delivered = self.in_flight.pop(step, [])
+
+    def flush(self, step):
+        """Sends what every bot may send this step, in slot order."""
+        bandwidth, stats = self.config.bandwidth, self.stats
+        due = step + self.config.latency
+        others = len(self.radios) - 1
+        for radio in self.radios:
+            bot, budget = radio.bot, bandwidth
+            position = None
+            if self.share_positions:
+                position = Position(float(bot.x), float(bot.y))
+                budget = None if budget is None else budget - 1
+            outbox = radio.outbox
+            count = len(outbox) if budget is None else min(len(outbox), budget)
+            changes = tuple(outbox.popleft() for _ in range(count))
+            stats["max_backlog"] = max(stats["max_backlog"], len(outbox))
+            if position is None and not changes:
+                continue
+            recipients = self._recipients(bot.x, bot.y)
+            if recipients is None:
+                reached = others
+            else:
+                recipients[bot.slot] = False
+                reached = int(np.count_nonzero(recipients))
+            self.in_flight.setdefault(due, []).append(Message(bot.slot, step, position, changes, recipients))
+            stats["messages"] += 1
+            stats["entries"] += len(changes) + (position is not None)
+            stats["receptions"] += reached
+            stats["out_of_range"] += others - reached
@@ -0,0 +1,53 @@
+# dirt_grid.py
+# Description:
+# World-owned occupancy grid of dirt counts, kept up to date as dirt is placed and collected.
+
+# The simulation adds and removes each dirt patch here as it happens, so every update
+# is O(1) and building a bot's dirt map no longer means looping over all dirt objects.
+# Bots read the counts through read-only views of the one buffer, so no copy is made
+# unless a bot needs a private map it can edit.
+
+import numpy as np
+
+
+class DirtGrid:
+    def __init__(self, rows=10, cols=10, cell_size=100):
+        """
+        Parameters:
+            rows (int): Number of cell rows (y direction).
+            cols (int): Number of cell columns (x direction).
+            cell_size (float): Width and height of a cell in canvas pixels.
+        """
+        if rows <= 0 or cols <= 0:
+            raise ValueError(f"grid must have at least one cell, got {rows}x{cols}")
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = cell_size
+        self.counts = np.zeros((rows, cols), dtype=np.int32)
+
+    def cell_of(self, x, y):
+        """(row, col) cell containing a canvas position, clamped to the grid."""
+        return (min(max(int(y // self.cell_size), 0), self.rows - 1),
+                min(max(int(x // self.cell_size), 0), self.cols - 1))
+
+    def add(self, x, y, amount=1):
+        """Records amount dirt placed at a canvas position; returns its cell."""
+        cell = self.cell_of(x, y)
+        self.counts[cell] += amount
+        return cell
+
+    def remove(self, x, y, amount=1):
+        """Records amount dirt collected at a canvas position; returns its cell."""
+        cell = self.cell_of(x, y)
+        if self.counts[cell] < amount:
+            raise ValueError(f"cell {cell} holds {self.counts[cell]} dirt, cannot remove {amount}")
+        self.counts[cell] -= amount
+        return cell
+
+    def view(self):
+        """Read-only view of the counts; it shares the grid's buffer and follows later updates."""
+        counts = self.counts.view()
+        counts.flags.writeable = False
+        return counts
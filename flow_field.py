@@ -0,0 +1,169 @@
+# flow_field.py
+# Description:
+# Distance fields shared by every bot of a simulation, so N bots planning over the same
+# map cost one search instead of N.
+
+# A distance field holds, for every cell, the number of 4-connected grid steps to the
+# nearest of a set of source cells (UNREACHABLE where no source can be reached). It is
+# computed by a breadth-first wavefront over the whole grid at once: each wave is a few
+# numpy shifts of a boolean frontier. A bot extracts its path by walking down the field
+# from its own cell to a source, one neighbour one step closer at a time, which costs
+# O(path length) however many bots share the field.
+# - Dirt fields have the dirty cells of a BeliefMap as sources and lead to the nearest
+#   dirt. They are computed at most once per map version and keyed on the set of dirty
+#   cells, so bots sharing a map, or holding equal maps, share them.
+# - Goal fields have one goal cell (a task allocator's, or the initial sweep's) as
+#   source. Steps do not depend on dirt, so they stay valid for the whole run.
+# FieldCache keeps the most recently used fields up to a memory budget; FieldPlanner is
+# a drop-in replacement for planner.IncrementalPlanner that plans through one.
+
+from collections import OrderedDict
+from time import perf_counter_ns
+
+import numpy as np
+
+from aStar import NEIGHBOURS_4
+
+UNREACHABLE = np.iinfo(np.int32).max
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+def distance_field(sources, blocked=None):
+    """
+    Grid steps from every cell to the nearest source cell, as an int32 array.
+
+    Parameters:
+        sources (np.ndarray): Boolean mask of source cells.
+        blocked (np.ndarray): Optional boolean mask of cells that cannot be entered.
+    """
+    sources = np.asarray(sources, dtype=bool)
+    passable = ~blocked if blocked is not None else np.ones(sources.shape, dtype=bool)
+    field = np.full(sources.shape, UNREACHABLE, dtype=np.int32)
+    frontier = sources & passable
+    reached = frontier.copy()
+    grown = np.empty_like(frontier)
+    distance = 0
+    while frontier.any():
+        field[frontier] = distance
+        distance += 1
+        # Cells next to the frontier, one shifted copy per neighbour direction
+        grown[...] = False
+        grown[1:] |= frontier[:-1]
+        grown[:-1] |= frontier[1:]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & passable & ~reached
+        reached |= frontier
+    return field
+
+
+def descend(field, start):
+    """
+    Path of (row, col) cells from start down a distance field to a source, or [] if no
+    source can be reached from start. Ties go to the first neighbour in NEIGHBOURS_4.
+    """
+    rows, cols = field.shape
+    flat = memoryview(np.ascontiguousarray(field).reshape(-1))  # Indexing yields Python ints, fast
+    row, col = int(start[0]), int(start[1])
+    distance = flat[row * cols + col]
+    if distance == UNREACHABLE:
+        return []
+    path = [(row, col)]
+    while distance > 0:
+        distance -= 1
+        for dr, dc, _ in NEIGHBOURS_4:
+            r, c = row + dr, col + dc
+            if 0 <= r < rows and 0 <= c < cols and flat[r * cols + c] == distance:
+                row, col = r, c
+                break
+        path.append((row, col))
+    return path
+
+
+class FieldCache:
+    """
+    Least-recently-used cache of distance fields over one world's obstacles, shared by
+    every bot of a simulation.
+    """
+
+    def __init__(self, shape, blocked=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Parameters:
+            shape (tuple): (rows, cols) of the world.
+            blocked (np.ndarray): Optional boolean mask of cells that cannot be entered.
+            max_bytes (int): Memory for fields (4 bytes per cell each); at least one is always kept.
+        """
+        self.shape = tuple(shape)
+        self.blocked = blocked
+        self.maxsize = max(1, max_bytes // (4 * self.shape[0] * self.shape[1]))
+        self.entries = OrderedDict()
+        self.dirt_keys = {}  # Map token -> (version, key of its dirt field at that version)
+        self.hits = self.misses = 0
+        self.compute_ns = 0
+
+    def _get(self, key, sources):
+        field = self.entries.get(key)
+        if field is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return field
+        self.misses += 1
+        start = perf_counter_ns()
+        field = distance_field(sources(), self.blocked)
+        self.compute_ns += perf_counter_ns() - start
+        self.entries[key] = field
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return field
+
+    def dirt_field(self, belief):
+        """Field leading to the nearest dirty cell of a BeliefMap, in its current version."""
+        known = self.dirt_keys.get(belief.token)
+        if known is not None and known[0] == belief.version:
+            key, dirty = known[1], None
+        else:
+            dirty = belief.counts > 0
+            key = ("dirt", dirty.tobytes())
+            self.dirt_keys[belief.token] = (belief.version, key)
+        return self._get(key, lambda: dirty if dirty is not None else belief.counts > 0)
+
+    def goal_field(self, goal):
+        """Field leading to one (row, col) cell."""
+        def sources():
+            mask = np.zeros(self.shape, dtype=bool)
+            mask[goal] = True
+            return mask
+        return self._get(("goal", goal), sources)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "fields": len(self.entries),
+                "compute_s": self.compute_ns / 1e9}
+
+
+class FieldPlanner:
+    """
+    Plans a bot's route like IncrementalPlanner, to a given goal or else the nearest dirt,
+    using the fields of a shared FieldCache. The nearest dirt is the nearest by path rather
+    than by Manhattan distance, and is chosen afresh on every replan instead of being kept
+    while it stays dirty.
+    """
+
+    def __init__(self, belief, fields):
+        self.belief = belief
+        self.fields = fields
+        self.goal = None
+
+    def plan(self, start, goal=None):
+        """Plans to goal, or to the nearest dirty cell when no goal is given."""
+        if goal is None:
+            # One walk down the dirt field both picks the nearest dirt and routes there
+            path = descend(self.fields.dirt_field(self.belief), start)
+            self.goal = path[-1] if path else None
+            return path
+        self.goal = goal
+        return descend(self.fields.goal_field(goal), start)
+
+    def sweep(self):
+        """The initial corner-to-corner route, from the bottom-right cell to (0, 0)."""
+        rows, cols = self.belief.counts.shape
+        return descend(self.fields.goal_field((0, 0)), (rows - 1, cols - 1))
@@ -9,8 +9,10 @@
 # 1. Baseline – independent A* planning.
 # 2. Shared Map – local perceptions are merged.
 # 3. Coordination – shared maps plus proximity-based avoidance.
+# 4. Task allocation – shared maps, with each dirty cell assigned to one bot.
 
-# Supports both GUI (Tkinter) and headless modes.
+# Supports both GUI (Tkinter) and headless modes. Tkinter is only imported when a
+# GUI run starts, so headless and batch runs work without a display or Tk install.
 # Results are logged to CSV and visualized externally.
 
 # Attribution:
@@ -18,43 +20,179 @@
 # - A* pathfinding from aStar.py (template).
 # - Coordination, shared state, batch control, and visual output designed by the author.
 
-import tkinter as tk
 import random
 import math
+import os
 import numpy as np
-import csv
 import time
-from aStar import aStarSearch
+from comms import MessageBus
+from dirt_grid import DirtGrid
+from flow_field import FieldCache, FieldPlanner
+from planner import BeliefMap, IncrementalPlanner, PathCache
+from task_allocation import TaskAllocator
+from swarm import Swarm
+from trajectory import TrajectoryRecorder, world_metadata
+from world import DEFAULT_WORLD
+from spatial_index import SpatialHash
+from profiling import PhaseTimer, append_timing_csv, format_report, run_profiled
+from renderer import TkRenderer
+from results_sink import ResultsWriter
+from sim_log import get_logger
+
+logger = get_logger("sim")
+
+PICKUP_RADIUS = 20       # Distance (px) at which a bot vacuums up a dirt patch
+PROXIMITY_RADIUS = 100   # Distance (px) at which coordinating bots avoid each other
 
 # Available strategy identifiers for controlling agent behavior
 STRATEGY_BASELINE = "baseline" # No communication between agents
 STRATEGY_SHARED_MAP = "shared_map" # Agents merge perceived dirt into a shared global map
 STRATEGY_COORDINATION = "coordination" # Agents coordinate based on proximity
+STRATEGY_TASK_ALLOCATION = "task_allocation" # Shared map, dirty cells assigned to bots so they don't duplicate work
 
-# Shared map for dirt perception (only used in shared and coordination strategies)
-shared_map = np.zeros((10, 10), dtype=np.int16)
+OBSTACLE_MASK_FILE = "world_obstacles.npy"
+TIMING_CSV = "results_timing.csv"  # Per-phase timing reports of instrumented runs, see profiling.py
+
+WAYPOINT_RADIUS = 0.8    # Fraction of a cell within which a path waypoint counts as reached
+STEER_TURN = (-2.0, 2.0)   # steer() wheel speeds: turning in place
+STEER_DRIVE = (5.0, 5.0)   # and driving straight
+EVENT_MAX_SKIP = 500     # Most steps an event-driven simulation advances in one jump
+STEADY_IDLE = "idle"     # Brain.steady_target() result for a bot that will keep standing still
+
+# Wheel speeds that turn a bot towards (tx, ty), or drive it straight once it roughly faces it
+def steer(x, y, theta, tx, ty):
+    angle_to_target = math.atan2(ty - y, tx - x)
+    angle_diff = (angle_to_target - theta + math.pi) % (2 * math.pi) - math.pi
+    if abs(angle_diff) > 0.2:
+        return STEER_TURN
+    return STEER_DRIVE
 
 class Counter:
     def __init__(self):
         self.dirt_collected = 0
+        self.per_bot = {}  # Bot name -> dirt collected by that bot
         self.start_time = time.time()
 
-    def collect(self):
+    def collect(self, bot_name=None):
         self.dirt_collected += 1
+        if bot_name is not None:
+            self.per_bot[bot_name] = self.per_bot.get(bot_name, 0) + 1
 
 class Brain:
-    def __init__(self, bot, all_agents, strategy):
+    def __init__(self, bot, all_agents, strategy, bot_index=None, shared_belief=None, path_cache=None,
+                 allocator=None, timer=None, radio=None, field_cache=None, belief=None, path=None):
+        # belief and path restore a brain from a snapshot (see snapshot.py): the map is used as
+        # it is instead of being perceived, and the route replaces the initial sweep
         self.bot = bot
+        self.timer = timer  # Optional profiling.PhaseTimer charged for replanning and proximity checks
+        self.radio = radio  # Optional comms.Radio; the bot then only learns about the others by message
         self.agents = all_agents
         self.strategy = strategy
-        local_map = self.bot.scan_dirt_map()
+        self.bot_index = bot_index  # Optional SpatialHash of bot positions
+        self.world = bot.world
 
         # My logic: use shared map when strategy requires
-        self.map = local_map if strategy == STRATEGY_BASELINE else (shared_map | local_map)
-        self.path = aStarSearch(self.map) or []
+        if belief is not None:
+            self.belief = belief
+        elif strategy == STRATEGY_BASELINE or shared_belief is None:
+            self.belief = BeliefMap(np.array(self.bot.scan_dirt_map(), dtype=np.int16))
+        else:
+            shared_belief.merge(self.bot.scan_dirt_map())
+            self.belief = shared_belief
+        blocked = self.world.blocked if self.world.has_obstacles() else None
+        # With a flow_field.FieldCache, planning reads distance fields shared by all bots
+        if field_cache is not None:
+            self.planner = FieldPlanner(self.belief, field_cache)
+        else:
+            self.planner = IncrementalPlanner(self.belief, path_cache, blocked)
+        self.allocator = allocator  # Optional TaskAllocator handing out goal cells
+        # Start with the original corner-to-corner sweep, then replan towards remaining dirt.
+        # Allocated bots skip the sweep, since it would send every bot along the same route.
+        if path is None:
+            path = [] if allocator is not None else self.planner.sweep()
+        self.path = path
         self.path_index = 0
-
-    def check_proximity(self, threshold=100):
+        self.path_version = self.belief.version
+        self.no_route = False  # Set when the last replan found no reachable dirt
+        self.targets = []      # Dirt patches being approached inside the reached goal cell
+
+    @property
+    def map(self):
+        return self.belief.counts
+
+    # True once the bot has no waypoints left and knows of no dirt it can reach
+    def is_idle(self):
+        if self.targets or self.path_index < len(self.path):
+            return False
+        return self.no_route or not self.belief.has_dirt()
+
+    # Plan from the bot's current cell to its allocated cell, or the nearest dirt it knows about
+    def replan(self):
+        start = time.perf_counter_ns() if self.timer is not None else 0
+        cell = self.bot.cell()
+        goal = self.allocator.goal_for(self.bot.name, cell) if self.allocator is not None else None
+        self.path = self.planner.plan(cell, goal)
+        # path[0] is the cell the bot is already in; heading back to its centre wastes a turn
+        self.path_index = 1 if len(self.path) > 1 else 0
+        self.path_version = self.belief.version
+        self.no_route = not self.path and self.belief.has_dirt()
+        if self.timer is not None:
+            self.timer.lap("plan", start)
+
+    # Reached the goal cell: go for the dirt actually lying there, then mark the cell swept
+    def arrive(self, goal):
+        self.targets = self.bot.sensed_dirt_in(goal)
+        if not self.targets:
+            self.mark_swept(goal)
+
+    def mark_swept(self, cell):
+        self.belief.clear(cell)
+        self.path_version = self.belief.version
+        if self.radio is not None:
+            self.radio.cleared(cell)
+
+    def steer_to(self, tx, ty):
+        return steer(self.bot.x, self.bot.y, self.bot.theta, tx, ty)
+
+    # For event-driven stepping: what think() will keep steering towards until an event changes
+    # its inputs, as (tx, ty, waypoint radius or None), STEADY_IDLE, or None if the next think()
+    # may replan or otherwise change state. Proximity and pickups are checked by the caller.
+    def steady_target(self):
+        if self.radio is not None or self.belief.version != self.path_version:
+            return None
+        if self.targets:
+            return self.targets[0].centreX, self.targets[0].centreY, None
+        if self.path_index < len(self.path):
+            tx, ty = self.world.cell_centre(self.path[self.path_index])
+            return tx, ty, WAYPOINT_RADIUS * self.world.cell_size
+        if not self.no_route and self.belief.has_dirt():
+            return None  # Route used up: the next think() replans
+        return STEADY_IDLE
+
+    def on_dirt_collected(self, dirt):
+        cell = self.world.cell_of(dirt.centreX, dirt.centreY)
+        self.belief.clean(cell)
+        if self.radio is not None:
+            self.radio.cleaned(cell)
+
+    def check_proximity(self, threshold=PROXIMITY_RADIUS):
+        if self.timer is not None:
+            start = time.perf_counter_ns()
+            found = self._find_close_bot(threshold)
+            self.timer.lap("proximity", start)
+            return found
+        return self._find_close_bot(threshold)
+
+    def _find_close_bot(self, threshold):
+        if self.radio is not None:
+            # Only the positions heard this step, as they were when sent
+            for other in self.radio.neighbours:
+                if math.hypot(self.bot.x - other.x, self.bot.y - other.y) < threshold:
+                    return True, other
+            return False, None
+        if self.bot_index is not None:
+            other, _ = self.bot_index.first_within(self.bot.x, self.bot.y, threshold, exclude=self.bot)
+            return other is not None, other
         for other in self.agents:
             if other is not self.bot:
                 dist = math.hypot(self.bot.x - other.x, self.bot.y - other.y)
@@ -64,6 +202,8 @@ class Brain:
 
     # Compute wheel speeds based on current path and strategy
     def think(self):
+        if self.radio is not None:
+            self.radio.sync(self.belief)
         if self.strategy == STRATEGY_COORDINATION:
             too_close, other = self.check_proximity()
             if too_close:
@@ -71,45 +211,100 @@ class Brain:
                 self.bot.theta = angle + math.pi
                 return -2.0, 2.0, None, None
 
-        if self.path_index < len(self.path):
-            tx, ty = self.path[self.path_index][1]*100 + 50, self.path[self.path_index][0]*100 + 50
-            dx, dy = tx - self.bot.x, ty - self.bot.y
-            angle_to_target = math.atan2(dy, dx)
-            angle_diff = (angle_to_target - self.bot.theta + math.pi) % (2 * math.pi) - math.pi
+        if self.targets:
+            self.targets = [dirt for dirt in self.targets if self.bot.dirt_present(dirt)]
+            if self.targets:
+                sl, sr = self.steer_to(self.targets[0].centreX, self.targets[0].centreY)
+                return sl, sr, None, None
+            # Everything in the goal cell is gone
+            self.mark_swept(self.planner.goal)
 
-            if abs(angle_diff) > 0.2:
-                sl, sr = -2.0, 2.0
-            else:
-                sl = sr = 5.0
+        # Replan when the route is used up or the dirt map has changed since it was planned
+        map_changed = self.belief.version != self.path_version
+        route_done = self.path_index >= len(self.path) and not self.no_route and self.belief.has_dirt()
+        if map_changed or route_done:
+            self.replan()
 
-            if math.hypot(dx, dy) < 80:
+        if self.path_index < len(self.path):
+            tx, ty = self.world.cell_centre(self.path[self.path_index])
+            sl, sr = self.steer_to(tx, ty)
+
+            if math.hypot(tx - self.bot.x, ty - self.bot.y) < WAYPOINT_RADIUS * self.world.cell_size:
                 self.path_index += 1
+                if self.path_index == len(self.path) and self.path[-1] == self.planner.goal:
+                    self.arrive(self.planner.goal)
         else:
             sl = sr = 0.0
 
         return sl, sr, None, None
 
+def _swarm_field(field):
+    # Pose attribute stored in the bot's slot of a shared Swarm array
+    def getter(self):
+        return getattr(self.swarm, field)[self.slot]
+
+    def setter(self, value):
+        getattr(self.swarm, field)[self.slot] = value
+
+    return property(getter, setter)
+
 # Based on course code: simpleBot4 (bot and dirt structure)
 class Bot:
-    def __init__(self, name, passive_objects, counter):
+    x = _swarm_field("x")
+    y = _swarm_field("y")
+    theta = _swarm_field("theta")
+    sl = _swarm_field("sl")
+    sr = _swarm_field("sr")
+    ll = _swarm_field("ll")
+
+    def __init__(self, name, passive_objects, counter, swarm=None, dirt_index=None, rng=None, dirt_grid=None,
+                 world=None, pose=None):
         self.name = name
-        self.x = random.randint(100, 700)
-        self.y = random.randint(100, 700)
-        self.theta = random.uniform(0, 2*math.pi)
-        self.ll = 60
-        self.sl = self.sr = 0.0
+        self.world = world if world is not None else DEFAULT_WORLD
+        rng = rng if rng is not None else random
+        # Pose lives in a Swarm so all bots can be stepped together; a lone bot gets its own
+        self.swarm = swarm if swarm is not None else Swarm(1)
+        if pose is None:
+            x, y = self.world.random_spawn(rng)
+            pose = (x, y, rng.uniform(0, 2*math.pi))
+        self.slot = self.swarm.add(*pose, ll=60)
         self.passive_objects = passive_objects
+        self.dirt_index = dirt_index  # Optional SpatialHash over passive_objects
+        self.dirt_grid = dirt_grid    # Optional DirtGrid kept in step with passive_objects
         self.counter = counter
-        self.visit_grid = np.zeros((10, 10), dtype=np.int32) # Heatmap data？
+        self.visit_grid = self.world.zeros(np.int32) # Heatmap data？
 
+    # Dirt count per cell; a read-only view of the world grid when there is one
     def scan_dirt_map(self):
-        m = np.zeros((10, 10), dtype=np.int16)
+        if self.dirt_grid is not None:
+            return self.dirt_grid.view()
+        m = self.world.zeros(np.int16)
         for obj in self.passive_objects:
             if isinstance(obj, Dirt):
-                gx, gy = int(obj.centreX // 100), int(obj.centreY // 100)
-                m[gy][gx] += 1
+                m[self.world.cell_of(obj.centreX, obj.centreY)] += 1
         return m
 
+    def cell(self):
+        return self.world.cell_of(self.x, self.y)
+
+    # Dirt patches currently lying in a (row, col) cell, nearest first
+    def sensed_dirt_in(self, cell):
+        if self.dirt_index is not None:
+            # The circle through the cell's corners covers the whole cell
+            cx, cy = self.world.cell_centre(cell)
+            radius = 0.72 * self.world.cell_size
+            candidates = [dirt for _, dirt in self.dirt_index.query_radius(cx, cy, radius)]
+        else:
+            candidates = self.passive_objects
+        found = [dirt for dirt in candidates if self.world.cell_of(dirt.centreX, dirt.centreY) == cell]
+        found.sort(key=lambda dirt: math.hypot(self.x - dirt.centreX, self.y - dirt.centreY))
+        return found
+
+    def dirt_present(self, dirt):
+        if self.dirt_index is not None:
+            return dirt in self.dirt_index
+        return dirt in self.passive_objects
+
     def set_brain(self, brain):
         self.brain = brain
 
@@ -118,31 +313,47 @@ class Bot:
         if new_x is not None: self.x = new_x
         if new_y is not None: self.y = new_y
 
-    # Move the robot and update the visit map
-    def update(self, canvas, dt):
-        self.move(canvas, dt)
-        gx, gy = int(self.x // 100), int(self.y // 100)
-        if 0 <= gx < 10 and 0 <= gy < 10:
+    def record_visit(self):
+        size = self.world.cell_size
+        gx, gy = int(self.x // size), int(self.y // size)
+        if 0 <= gx < self.world.cols and 0 <= gy < self.world.rows:
             self.visit_grid[gy][gx] += 1
 
-    # Detect and remove nearby dirt if within cleaning range
+    # record_visit() for a sequence of positions, one per step
+    def record_visits(self, xs, ys):
+        size = self.world.cell_size
+        gx = np.floor_divide(xs, size).astype(np.int64)
+        gy = np.floor_divide(ys, size).astype(np.int64)
+        inside = (gx >= 0) & (gx < self.world.cols) & (gy >= 0) & (gy < self.world.rows)
+        np.add.at(self.visit_grid, (gy[inside], gx[inside]), 1)
+
+    # Detect and remove nearby dirt if within cleaning range; returns the collected dirt or None
     def collect_nearby_dirt(self, canvas):
-        collected = False
-        for dirt in self.passive_objects[:]:
-            dx = self.x - dirt.centreX
-            dy = self.y - dirt.centreY
-            distance = math.hypot(dx, dy)
-            if distance < 20:
-                if canvas is not None:
-                    canvas.delete(dirt.name)
-                self.passive_objects.remove(dirt)
-                self.counter.collect()
-                print(
-                    f"[INFO] {self.name} collected dirt at ({int(dirt.centreX)}, {int(dirt.centreY)}) | Total: {self.counter.dirt_collected}")
-                collected = True
-                break  # Clean one each time
-        return collected
+        if self.dirt_index is not None:
+            dirt, _ = self.dirt_index.first_within(self.x, self.y, PICKUP_RADIUS)
+        else:
+            dirt = next((d for d in self.passive_objects
+                         if math.hypot(self.x - d.centreX, self.y - d.centreY) < PICKUP_RADIUS), None)
+        if dirt is None:
+            return None
 
+        # Clean one each time
+        if canvas is not None:
+            canvas.delete(dirt.name)
+        self.passive_objects.remove(dirt)
+        if self.dirt_index is not None:
+            self.dirt_index.remove(dirt)
+        if self.dirt_grid is not None:
+            self.dirt_grid.remove(dirt.centreX, dirt.centreY)
+        self.counter.collect(self.name)
+        if getattr(self, "brain", None) is not None:
+            self.brain.on_dirt_collected(dirt)
+        logger.debug("%s collected dirt at (%d, %d) | Total: %d",
+                     self.name, dirt.centreX, dirt.centreY, self.counter.dirt_collected)
+        return dirt
+
+    # Legacy per-bot kinematics, kept as the reference Swarm.step reproduces; Simulation
+    # steps every bot at once through the swarm
     def move(self, canvas, dt):
         # Based on class code: differential drive robot motion using ICC (Instantaneous Center of Curvature)
         if self.sl == self.sr: R = 0
@@ -166,8 +377,11 @@ class Bot:
             self.y += self.sr * math.sin(self.theta)
 
         if canvas:
-            canvas.delete(self.name)
-            self.draw(canvas)
+            self.redraw(canvas)
+
+    def redraw(self, canvas):
+        canvas.delete(self.name)
+        self.draw(canvas)
 
     def draw(self, canvas):
         fill_color = {"bot0": "blue", "bot1": "red", "bot2": "green"}.get(self.name, "black")
@@ -183,80 +397,500 @@ class Dirt:
         return self.centreX, self.centreY
 
 # CSV logging function
-def log_result(strategy, run_id, dirt_collected, elapsed_time):
-    with open("results.csv", "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([strategy, run_id, dirt_collected, round(elapsed_time, 2)])
-
-# GUI experiment runner
-def run_experiment(strategy, run_id, num_bots=3, num_dirt=40, max_steps=1000, headless=False):
-    global shared_map
-    shared_map = np.zeros((10, 10), dtype=np.int16)
-    counter = Counter()
-    agents = []
-    dirt_list = []
-
-    if not headless:
-        root = tk.Tk()
-        canvas = tk.Canvas(root, width=1000, height=1000, bg="white")
-        canvas.pack()
-    else:
-        root = None
-        canvas = None
-
-    # Place dirt objects randomly within the grid
-    for i in range(num_dirt):
-        x, y = random.randint(50, 950), random.randint(50, 950)
-        dirt = Dirt(x, y, f"dirt{i}")
-        dirt_list.append(dirt)
-        if canvas:
-            canvas.create_oval(x - 5, y - 5, x + 5, y + 5, fill="gray", tags=dirt.name)
-
-    # Create robots and attach strategy-specific controllers
-    for i in range(num_bots):
-        bot = Bot(f"bot{i}", dirt_list, counter)
-        brain = Brain(bot, agents, strategy)
+def log_result(result, csv_path="results.csv"):
+    with ResultsWriter(csv_path) as writer:
+        writer.add(result)
+
+# The obstacle mask is saved next to the grids so heatmaps can blank out blocked cells
+def save_visit_grids(visit_grids, obstacle_mask=None):
+    for i, visit_grid in enumerate(visit_grids):
+        np.save(f"visit_grid_bot{i}.npy", visit_grid)
+        logger.info("visit_grid_bot%d.npy saved.", i)
+    if obstacle_mask is not None and obstacle_mask.any():
+        np.save(OBSTACLE_MASK_FILE, obstacle_mask)
+    elif os.path.exists(OBSTACLE_MASK_FILE):
+        os.remove(OBSTACLE_MASK_FILE)  # Left over from an earlier world with obstacles
+
+# Termination conditions for Simulation.run(): each takes the simulation and returns
+# True once the run should stop. The function name is recorded as the stop reason.
+def all_dirt_collected(sim):
+    return not sim.dirt_list
+
+def all_bots_idle(sim):
+    # A bot with no path left can still turn in place to avoid others, but it can
+    # no longer move or pick anything up, so nothing in the outcome can change
+    return all(bot.brain.is_idle() for bot in sim.agents)
+
+def time_budget(seconds):
+    # Measured from each simulation's own first stop check, so one condition can be
+    # shared by every run of a batch
+    def out_of_time(sim):
+        return time.perf_counter() - sim.check_started >= seconds
+
+    out_of_time.__name__ = f"time_budget_{seconds}s"
+    return out_of_time
+
+DEFAULT_STOP_CONDITIONS = (all_dirt_collected, all_bots_idle)
+
+# One bot's predicted motion during an event-driven jump (see Simulation._event_horizon).
+# With sl == sr (straight) or sl == -sr (turning in place, centre of rotation at the bot)
+# Swarm.step() reduces exactly to the updates in advance().
+class _Lane:
+    def __init__(self, target, x, y, theta, sl, sr, ll, dt):
+        self.target = target
+        self.x, self.y, self.theta = x, y, theta
+        self.ll, self.dt = ll, dt
+        self.xs, self.ys, self.thetas = [], [], []
+        self.set_wheels(sl, sr)
+
+    def set_wheels(self, sl, sr):
+        self.wheels = (sl, sr)
+        self.straight = sl == sr
+        self.omega_dt = (sl - sr) / self.ll * self.dt
+        self.moving = self.straight and sr != 0
+        self.dx = None  # Straight step, computed on the first step with these wheels
+
+    def advance(self):
+        """Takes one step and returns the new pose."""
+        if self.straight:
+            if self.dx is None:
+                # The heading is fixed while driving straight; np.cos/np.sin as in Swarm.step()
+                self.theta = (self.theta + self.omega_dt) % (2 * math.pi)
+                sr = self.wheels[1]
+                self.dx, self.dy = float(sr * np.cos(self.theta)), float(sr * np.sin(self.theta))
+            self.x += self.dx
+            self.y += self.dy
+        else:
+            self.theta = (self.theta + self.omega_dt) % (2 * math.pi)
+        self.xs.append(self.x)
+        self.ys.append(self.y)
+        self.thetas.append(self.theta)
+        return self.x, self.y, self.theta
+
+class Simulation:
+    """
+    One experiment world that can be advanced a step at a time.
+    Headless runs call run(); the GUI calls step() from Tk's after() loop.
+    A canvas (or a TkRenderer) draws the run; see renderer.py.
+    With comms (a comms.CommsConfig), the shared-map and coordination bots keep their own
+    maps and exchange changes and positions as messages; their controllers then share no state.
+    With event_driven=True, step() jumps over every step in which nothing can happen (see
+    _event_horizon()), with the same outcome as stepping through them one at a time. Stop
+    conditions are checked between jumps; the default ones cannot become true inside one.
+    With flow_fields=True, bots plan by walking down distance fields that are computed once
+    per map version and shared by all of them (see flow_field.py), instead of each running
+    its own search; routes then differ slightly, as fields count steps and ignore dirt costs.
+    """
+
+    def __init__(self, strategy, run_id=0, num_bots=3, num_dirt=40, max_steps=1000, seed=None,
+                 canvas=None, dt=0.1, stop_conditions=DEFAULT_STOP_CONDITIONS, world=None, record=False,
+                 timer=None, renderer=None, comms=None, event_driven=False, flow_fields=False):
+        setup_start = time.perf_counter_ns()
+        self.strategy = strategy
+        self.run_id = run_id
+        self.num_bots = num_bots
+        self.num_dirt = num_dirt
+        self.max_steps = max_steps
+        self.seed = seed
+        self.canvas = canvas
+        self.world = world if world is not None else DEFAULT_WORLD
+        if renderer is None and canvas is not None:
+            renderer = TkRenderer(canvas, self.world)
+        self.renderer = renderer
+        self.dt = dt
+        self.stop_conditions = tuple(stop_conditions)
+        self.rng = random.Random(seed)
+        # Shared map for dirt perception (only used in shared and coordination strategies)
+        self.shared_belief = BeliefMap(self.world.zeros(np.int16))
+        self.path_cache = PathCache()
+        self.field_cache = FieldCache(self.world.shape, self.world.blocked if self.world.has_obstacles() else None) \
+            if flow_fields else None
+        self.allocator = TaskAllocator(self.shared_belief) if strategy == STRATEGY_TASK_ALLOCATION else None
+        self.counter = Counter()
+        self.swarm = Swarm(num_bots)
+        self.agents = []
+        self.dirt_list = []
+        self.dirt_index = SpatialHash(PICKUP_RADIUS)
+        self.dirt_grid = DirtGrid(self.world.rows, self.world.cols, self.world.cell_size)
+        self.bot_index = SpatialHash(PROXIMITY_RADIUS)
+        # Optional trajectory of every pose and pickup, see save_trajectory()
+        self.recorder = TrajectoryRecorder(num_bots, max_steps) if record else None
+        self.timer = timer  # Optional profiling.PhaseTimer for per-phase step timing
+        self.bus = None
+        if comms is not None and strategy in (STRATEGY_SHARED_MAP, STRATEGY_COORDINATION):
+            self.bus = MessageBus(comms, self.swarm, share_positions=strategy == STRATEGY_COORDINATION)
+        elif comms is not None and strategy == STRATEGY_TASK_ALLOCATION:
+            raise ValueError("comms is not supported with task_allocation, whose allocator is centralised")
+        if event_driven and self.bus is not None:
+            raise ValueError("event_driven stepping does not support comms, whose messages arrive every step")
+        self.event_driven = event_driven
+        self.step_count = 0
+        self.steps_to_completion = None
+        self.stop_reason = None
+        self.check_started = None  # perf_counter() of the first check_stop()
+
+        # Place dirt objects randomly within the grid, outside obstacles
+        for i in range(num_dirt):
+            x, y = self.world.random_dirt_position(self.rng)
+            self.add_dirt(x, y, f"dirt{i}")
+
+        # Create robots and attach strategy-specific controllers
+        for i in range(num_bots):
+            self.add_bot(Bot(f"bot{i}", self.dirt_list, self.counter, self.swarm, self.dirt_index, self.rng,
+                             self.dirt_grid, self.world))
+        if self.allocator is not None:
+            self.allocator.assign_all({bot.name: bot.cell() for bot in self.agents})
+        if self.recorder is not None:
+            self.recorder.record_poses(0, self.swarm)
+        if renderer is not None:
+            renderer.attach(self)
+        if timer is not None:
+            timer.lap("setup", setup_start)
+
+    def add_dirt(self, x, y, name):
+        dirt = Dirt(x, y, name)
+        self.dirt_list.append(dirt)
+        self.dirt_index.insert(dirt, x, y)
+        self.dirt_grid.add(x, y)
+        if self.recorder is not None:
+            self.recorder.record_dirt(dirt)
+        return dirt
+
+    def add_bot(self, bot, belief=None, path=None):
+        """Gives bot a controller for this simulation's strategy and adds it; belief and path as for Brain."""
+        if self.bus is not None:
+            brain = Brain(bot, self.agents, self.strategy, None, None, self.path_cache, timer=self.timer,
+                          radio=self.bus.connect(bot), field_cache=self.field_cache, belief=belief, path=path)
+        else:
+            brain = Brain(bot, self.agents, self.strategy, self.bot_index, self.shared_belief, self.path_cache,
+                          self.allocator, self.timer, field_cache=self.field_cache, belief=belief, path=path)
         bot.set_brain(brain)
-        agents.append(bot)
-
-    step = 0
-
-    def loop():
-        nonlocal step
-        if canvas:
-            canvas.delete("bot")
-            canvas.delete("dirt")
-            for d in dirt_list:
-                canvas.create_oval(d.centreX - 5, d.centreY - 5, d.centreX + 5, d.centreY + 5, fill="gray", tags="dirt")
-
-        for bot in agents:
+        self.agents.append(bot)
+        self.bot_index.insert(bot, bot.x, bot.y)
+        return brain
+
+    def _event_horizon(self, limit):
+        """
+        After every bot has decided its wheel speeds, returns the number of steps, up to limit,
+        that can be taken before an event: a bot may pick up dirt, reach its waypoint, change
+        what it steers towards, or come within PROXIMITY_RADIUS of another bot. Until then each
+        bot's think() only alternates steer() between turning in place and driving straight,
+        which is replayed here. Also returns each bot's (xs, ys, thetas) after each of those
+        steps, computed with the same floating-point operations as Swarm.step(), so jumping
+        gives bit-identical poses. Returns (1, None) when the next step cannot be skipped.
+        """
+        swarm, n = self.swarm, self.swarm.count
+        sl, sr = swarm.sl[:n], swarm.sr[:n]
+        if limit < 2 or not ((sl == sr) | (sl == -sr)).all():
+            return 1, None  # Only driving straight and turning in place are predicted
+
+        targets = []
+        for bot in self.agents:
+            target = bot.brain.steady_target()
+            if target is None:
+                return 1, None
+            targets.append(target)
+
+        if self.strategy == STRATEGY_COORDINATION and n > 1:
+            # No pair may come within PROXIMITY_RADIUS before the last think() that is skipped;
+            # each step shrinks a distance by at most the two bots' top speeds
+            speed = np.where(sl == sr, np.abs(sr), 0.0)
+            steering = np.array([target is not STEADY_IDLE for target in targets])
+            speed = np.where(steering, np.maximum(speed, STEER_DRIVE[1]), speed)
+            gap = np.hypot(swarm.x[:n, None] - swarm.x[None, :n], swarm.y[:n, None] - swarm.y[None, :n])
+            closing = speed[:, None] + speed[None, :]
+            pairs = np.triu_indices(n, 1)
+            gap, closing = gap[pairs] - PROXIMITY_RADIUS - 1e-6, closing[pairs]
+            if (gap < 0).any():
+                return 1, None
+            moving = closing > 0
+            if moving.any():
+                limit = min(limit, int(np.min(gap[moving] / closing[moving])) + 1)
+                if limit < 2:
+                    return 1, None
+
+        # Every step is taken by all bots before the next, so the work is proportional to the
+        # horizon actually found. Python floats are faster than numpy scalars and round the same.
+        bots = [_Lane(target, float(swarm.x[i]), float(swarm.y[i]), float(swarm.theta[i]),
+                      float(sl[i]), float(sr[i]), float(swarm.ll[i]), self.dt)
+                for target, i in zip(targets, (bot.slot for bot in self.agents))]
+        dirt_index = self.dirt_index
+        for t in range(1, limit + 1):
+            event = t == limit
+            for lane in bots:
+                x, y, theta = lane.advance()
+                if event:
+                    continue
+                # Pickup at the end of step t; a bot standing still can only find dirt on the first
+                if (t == 1 or lane.moving) and dirt_index.first_within(x, y, PICKUP_RADIUS)[0] is not None:
+                    event = True
+                    continue
+                # think() at the start of the next step
+                target = lane.target
+                if target is STEADY_IDLE:
+                    event = lane.wheels != (0.0, 0.0)
+                    continue
+                tx, ty, radius = target
+                if radius is not None and math.hypot(tx - x, ty - y) < radius:
+                    event = True  # Waypoint reached; think() moves on along the path
+                    continue
+                wheels = steer(x, y, theta, tx, ty)
+                if wheels != lane.wheels:
+                    lane.set_wheels(*wheels)
+            if event:
+                if t < 2:
+                    return 1, None
+                return t, [(lane.xs, lane.ys, lane.thetas) for lane in bots]
+
+    def _jump(self, steps, poses):
+        """Moves every bot along the poses from _event_horizon() and counts its visits."""
+        swarm = self.swarm
+        for bot, (xs, ys, thetas) in zip(self.agents, poses):
+            swarm.x[bot.slot], swarm.y[bot.slot], swarm.theta[bot.slot] = xs[-1], ys[-1], thetas[-1]
+        if self.recorder is not None:
+            self.recorder.record_pose_rows(self.step_count + 1, *(np.array(column).T for column in zip(*poses)))
+        for bot, (xs, ys, _) in zip(self.agents, poses):
+            bot.record_visits(np.array(xs), np.array(ys))
+
+    # With a timer, each phase boundary charges the time since the previous one (t) to that phase.
+    # In event-driven mode one call may advance several steps; the timer then counts it as one.
+    def step(self):
+        timer = self.timer
+        if timer is not None:
+            step_start = t = time.perf_counter_ns()
+        renderer = self.renderer
+
+        bus = self.bus
+        if bus is not None:
+            bus.deliver(self.step_count)
+        # All bots decide first, then the whole swarm moves in one vectorized step
+        for bot in self.agents:
             bot.act()
-            bot.update(canvas, 0.1)
-            bot.collect_nearby_dirt(canvas)
-
-        if canvas is not None:
-            canvas.delete("status_text")
-            canvas.create_text(500, 20, text=f"Dirt Collected: {counter.dirt_collected}", fill="black",
-                               font=("Arial", 16), tags="status_text" )
-        print(f"[DEBUG] Dirt collected so far: {counter.dirt_collected}")
-
-        step += 1
-        if step < max_steps:
-            if root:
-                root.after(30, loop)
-            else:
-                loop()
+        if timer is not None:
+            t = timer.lap("think", t)
+        if bus is not None:
+            bus.flush(self.step_count)
+            if timer is not None:
+                t = timer.lap("comms", t)
+        steps, poses = 1, None
+        if self.event_driven:
+            limit = min(self.max_steps - self.step_count, EVENT_MAX_SKIP)
+            if renderer is not None:
+                # Never jump past a frame, so the canvas shows the same steps as with fixed stepping
+                limit = min(limit, renderer.drawn_step + renderer.render_every - self.step_count)
+            steps, poses = self._event_horizon(limit)
+            if timer is not None:
+                t = timer.lap("horizon", t)
+        recorder = self.recorder
+        if poses is not None:
+            self._jump(steps, poses)
+            if timer is not None:
+                t = timer.lap("move", t)
         else:
-            log_result(strategy, run_id, counter.dirt_collected, time.time() - counter.start_time)
-            for i, bot in enumerate(agents):
-                np.save(f"visit_grid_bot{i}.npy", bot.visit_grid)
-                print(f"[INFO] visit_grid_bot{i}.npy saved.")
-            if not headless and root is not None:
-                root.destroy()
+            self.swarm.step(self.dt)
+            if timer is not None:
+                t = timer.lap("move", t)
+            if recorder is not None:
+                recorder.record_poses(self.step_count + 1, self.swarm)
+                if timer is not None:
+                    t = timer.lap("record", t)
+        # Pickups can only happen at the end of the last step of a jump
+        last_step = self.step_count + steps
+        for bot in self.agents:
+            self.bot_index.move(bot, bot.x, bot.y)
+            if poses is None:
+                bot.record_visit()
+            if timer is not None:
+                t = timer.lap("index", t)
+            dirt = bot.collect_nearby_dirt(None)
+            if dirt is not None:
+                if recorder is not None:
+                    recorder.record_pickup(last_step, bot.slot, dirt)
+                if renderer is not None:
+                    renderer.dirt_collected(dirt)
+            if timer is not None:
+                t = timer.lap("pickup", t)
+        self.step_count = last_step
+        if not self.dirt_list and self.steps_to_completion is None:
+            self.steps_to_completion = self.step_count
+
+        if renderer is not None:
+            renderer.after_step(self)
+            if timer is not None:
+                t = timer.lap("render", t)
+        logger.debug("Dirt collected so far: %d", self.counter.dirt_collected)
+        if timer is not None:
+            t = timer.lap("logging", t)
+            timer.add_step(t - step_start)
+
+    def check_stop(self, conditions=None):
+        """Returns the name of the first met stop condition (max_steps included), or None."""
+        if self.check_started is None:
+            self.check_started = time.perf_counter()
+        if self.step_count >= self.max_steps:
+            return "max_steps"
+        for condition in self.stop_conditions if conditions is None else conditions:
+            if condition(self):
+                return condition.__name__
+        return None
+
+    def run(self, until=None):
+        """
+        Steps until a stop condition is met and returns the result dict.
+
+        Parameters:
+            until (iterable): Stop conditions to use instead of self.stop_conditions.
+        """
+        conditions = None if until is None else tuple(until)
+        timer = self.timer
+        while self.stop_reason is None:
+            if timer is not None:
+                start = time.perf_counter_ns()
+                self.stop_reason = self.check_stop(conditions)
+                timer.lap("stop_check", start)
+            else:
+                self.stop_reason = self.check_stop(conditions)
+            if self.stop_reason is None:
+                self.step()
+        return self.result()
+
+    def save_trajectory(self, path):
+        """Writes the recorded trajectory (see trajectory.py) to path; requires record=True."""
+        if self.recorder is None:
+            raise ValueError("this simulation was created without record=True")
+        return self.recorder.save(path, {
+            "strategy": self.strategy, "run_id": self.run_id, "seed": self.seed, "num_dirt": self.num_dirt,
+            "dt": self.dt, "stop_reason": self.stop_reason, "bot_names": [bot.name for bot in self.agents],
+            "world": world_metadata(self.world),
+        })
+
+    def result(self):
+        elapsed = time.time() - self.counter.start_time
+        return {
+            "strategy": self.strategy,
+            "run_id": self.run_id,
+            "seed": self.seed,
+            "num_bots": self.num_bots,
+            "num_dirt": self.num_dirt,
+            "max_steps": self.max_steps,
+            "world_rows": self.world.rows,
+            "world_cols": self.world.cols,
+            "steps": self.step_count,
+            "steps_to_completion": self.steps_to_completion,
+            "stop_reason": self.stop_reason,
+            "dirt_collected": self.counter.dirt_collected,
+            "per_bot_dirt": [self.counter.per_bot.get(bot.name, 0) for bot in self.agents],
+            "elapsed_time": elapsed,
+            "steps_per_sec": self.step_count / max(elapsed, 1e-9),
+            "visit_grids": [bot.visit_grid for bot in self.agents],
+            "obstacle_mask": self.world.blocked,
+            **({"timing": self.timer.report()} if self.timer is not None else {}),
+            **({"render": self.renderer.report()} if self.renderer is not None else {}),
+            **({"comms": dict(self.bus.stats)} if self.bus is not None else {}),
+            **({"fields": self.field_cache.stats()} if self.field_cache is not None else {}),
+        }
+
+# Drives a simulation from Tk's event loop and closes the window when it stops. Each tick
+# advances the simulation by the renderer's render_every steps, so one frame is drawn per
+# tick; ticks start interval_ms apart, or back to back when a tick takes longer than that.
+def run_gui(sim, root, interval_ms=30, on_finish=None):
+    steps_per_tick = sim.renderer.render_every if sim.renderer is not None else 1
+
+    def tick():
+        tick_start = time.perf_counter()
+        tick_end = sim.step_count + steps_per_tick  # An event-driven step() may advance several steps
+        while sim.step_count < tick_end:
+            sim.stop_reason = sim.check_stop()
+            if sim.stop_reason is not None:
+                break
+            sim.step()
+        if sim.stop_reason is None:
+            spent_ms = int((time.perf_counter() - tick_start) * 1000)
+            root.after(max(interval_ms - spent_ms, 1), tick)
+            return
+        if sim.renderer is not None:
+            if sim.step_count != sim.renderer.drawn_step:
+                sim.renderer.draw(sim)  # Show the final state when the last step was not a frame
+            logger.info("Rendered %d frames (every %d steps) at %.1f FPS", sim.renderer.frames,
+                        sim.renderer.render_every, sim.renderer.fps)
+        if on_finish is not None:
+            on_finish(sim.result())
+        root.destroy()
+
+    root.after(100, tick)
+    root.mainloop()
+
+# Experiment runner (GUI or headless)
+# Pass a seed to make the run reproducible; all randomness then comes from a private RNG.
+# With save_outputs=False nothing is written to disk, and the caller gets everything
+# it needs from the returned result dict (used by the parallel batch runner).
+# stop_conditions defaults to stopping once all dirt is gone or every bot is idle;
+# pass () to always run the full max_steps.
+# world sets the grid size, cell size and obstacles (default: the original 10x10 world).
+# With a trajectory_path the run is recorded there for replay (see trajectory.py).
+# instrument=True times each phase of the loop (see profiling.py); the report is returned
+# under result["timing"] and, with save_outputs, appended to TIMING_CSV. profiler runs the
+# whole experiment under "cprofile" or "pyinstrument" and writes the profile to profile_path.
+# In GUI runs the canvas is redrawn every render_every steps (see renderer.py); the achieved
+# FPS is logged and returned under result["render"].
+# comms (a comms.CommsConfig) makes the shared-map strategies communicate by message, with
+# latency, bandwidth and range limits; message counts are returned under result["comms"].
+# event_driven=True skips the steps in which nothing can happen; outcomes are unchanged.
+# flow_fields=True plans with distance fields shared by all bots (see flow_field.py).
+def run_experiment(strategy, run_id, num_bots=3, num_dirt=40, max_steps=1000, headless=False,
+                   seed=None, save_outputs=True, stop_conditions=DEFAULT_STOP_CONDITIONS, world=None,
+                   trajectory_path=None, instrument=False, profiler=None, profile_path=None, render_every=1,
+                   comms=None, event_driven=False, flow_fields=False):
+    record = trajectory_path is not None
+    timer = PhaseTimer(max_steps) if instrument else None
+    if profiler is not None and profile_path is None:
+        profile_path = f"profile_{strategy}_run{run_id}.{'html' if profiler == 'pyinstrument' else 'prof'}"
+
+    def finish(result):
+        if record:
+            sim.save_trajectory(trajectory_path)
+        if timer is not None:
+            logger.info("Timing for %s run #%d:\n%s", strategy, run_id, format_report(result["timing"]))
+        if save_outputs:
+            log_result(result)
+            save_visit_grids(result["visit_grids"], result["obstacle_mask"])
+            if timer is not None:
+                append_timing_csv(TIMING_CSV, [result])
 
     if headless:
-        while step < max_steps:
-            loop()
+        def simulate():
+            sim = Simulation(strategy, run_id, num_bots, num_dirt, max_steps, seed,
+                             stop_conditions=stop_conditions, world=world, record=record, timer=timer,
+                             comms=comms, event_driven=event_driven, flow_fields=flow_fields)
+            return sim, sim.run()
+
+        sim, result = run_profiled(simulate, profiler, profile_path) if profiler is not None else simulate()
+        finish(result)
+        return result
+
+    import tkinter as tk
+    root = tk.Tk()
+    world = world if world is not None else DEFAULT_WORLD
+    canvas = tk.Canvas(root, width=world.width, height=world.height, bg="white")
+    canvas.pack()
+    sim = Simulation(strategy, run_id, num_bots, num_dirt, max_steps, seed,
+                     stop_conditions=stop_conditions, world=world, record=record, timer=timer,
+                     renderer=TkRenderer(canvas, world, render_every), comms=comms,
+                     event_driven=event_driven, flow_fields=flow_fields)
+    results = []
+
+    def on_finish(result):
+        results.append(result)
+        finish(result)
+
+    if profiler is not None:
+        run_profiled(lambda: run_gui(sim, root, on_finish=on_finish), profiler, profile_path)
     else:
-        root.after(100, loop)
-        root.mainloop()
\ No newline at end of file
+        run_gui(sim, root, on_finish=on_finish)
+    # Closing the window early ends the mainloop without a stop condition; nothing is saved then
+    return results[0] if results else sim.result()
+
+if __name__ == "__main__":
+    from sim_log import configure_logging
+    configure_logging("INFO")
+    run_experiment(STRATEGY_COORDINATION, run_id=0)
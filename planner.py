@@ -0,0 +1,354 @@
+# planner.py
+# Description:
+# Incremental path planning for bots that keep replanning as dirt is cleaned.
+
+# - BeliefMap: a bot's (or a team's) dirt-count map, with a version number and a
+#   log of changed cells so planners can catch up with only what changed. Maps of
+#   several bots are combined with merge().
+# - DStarLite: D* Lite search towards a fixed goal. When cell costs change or the
+#   bot moves, it repairs only the affected part of its previous search.
+# - PathCache: LRU cache of planned paths keyed on (map, map version, start, goal).
+# - IncrementalPlanner: plans each new goal with one A* search, and builds a D* Lite
+#   search only for a goal it plans to again, where repairing beats searching afresh.
+# flow_field.py has FieldPlanner, an alternative to IncrementalPlanner whose searches
+# are shared by all bots.
+
+import heapq
+import itertools
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from aStar import NEIGHBOURS_4, NEIGHBOURS_8, aStarPlan, aStarSearch, dirtCostGrid
+
+_map_tokens = itertools.count()
+
+# Keys are rounded to this many decimals so float round-off in g + h + km cannot order
+# two equal keys the wrong way and stop the search with an inconsistent cell on the path
+KEY_DECIMALS = 9
+
+_adjacency_cache = {}  # (rows, cols, connectivity) -> adjacency lists shared by every DStarLite
+
+
+def _adjacency(rows, cols, neighbours):
+    """Per cell: (neighbour, step length, corner cells a diagonal move passes, or None)."""
+    key = (rows, cols, len(neighbours))
+    adjacency = _adjacency_cache.get(key)
+    if adjacency is None:
+        adjacency = []
+        for row in range(rows):
+            for col in range(cols):
+                cellEdges = []
+                for dr, dc, stepLength in neighbours:
+                    nr, nc = row + dr, col + dc
+                    if 0 <= nr < rows and 0 <= nc < cols:
+                        corners = (row * cols + nc, nr * cols + col) if dr and dc else None
+                        cellEdges.append((nr * cols + nc, stepLength, corners))
+                adjacency.append(cellEdges)
+        _adjacency_cache[key] = adjacency
+    return adjacency
+
+
+class BeliefMap:
+    def __init__(self, counts):
+        self.counts = counts
+        self.token = next(_map_tokens)  # Distinguishes maps with equal version numbers
+        self.changes = []               # Cells changed so far; len(changes) is the version
+
+    @property
+    def version(self):
+        return len(self.changes)
+
+    def changes_since(self, version):
+        return self.changes[version:]
+
+    def copy(self, keep_token=False):
+        """
+        Independent copy of the counts and change log. With keep_token the copy passes for
+        the same map in path caches, as when a forked simulation takes over a cache's entries.
+        """
+        copied = BeliefMap(self.counts.copy())
+        copied.changes = list(self.changes)
+        if keep_token:
+            copied.token = self.token
+        return copied
+
+    def clean(self, cell, amount=1):
+        """Removes up to amount dirt from a (row, col) cell; returns True if the map changed."""
+        if self.counts[cell] <= 0:
+            return False
+        self.counts[cell] = max(0, self.counts[cell] - amount)
+        self.changes.append(cell)
+        return True
+
+    def clear(self, cell):
+        return self.clean(cell, amount=self.counts[cell])
+
+    def merge(self, counts):
+        """
+        Merges another observation of the same world into this map; returns True if it changed.
+        Both maps count the same dirt, so each cell keeps the larger count rather than a sum.
+        """
+        merged = np.maximum(self.counts, counts)
+        changed = np.argwhere(merged != self.counts)
+        if len(changed) == 0:
+            return False
+        self.counts[...] = merged
+        self.changes.extend((int(row), int(col)) for row, col in changed)
+        return True
+
+    def has_dirt(self):
+        return bool(self.counts.any())
+
+    def nearest_dirty_cell(self, cell):
+        """Returns the dirty (row, col) cell closest to cell in grid steps, or None."""
+        rows, cols = np.nonzero(self.counts > 0)
+        if len(rows) == 0:
+            return None
+        distance = np.abs(rows - cell[0]) + np.abs(cols - cell[1])
+        best = int(np.argmin(distance))
+        return int(rows[best]), int(cols[best])
+
+
+class DStarLite:
+    """
+    D* Lite over a grid of cell entry costs (math.inf marks a blocked cell).
+    Searches backwards from the goal, so the start can move between calls.
+    """
+
+    def __init__(self, costGrid, start, goal, connectivity=4):
+        if connectivity not in (4, 8):
+            raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+        self.rows, self.cols = costGrid.shape
+        self.neighbours = NEIGHBOURS_8 if connectivity == 8 else NEIGHBOURS_4
+        self.cost = np.asarray(costGrid, dtype=np.float64).ravel().tolist()
+        self.adjacency = _adjacency(self.rows, self.cols, self.neighbours)
+        self.goal = self._index(goal)
+        self.start = self._index(start)
+        self.expansions = 0
+        self._reset()
+
+    def _index(self, cell):
+        return int(cell[0]) * self.cols + int(cell[1])
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["adjacency"]  # Rebuilt from (or shared through) the module cache on load
+        return state
+
+    def __setstate__(self, state):
+        # _h() tells the connectivity by identity, which unpickling would lose
+        self.__dict__.update(state)
+        self.neighbours = NEIGHBOURS_8 if len(self.neighbours) == len(NEIGHBOURS_8) else NEIGHBOURS_4
+        self.adjacency = _adjacency(self.rows, self.cols, self.neighbours)
+
+    def copy(self):
+        """Independent copy of the search state; the adjacency lists never change and are shared."""
+        copied = object.__new__(DStarLite)
+        copied.__dict__.update(self.__dict__)
+        copied.cost, copied.g, copied.rhs = list(self.cost), list(self.g), list(self.rhs)
+        copied.open, copied.heap = dict(self.open), list(self.heap)
+        return copied
+
+    def _reset(self):
+        n = self.rows * self.cols
+        finite = [c for c in self.cost if c != math.inf]
+        # Heuristic scale: no step can cost less than the cheapest cell
+        self.hScale = min(finite) if finite else 0.0
+        self.g = [math.inf] * n
+        self.rhs = [math.inf] * n
+        self.rhs[self.goal] = 0.0
+        self.km = 0.0
+        self.last = self.start
+        self.open = {}  # idx -> current key; heap entries with another key are stale
+        self.heap = []
+        self._push(self.goal, (self._h(self.start, self.goal), 0.0))
+
+    def _h(self, a, b):
+        ar, ac = divmod(a, self.cols)
+        br, bc = divmod(b, self.cols)
+        dr, dc = abs(ar - br), abs(ac - bc)
+        if self.neighbours is NEIGHBOURS_8:
+            return self.hScale * (max(dr, dc) + (math.sqrt(2) - 1) * min(dr, dc))
+        return self.hScale * (dr + dc)
+
+    def _key(self, idx):
+        k2 = min(self.g[idx], self.rhs[idx])
+        return (round(k2 + self._h(self.start, idx) + self.km, KEY_DECIMALS), round(k2, KEY_DECIMALS))
+
+    def _push(self, idx, key):
+        self.open[idx] = key
+        heapq.heappush(self.heap, (key, idx))
+
+    def _top(self):
+        while self.heap:
+            key, idx = self.heap[0]
+            if self.open.get(idx) == key:
+                return key, idx
+            heapq.heappop(self.heap)  # Stale entry
+        return (math.inf, math.inf), None
+
+    def _edges(self, idx):
+        # (neighbour, cost of moving idx -> neighbour); diagonal moves may not cut blocked corners
+        cost = self.cost
+        edges = []
+        for nIdx, stepLength, corners in self.adjacency[idx]:
+            if corners is not None and (cost[corners[0]] == math.inf or cost[corners[1]] == math.inf):
+                edges.append((nIdx, math.inf))
+            else:
+                edges.append((nIdx, stepLength * cost[nIdx]))
+        return edges
+
+    def _update_vertex(self, idx):
+        if idx != self.goal:
+            self.rhs[idx] = min((stepCost + self.g[n] for n, stepCost in self._edges(idx)), default=math.inf)
+        self.open.pop(idx, None)
+        if self.g[idx] != self.rhs[idx]:
+            self._push(idx, self._key(idx))
+
+    def _compute_shortest_path(self):
+        start = self.start
+        while True:
+            topKey, idx = self._top()
+            if idx is None or (topKey >= self._key(start) and self.rhs[start] <= self.g[start]):
+                return
+            self.expansions += 1
+            newKey = self._key(idx)
+            if topKey < newKey:
+                self._push(idx, newKey)
+            elif self.g[idx] > self.rhs[idx]:
+                self.g[idx] = self.rhs[idx]
+                del self.open[idx]
+                for n, _ in self._edges(idx):
+                    self._update_vertex(n)
+            else:
+                self.g[idx] = math.inf
+                self._update_vertex(idx)
+                for n, _ in self._edges(idx):
+                    self._update_vertex(n)
+
+    def move_to(self, start):
+        start = self._index(start)
+        if start != self.start:
+            self.start = start
+            self.km += self._h(self.last, start)
+            self.last = start
+
+    def update_cell(self, cell, cost):
+        idx = self._index(cell)
+        if self.cost[idx] == cost:
+            return
+        self.cost[idx] = cost
+        if cost < self.hScale:
+            # A cheaper cell would make the heuristic overestimate; start the search afresh
+            self._reset()
+            return
+        for n, _ in self._edges(idx):
+            self._update_vertex(n)
+
+    def plan(self, start=None):
+        """Returns the cheapest (row, col) path from start (or the last start) to the goal, or []."""
+        if start is not None:
+            self.move_to(start)
+        self._compute_shortest_path()
+        # rhs is the one-step lookahead cost, which is exact for the start once the search settles
+        if self.rhs[self.start] == math.inf:
+            return []
+        path = [divmod(self.start, self.cols)]
+        idx = self.start
+        for _ in range(self.rows * self.cols):
+            if idx == self.goal:
+                return path
+            idx = min(self._edges(idx), key=lambda edge: edge[1] + self.g[edge[0]])[0]
+            path.append(divmod(idx, self.cols))
+        return []
+
+
+class PathCache:
+    """Least-recently-used cache of paths keyed on (map token, map version, start, goal)."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return path
+
+    def copy(self):
+        """Copy with the same entries; paths are never modified, so they are shared."""
+        copied = PathCache(self.maxsize)
+        copied.entries = OrderedDict(self.entries)
+        return copied
+
+    def put(self, key, path):
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+
+class IncrementalPlanner:
+    """
+    Plans a bot's route to the nearest dirty cell of its BeliefMap. The nearest dirt
+    changes on most replans, and a D* Lite search costs several A* searches to set up, so
+    the first plan to a goal is a plain A* search. Planning to the same goal again builds
+    a D* Lite search, which is then reused while the goal stays the same, replaying only
+    the changed cells into it.
+    """
+
+    def __init__(self, belief, cache=None, blocked=None):
+        self.belief = belief
+        self.cache = cache
+        self.blocked = blocked  # Optional boolean mask of cells that cannot be entered
+        self.search = None
+        self.goal = None
+        self.synced_version = 0
+
+    def plan(self, start, goal=None):
+        """Plans to goal, or to the nearest dirty cell when no goal is given."""
+        if goal is None:
+            goal = self.goal
+            if goal is None or self.belief.counts[goal] <= 0:
+                goal = self.belief.nearest_dirty_cell(start)
+        if goal is None:
+            return []
+        key = (self.belief.token, self.belief.version, tuple(start), goal)
+        if self.cache is not None:
+            path = self.cache.get(key)
+            if path is not None:
+                if goal != self.goal:
+                    self.search = None  # Built for the old goal
+                self.goal = goal
+                return path
+
+        if goal != self.goal:
+            self.search = None
+            path = aStarPlan(dirtCostGrid(self.belief.counts), start, goal, blocked=self.blocked)
+        else:
+            if self.search is None:
+                costGrid = dirtCostGrid(self.belief.counts)
+                if self.blocked is not None:
+                    costGrid[self.blocked] = math.inf
+                self.search = DStarLite(costGrid, start, goal)
+                self.synced_version = self.belief.version
+            for cell in self.belief.changes_since(self.synced_version):
+                if self.blocked is None or not self.blocked[cell]:
+                    self.search.update_cell(cell, 1.0 / (1.0 + max(self.belief.counts[cell], 0)))
+            self.synced_version = self.belief.version
+            path = self.search.plan(start)
+        self.goal = goal
+        if self.cache is not None:
+            self.cache.put(key, path)
+        return path
+
+    def sweep(self):
+        """The initial corner-to-corner route, from the bottom-right cell to (0, 0)."""
+        return aStarSearch(self.belief.counts, self.blocked) or []
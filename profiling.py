@@ -0,0 +1,170 @@
+# profiling.py
+# Description:
+# Per-phase timing of the simulation loop, and optional whole-run profiler hooks.
+
+# PhaseTimer accumulates nanosecond totals and call counts per named phase (setup,
+# think, plan, proximity, move, pickup, render, ...). Callers read perf_counter_ns()
+# themselves and pass the start time to lap(), which charges the phase and returns the
+# clock for the next phase, so each boundary costs one clock read and a list update.
+# Whole-step durations go into a preallocated array so steps/sec and step-time
+# percentiles can be reported at the end of a run.
+
+# run_profiled() wraps a call in cProfile or pyinstrument (if installed) and writes the
+# profile next to the other outputs.
+
+import csv
+import os
+from time import perf_counter_ns
+import numpy as np
+
+PHASES = (
+    "setup",      # Simulation construction, including each Brain's initial sweep plan
+    "think",      # Brain.think for all bots (includes plan and proximity below)
+    "plan",       # Replanning towards dirt (part of think)
+    "proximity",  # check_proximity for coordinating bots (part of think)
+    "comms",      # Sending messages between bots (see comms.py)
+    "horizon",    # Finding how many steps an event-driven simulation can skip
+    "move",       # Vectorized swarm step, or an event-driven jump
+    "index",      # Spatial index and visit grid updates
+    "pickup",     # collect_nearby_dirt
+    "record",     # Trajectory recording
+    "render",     # Tk canvas updates
+    "logging",    # Per-step log calls
+    "stop_check", # Evaluating stop conditions
+)
+# Phases that are timed inside another phase and must not be added to its total again
+NESTED_PHASES = {"plan": "think", "proximity": "think"}
+STEP_PERCENTILES = (50, 90, 99)
+TIMING_COLUMNS = ["strategy", "run_id", "seed", "num_bots", "world_rows", "world_cols", "phase",
+                  "calls", "total_s", "mean_us", "share"]
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class PhaseTimer:
+    def __init__(self, max_steps=1000):
+        self.totals = {phase: [0, 0] for phase in PHASES}  # phase -> [total ns, calls]
+        self.step_ns = np.zeros(max_steps, dtype=np.int64)
+        self.steps = 0
+
+    def add(self, phase, elapsed_ns):
+        entry = self.totals.get(phase)
+        if entry is None:
+            entry = self.totals[phase] = [0, 0]
+        entry[0] += elapsed_ns
+        entry[1] += 1
+
+    def lap(self, phase, start_ns):
+        """Charges the time since start_ns to phase and returns the current clock, for chaining."""
+        now = perf_counter_ns()
+        entry = self.totals[phase]  # Unlike add(), only for the predefined PHASES; this is the hot path
+        entry[0] += now - start_ns
+        entry[1] += 1
+        return now
+
+    def add_step(self, elapsed_ns):
+        if self.steps == len(self.step_ns):
+            self.step_ns = np.concatenate([self.step_ns, np.zeros(max(1, len(self.step_ns)), dtype=np.int64)])
+        self.step_ns[self.steps] = elapsed_ns
+        self.steps += 1
+
+    def report(self):
+        """
+        Returns a dict with steps, steps_per_sec, step_us_p50/p90/p99 and, under 'phases',
+        {phase: {calls, total_s, mean_us, share}} where share is the fraction of the
+        total time of all top-level phases.
+        """
+        step_ns = self.step_ns[:self.steps]
+        top_level = sum(total for phase, (total, _) in self.totals.items() if phase not in NESTED_PHASES)
+        phases = {}
+        for phase, (total, calls) in self.totals.items():
+            if calls == 0:
+                continue
+            phases[phase] = {
+                "calls": calls,
+                "total_s": total / 1e9,
+                "mean_us": total / calls / 1e3,
+                "share": total / top_level if top_level else 0.0,
+            }
+        report = {
+            "steps": self.steps,
+            "steps_per_sec": self.steps / (step_ns.sum() / 1e9) if self.steps and step_ns.sum() else 0.0,
+            "phases": phases,
+        }
+        for p in STEP_PERCENTILES:
+            report[f"step_us_p{p}"] = float(np.percentile(step_ns, p)) / 1e3 if self.steps else float("nan")
+        return report
+
+
+def format_report(report):
+    """Human-readable table of a PhaseTimer report."""
+    lines = [f"{report['steps']} steps, {report['steps_per_sec']:.0f} steps/s, step time "
+             + ", ".join(f"p{p} {report[f'step_us_p{p}']:.1f} us" for p in STEP_PERCENTILES),
+             f"{'phase':>12} {'calls':>8} {'total (s)':>10} {'mean (us)':>10} {'share':>7}"]
+    for phase, entry in sorted(report["phases"].items(), key=lambda item: -item[1]["total_s"]):
+        nested = f" (in {NESTED_PHASES[phase]})" if phase in NESTED_PHASES else ""
+        lines.append(f"{phase:>12} {entry['calls']:>8} {entry['total_s']:>10.4f} {entry['mean_us']:>10.1f} "
+                     f"{entry['share']:>6.1%}{nested}")
+    return "\n".join(lines)
+
+
+def timing_rows(result):
+    """Long-format rows (one per phase) of the 'timing' report in a run_experiment() result."""
+    report = result.get("timing")
+    if report is None:
+        return []
+    base = {column: result.get(column) for column in TIMING_COLUMNS[:6]}
+    rows = [dict(base, phase=phase, calls=entry["calls"], total_s=round(entry["total_s"], 6),
+                 mean_us=round(entry["mean_us"], 3), share=round(entry["share"], 4))
+            for phase, entry in report["phases"].items()]
+    # Whole-step figures as pseudo-phases, so one file holds everything
+    rows.append(dict(base, phase="steps_per_sec", calls=report["steps"], total_s="",
+                     mean_us=round(report["steps_per_sec"], 1), share=""))
+    for p in STEP_PERCENTILES:
+        rows.append(dict(base, phase=f"step_p{p}", calls=report["steps"], total_s="",
+                         mean_us=round(report[f"step_us_p{p}"], 3), share=""))
+    return rows
+
+
+def append_timing_csv(path, results):
+    """Appends the timing rows of several results to a CSV, writing the header when the file is new."""
+    rows = [row for result in results for row in timing_rows(result)]
+    if not rows:
+        return
+    write_header = not os.path.exists(path) or os.path.getsize(path) == 0
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TIMING_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_profiled(fn, profiler, path):
+    """
+    Calls fn() under a profiler and writes its output to path; returns fn()'s result.
+
+    Parameters:
+        profiler (str): "cprofile" (pstats file, view with python -m pstats) or
+            "pyinstrument" (HTML report; needs the pyinstrument package).
+        path (str): Output file.
+    """
+    if profiler == "cprofile":
+        import cProfile
+        profile = cProfile.Profile()
+        result = profile.runcall(fn)
+        profile.dump_stats(path)
+        return result
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as error:
+            raise ImportError("profiler='pyinstrument' needs the pyinstrument package") from error
+        profile = Profiler()
+        profile.start()
+        try:
+            result = fn()
+        finally:
+            profile.stop()
+        with open(path, "w") as f:
+            f.write(profile.output_html())
+        return result
+    raise ValueError(f"profiler must be one of {PROFILERS}, got {profiler}")
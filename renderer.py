@@ -0,0 +1,117 @@
+# renderer.py
+# Description:
+# Tk canvas renderer for live simulations.
+
+# TkRenderer creates every canvas item once, when it is attached to a Simulation:
+# obstacles, one oval per dirt patch, one oval per bot and the status text. After that
+# a frame only moves the bot ovals with canvas.coords() and rewrites the status text;
+# a dirt oval is deleted when that patch is collected and at no other time. Frames are
+# drawn every render_every simulation steps, so the simulation can run faster than the
+# canvas is redrawn. The renderer counts frames and reports the achieved FPS.
+
+from time import perf_counter
+
+BOT_COLOURS = ("blue", "red", "green")  # By bot slot; further bots are drawn black
+BOT_RADIUS = 10
+DIRT_RADIUS = 5
+FPS_WINDOW = 1.0  # Seconds over which the FPS shown in the status text is measured
+
+
+def bot_colour(slot):
+    return BOT_COLOURS[slot] if slot < len(BOT_COLOURS) else "black"
+
+
+class TkRenderer:
+    def __init__(self, canvas, world, render_every=1):
+        """
+        Parameters:
+            canvas: Tk canvas (or anything with the same create_*/coords/itemconfigure/delete methods).
+            world (WorldConfig): World being drawn, for obstacles and the status text position.
+            render_every (int): Draw a frame after every render_every-th simulation step.
+        """
+        if render_every < 1:
+            raise ValueError(f"render_every must be at least 1, got {render_every}")
+        self.canvas = canvas
+        self.world = world
+        self.render_every = render_every
+        self.dirt_items = {}  # Dirt object -> canvas item id
+        self.bot_items = []   # Canvas item id per bot, in the simulation's agent order
+        self.status_item = None
+        self.drawn_step = 0      # Simulation step shown by the latest frame from after_step()
+        self.frames = 0
+        self.first_frame = None  # perf_counter() of the first and latest frames
+        self.last_frame = None
+        self.window_start = None
+        self.window_frames = 0
+        self.current_fps = 0.0   # FPS over the last complete FPS_WINDOW
+
+    def attach(self, sim):
+        """Creates the canvas items for a simulation's world, dirt and bots."""
+        canvas, size = self.canvas, self.world.cell_size
+        for row, col in zip(*self.world.blocked.nonzero()):
+            canvas.create_rectangle(col * size, row * size, (col + 1) * size, (row + 1) * size,
+                                    fill="dim gray", outline="", tags="obstacle")
+        for dirt in sim.dirt_list:
+            self.add_dirt(dirt)
+        self.bot_items = [canvas.create_oval(*self._bot_box(bot.x, bot.y), fill=bot_colour(i), tags=("bot", bot.name))
+                          for i, bot in enumerate(sim.agents)]
+        self.status_item = canvas.create_text(self.world.width / 2, 20, text=self._status(sim), fill="black",
+                                              font=("Arial", 16), tags="status_text")
+
+    @staticmethod
+    def _bot_box(x, y):
+        return x - BOT_RADIUS, y - BOT_RADIUS, x + BOT_RADIUS, y + BOT_RADIUS
+
+    def add_dirt(self, dirt):
+        x, y = dirt.centreX, dirt.centreY
+        self.dirt_items[dirt] = self.canvas.create_oval(x - DIRT_RADIUS, y - DIRT_RADIUS, x + DIRT_RADIUS,
+                                                        y + DIRT_RADIUS, fill="gray", tags=("dirt", dirt.name))
+
+    def dirt_collected(self, dirt):
+        item = self.dirt_items.pop(dirt, None)
+        if item is not None:
+            self.canvas.delete(item)
+
+    def after_step(self, sim):
+        """Called by the simulation after each step (or jump); draws a frame every render_every steps."""
+        if sim.step_count - self.drawn_step >= self.render_every:
+            self.drawn_step = sim.step_count
+            self.draw(sim)
+
+    def draw(self, sim):
+        """Moves the bot ovals to the bots' current positions and updates the status text."""
+        canvas, items = self.canvas, self.bot_items
+        xs, ys = sim.swarm.x, sim.swarm.y
+        for i, bot in enumerate(sim.agents):
+            x, y = xs[bot.slot], ys[bot.slot]
+            canvas.coords(items[i], x - BOT_RADIUS, y - BOT_RADIUS, x + BOT_RADIUS, y + BOT_RADIUS)
+        self._count_frame()
+        canvas.itemconfigure(self.status_item, text=self._status(sim))
+
+    def _status(self, sim):
+        text = f"Dirt Collected: {sim.counter.dirt_collected}"
+        # Until the first FPS_WINDOW has passed, show the average so far
+        fps = self.current_fps or self.fps
+        return f"{text} | {fps:.0f} FPS" if fps else text
+
+    def _count_frame(self):
+        now = perf_counter()
+        self.frames += 1
+        if self.first_frame is None:
+            self.first_frame = self.window_start = now
+        self.last_frame = now
+        self.window_frames += 1
+        elapsed = now - self.window_start
+        if elapsed >= FPS_WINDOW:
+            self.current_fps = (self.window_frames - 1) / elapsed
+            self.window_start, self.window_frames = now, 1
+
+    @property
+    def fps(self):
+        """Average frames per second between the first and the latest frame."""
+        if self.frames < 2 or self.last_frame == self.first_frame:
+            return 0.0
+        return (self.frames - 1) / (self.last_frame - self.first_frame)
+
+    def report(self):
+        return {"frames": self.frames, "render_every": self.render_every, "fps": self.fps}
@@ -0,0 +1,163 @@
+# result_cache.py
+# Description:
+# Content-addressed on-disk cache of experiment results, so batch sweeps only run new points.
+
+# A seeded run's result is a pure function of its parameters (strategy, seed, bots, dirt,
+# steps, world, comms, planner) and of the simulator's source code. run_key() hashes all of these,
+# including a digest of the source of every module that affects a run, into the name of
+# the file the result is stored under; editing the simulator therefore starts a fresh
+# set of keys instead of serving stale results. Results are written as soon as each run
+# finishes, so an interrupted sweep resumes where it stopped. The cache is bounded in
+# size: once it grows past max_bytes, the least recently used results are deleted.
+
+import functools
+import hashlib
+import importlib.util
+import json
+import os
+import pickle
+
+import numpy as np
+
+from sim_log import get_logger
+from world import DEFAULT_WORLD
+
+logger = get_logger("cache")
+
+DEFAULT_CACHE_DIR = "result_cache"
+DEFAULT_MAX_BYTES = 256 * 2**20
+EVICT_TO = 0.9  # Eviction deletes down to this fraction of max_bytes, so it runs rarely
+
+# Modules whose source determines a run's outcome
+CODE_MODULES = ("multi_robot_coordination_experiment", "aStar", "planner", "swarm", "spatial_index",
+                "dirt_grid", "world", "task_allocation", "comms", "flow_field")
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(modules=CODE_MODULES):
+    """SHA-256 of the source of the given modules."""
+    digest = hashlib.sha256()
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.origin is None:
+            raise ImportError(f"cannot find the source of module {name}")
+        with open(spec.origin, "rb") as f:
+            digest.update(name.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def _world_params(world):
+    world = world if world is not None else DEFAULT_WORLD
+    return {"rows": world.rows, "cols": world.cols, "cell_size": world.cell_size,
+            "spawn_range": list(world.spawn_range),
+            "blocked": hashlib.sha256(np.packbits(world.blocked).tobytes()).hexdigest()}
+
+
+def run_params(task):
+    """The parameters of a batch task that determine its result."""
+    comms = task.get("comms")
+    return {
+        "strategy": task["strategy"],
+        "seed": task["seed"],
+        "num_bots": task["num_bots"],
+        "num_dirt": task["num_dirt"],
+        "max_steps": task["max_steps"],
+        "world": _world_params(task.get("world")),
+        "comms": None if comms is None else {"latency": comms.latency, "bandwidth": comms.bandwidth,
+                                             "range": comms.range},
+        "flow_fields": task.get("flow_fields", False),
+    }
+
+
+def run_key(task, version=None):
+    """Hex key of a batch task: a hash of run_params(task) and the code version."""
+    params = dict(run_params(task), code=version if version is not None else code_version())
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Parameters:
+            directory (str): Where results are stored, one file per key.
+            max_bytes (int): Size above which least recently used results are deleted; None for unbounded.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        # Two-character subdirectories keep directory listings short in large caches
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        """Yields (path, size, last use time) of every stored result."""
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".pkl"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key):
+        """Returns the stored result for key, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as error:
+            logger.warning("Discarding unreadable cache entry %s (%s)", path, error)
+            self._remove(path)
+            self.misses += 1
+            return None
+        os.utime(path)  # Marks the entry as recently used
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """Stores result under key, replacing the file atomically, then evicts if over max_bytes."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.total_bytes += os.path.getsize(path) - previous
+        if self.max_bytes is not None and self.total_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICT_TO))
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.total_bytes -= size
+
+    def evict(self, target_bytes=0):
+        """Deletes least recently used results until at most target_bytes remain; returns how many."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)  # Also picks up other processes' writes
+        removed = 0
+        for path, _, _ in entries:
+            if self.total_bytes <= target_bytes:
+                break
+            self._remove(path)
+            removed += 1
+        if removed:
+            logger.info("Evicted %d cached results from %s", removed, self.directory)
+        return removed
+
+    def clear(self):
+        return self.evict(0)
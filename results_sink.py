@@ -0,0 +1,231 @@
+# results_sink.py
+# Description:
+# Buffered, structured writer for experiment results.
+
+# Rows are collected in memory and flushed in one go. Each flush holds an exclusive
+# lock on '<path>.lock' and appends all buffered rows with a single write, so rows
+# from concurrent writers never interleave. A columnar copy (.npz, or .parquet when
+# pandas/pyarrow are installed) can be kept next to the CSV for fast loading of large
+# sweeps. Flushed rows are kept as compact column arrays and the columnar file is
+# written once, when the writer is closed, so a sweep costs one rewrite rather than one
+# per flush. It is rewritten through a temporary file and os.replace, so readers never
+# see a partial file.
+
+# A file with another column layout (e.g. from an older version) is moved aside to
+# '<name>.legacy.csv', or '<name>.legacy.<n>.csv' if that exists, before new rows are
+# written; earlier legacy files are never overwritten.
+
+import csv
+import io
+import os
+import time
+import numpy as np
+from sim_log import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+RESULT_COLUMNS = [
+    "strategy",
+    "run_id",
+    "seed",
+    "num_bots",
+    "num_dirt",
+    "max_steps",
+    "world_rows",           # World size in cells, see world.WorldConfig
+    "world_cols",
+    "steps",
+    "steps_to_completion",  # Step at which the last dirt was collected, empty if never
+    "stop_reason",          # Stop condition that ended the run, e.g. max_steps or all_bots_idle
+    "dirt_collected",
+    "per_bot_dirt",         # Dirt collected by each bot, ';'-separated in bot order
+    "elapsed_time",
+    "steps_per_sec",
+]
+INT_COLUMNS = {"run_id", "seed", "num_bots", "num_dirt", "max_steps", "world_rows", "world_cols", "steps",
+               "steps_to_completion", "dirt_collected"}
+FLOAT_COLUMNS = {"elapsed_time", "steps_per_sec"}
+
+logger = get_logger("results")
+
+# Column names of the original header-less results.csv
+LEGACY_COLUMNS = ["strategy", "run_id", "dirt_collected", "elapsed_time"]
+
+
+def move_aside(path):
+    """Renames path to the first free '<stem>.legacy[.<n>]<ext>' name and returns that name."""
+    stem, extension = os.path.splitext(path)
+    legacy_path, n = f"{stem}.legacy{extension}", 1
+    while os.path.exists(legacy_path):
+        legacy_path, n = f"{stem}.legacy.{n}{extension}", n + 1
+    os.rename(path, legacy_path)
+    return legacy_path
+
+
+class _FileLock:
+    """Exclusive inter-process lock held on a side file for the duration of a with-block."""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self.fd, 0, os.SEEK_SET)
+            msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+        os.close(self.fd)
+        self.fd = None
+
+
+def result_row(result):
+    """Converts a run_experiment() result dict into a row with RESULT_COLUMNS keys."""
+    row = {column: result.get(column) for column in RESULT_COLUMNS}
+    per_bot = result.get("per_bot_dirt")
+    if per_bot is not None and not isinstance(per_bot, str):
+        row["per_bot_dirt"] = ";".join(str(count) for count in per_bot)
+    if row["elapsed_time"] is not None:
+        row["elapsed_time"] = round(row["elapsed_time"], 4)
+    if row["steps_per_sec"] is None and row["steps"] and row["elapsed_time"]:
+        row["steps_per_sec"] = row["steps"] / row["elapsed_time"]
+    if row["steps_per_sec"] is not None:
+        row["steps_per_sec"] = round(row["steps_per_sec"], 1)
+    return row
+
+
+class ResultsWriter:
+    def __init__(self, csv_path="results.csv", columnar_path=None, flush_every=100):
+        """
+        Parameters:
+            csv_path (str): CSV file rows are appended to (header written when the file is new).
+            columnar_path (str): Optional '.npz' or '.parquet' file kept in sync with the CSV.
+            flush_every (int): Buffered row count that triggers an automatic flush.
+        """
+        if columnar_path is not None and not columnar_path.endswith((".npz", ".parquet")):
+            raise ValueError(f"columnar_path must end in .npz or .parquet, got {columnar_path}")
+        self.csv_path = csv_path
+        self.columnar_path = columnar_path
+        self.flush_every = flush_every
+        self.buffer = []
+        self.pending_columns = []  # Column dicts of flushed rows not yet in the columnar file
+
+    def add(self, result):
+        self.buffer.append(result_row(result))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        with _FileLock(self.csv_path + ".lock"):
+            self._append_csv(rows)
+        if self.columnar_path is not None:
+            self.pending_columns.append(_rows_to_columns(rows))
+
+    def close(self):
+        """Flushes the remaining rows and writes the columnar file."""
+        self.flush()
+        if self.pending_columns:
+            chunks, self.pending_columns = self.pending_columns, []
+            with _FileLock(self.csv_path + ".lock"):
+                self._append_columnar(chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _append_csv(self, rows):
+        if os.path.exists(self.csv_path) and os.path.getsize(self.csv_path) > 0:
+            with open(self.csv_path, newline="") as f:
+                header = next(csv.reader(f), [])
+            if header != RESULT_COLUMNS:
+                # Keep old-format results rather than mixing two schemas in one file
+                legacy_path = move_aside(self.csv_path)
+                logger.warning("%s has an old column layout; moved it to %s", self.csv_path, legacy_path)
+        write_header = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+
+        text = io.StringIO()
+        writer = csv.DictWriter(text, fieldnames=RESULT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+        with open(self.csv_path, "a", newline="") as f:
+            f.write(text.getvalue())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append_columnar(self, chunks):
+        if os.path.exists(self.columnar_path):
+            existing = _read_columnar(self.columnar_path)
+            if sorted(existing) != sorted(RESULT_COLUMNS):
+                legacy_path = move_aside(self.columnar_path)
+                logger.warning("%s has an old column layout; moved it to %s", self.columnar_path, legacy_path)
+            else:
+                chunks = [existing] + chunks
+        columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in RESULT_COLUMNS}
+        # Temp name keeps the real extension so np.savez does not append another one
+        tmp_path = f"{self.columnar_path}.tmp{os.getpid()}{os.path.splitext(self.columnar_path)[1]}"
+        if self.columnar_path.endswith(".npz"):
+            np.savez(tmp_path, **columns)
+        else:
+            import pandas as pd
+            pd.DataFrame(columns).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.columnar_path)
+
+
+def _rows_to_columns(rows):
+    columns = {}
+    for name in RESULT_COLUMNS:
+        values = [row.get(name) for row in rows]
+        if name in INT_COLUMNS:
+            # -1 marks a missing value, e.g. a run that never finished cleaning
+            columns[name] = np.array([-1 if v is None or v == "" else int(v) for v in values], dtype=np.int64)
+        elif name in FLOAT_COLUMNS:
+            columns[name] = np.array([np.nan if v is None or v == "" else float(v) for v in values], dtype=np.float64)
+        else:
+            columns[name] = np.array(["" if v is None else str(v) for v in values])
+    return columns
+
+
+def _read_columnar(path):
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+    import pandas as pd
+    frame = pd.read_parquet(path)
+    return {name: frame[name].to_numpy() for name in frame.columns}
+
+
+def load_results(path="results.csv"):
+    """
+    Loads results from a CSV, .npz or .parquet file into a pandas DataFrame.
+    Header-less CSVs from before the structured writer are read with LEGACY_COLUMNS.
+    """
+    import pandas as pd
+    if path.endswith((".npz", ".parquet")):
+        return pd.DataFrame(_read_columnar(path))
+    with open(path, newline="") as f:
+        header = next(csv.reader(f), [])
+    if header and header[0] == RESULT_COLUMNS[0]:
+        return pd.read_csv(path)
+    return pd.read_csv(path, names=LEGACY_COLUMNS)
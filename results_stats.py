@@ -0,0 +1,327 @@
+# results_stats.py
+# Description:
+# Streaming per-strategy statistics over experiment results.
+
+# ResultsAggregator keeps, for every strategy and metric, a running mean/variance
+# (Welford's algorithm) and a quantile sketch, and sums the visit heatmaps of every
+# bot in every run. Runs are added one at a time as they complete, so reports for
+# sweeps of any size are produced without ever holding the raw rows in memory.
+# Aggregators can be merged (e.g. across workers or batches) and saved to a .npz file.
+
+# QuantileSketch is a DDSketch: values are counted in logarithmic buckets, so any
+# quantile is returned within a fixed relative error using memory that grows only
+# with the log of the value range.
+
+import csv
+import math
+import os
+from statistics import NormalDist
+import numpy as np
+from results_sink import LEGACY_COLUMNS, RESULT_COLUMNS
+
+# Metrics summarised per strategy; missing values (e.g. runs that never finished) are skipped
+STAT_COLUMNS = ["dirt_collected", "elapsed_time", "steps", "steps_to_completion", "steps_per_sec"]
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+
+def t_quantile(p, df):
+    """
+    Quantile p of Student's t distribution with df degrees of freedom. Exact for df 1 and
+    2; a Cornish-Fisher expansion around the normal quantile otherwise (within 1%
+    for df >= 3 up to 99% confidence).
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    terms = ((z ** 3 + z) / 4,
+             (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96,
+             (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384,
+             (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160)
+    return z + sum(term / df ** (i + 1) for i, term in enumerate(terms))
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of numbers (Welford's algorithm)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Combines another RunningStats into this one (Chan et al. parallel update)."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        """Sample variance (n - 1 denominator, as pandas' var()); nan for fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def half_width(self, confidence=0.95, count=None):
+        """
+        Half-width of the t confidence interval of the mean; inf for fewer than two values.
+        With count, the half-width expected after count values if the spread stays the same.
+        """
+        count = self.count if count is None else count
+        if self.count < 2 or count < 2:
+            return math.inf
+        return t_quantile(0.5 + confidence / 2, count - 1) * self.std / math.sqrt(count)
+
+    def to_array(self):
+        return np.array([self.count, self.mean, self.m2, self.min, self.max], dtype=np.float64)
+
+    @classmethod
+    def from_array(cls, values):
+        stats = cls()
+        stats.count = int(values[0])
+        stats.mean, stats.m2, stats.min, stats.max = (float(v) for v in values[1:])
+        return stats
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch (DDSketch) with a fixed relative error.
+
+    Parameters:
+        relative_accuracy (float): Returned quantiles are within this fraction of the true value.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.positive = {}  # Bucket index -> count, for values > 0
+        self.negative = {}  # Same, for the magnitudes of values < 0
+        self.zero_count = 0
+        self.count = 0
+
+    def _bucket(self, magnitude):
+        return math.ceil(math.log(magnitude) / self.log_gamma)
+
+    def _value(self, bucket):
+        # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        if value > 0:
+            bucket = self._bucket(value)
+            self.positive[bucket] = self.positive.get(bucket, 0) + count
+        elif value < 0:
+            bucket = self._bucket(-value)
+            self.negative[bucket] = self.negative.get(bucket, 0) + count
+        else:
+            self.zero_count += count
+        self.count += count
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches with different relative accuracy")
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for bucket, count in theirs.items():
+                mine[bucket] = mine.get(bucket, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), or nan when the sketch is empty."""
+        if not 0 <= q <= 1:
+            raise ValueError(f"q must be in [0, 1], got {q}")
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # Negative values in increasing order are the largest magnitudes first
+        for bucket in sorted(self.negative, reverse=True):
+            seen += self.negative[bucket]
+            if seen > rank:
+                return -self._value(bucket)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for bucket in sorted(self.positive):
+            seen += self.positive[bucket]
+            if seen > rank:
+                return self._value(bucket)
+        return self._value(max(self.positive))
+
+    def to_array(self):
+        # Rows of (sign, bucket, count); sign 0 holds the zero count
+        rows = [(1, bucket, count) for bucket, count in self.positive.items()]
+        rows += [(-1, bucket, count) for bucket, count in self.negative.items()]
+        rows.append((0, 0, self.zero_count))
+        return np.array(rows, dtype=np.int64)
+
+    @classmethod
+    def from_array(cls, rows, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        sketch = cls(relative_accuracy)
+        for sign, bucket, count in rows.tolist():
+            if sign > 0:
+                sketch.positive[bucket] = count
+            elif sign < 0:
+                sketch.negative[bucket] = count
+            else:
+                sketch.zero_count = count
+            sketch.count += count
+        return sketch
+
+
+class StrategyStats:
+    """Running statistics, quantile sketches and the summed visit heatmap of one strategy."""
+
+    def __init__(self):
+        self.stats = {column: RunningStats() for column in STAT_COLUMNS}
+        self.sketches = {column: QuantileSketch() for column in STAT_COLUMNS}
+        self.heatmap = None        # Sum of all bots' visit grids over all runs
+        self.heatmap_runs = 0
+        self.obstacle_mask = None  # Blocked cells of the world the heatmap was recorded in
+
+    @property
+    def runs(self):
+        return self.stats[STAT_COLUMNS[0]].count
+
+    def add_row(self, row):
+        for column in STAT_COLUMNS:
+            value = row.get(column)
+            if value is None or value == "":
+                continue
+            value = float(value)
+            if math.isnan(value) or value == -1:  # -1 marks a missing value in columnar files
+                continue
+            self.stats[column].add(value)
+            self.sketches[column].add(value)
+
+    def add_visit_grids(self, visit_grids, obstacle_mask=None, runs=1):
+        total = np.sum(visit_grids, axis=0, dtype=np.int64)
+        if self.heatmap is None:
+            self.heatmap = total
+        elif self.heatmap.shape != total.shape:
+            raise ValueError(f"visit grids of shape {total.shape} do not match the heatmap's {self.heatmap.shape}")
+        else:
+            self.heatmap += total
+        self.heatmap_runs += runs
+        if obstacle_mask is not None:
+            self.obstacle_mask = np.asarray(obstacle_mask, dtype=bool)
+
+    def merge(self, other):
+        for column in STAT_COLUMNS:
+            self.stats[column].merge(other.stats[column])
+            self.sketches[column].merge(other.sketches[column])
+        if other.heatmap is not None:
+            self.add_visit_grids([other.heatmap], other.obstacle_mask, runs=other.heatmap_runs)
+
+
+class ResultsAggregator:
+    """
+    Per-strategy streaming summary of experiment results.
+    Feed it run_experiment() result dicts with add(), or result rows with add_row().
+    """
+
+    def __init__(self):
+        self.strategies = {}  # Strategy name -> StrategyStats, in first-seen order
+
+    def _strategy(self, name):
+        if name not in self.strategies:
+            self.strategies[name] = StrategyStats()
+        return self.strategies[name]
+
+    def add_row(self, row):
+        self._strategy(row["strategy"]).add_row(row)
+
+    def add(self, result):
+        """Adds a run_experiment() result, including its visit grids when present."""
+        strategy = self._strategy(result["strategy"])
+        strategy.add_row(result)
+        if result.get("visit_grids"):
+            strategy.add_visit_grids(result["visit_grids"], result.get("obstacle_mask"))
+
+    def merge(self, other):
+        for name, stats in other.strategies.items():
+            self._strategy(name).merge(stats)
+
+    def summary(self, columns=("dirt_collected", "elapsed_time"), quantiles=(0.5, 0.9)):
+        """
+        Returns {strategy: {metric: value}} with runs, then mean, std and the requested
+        quantiles of each column, e.g. 'dirt_collected_mean' or 'elapsed_time_p90'.
+        """
+        table = {}
+        for name, strategy in self.strategies.items():
+            row = {"runs": strategy.runs}
+            for column in columns:
+                stats, sketch = strategy.stats[column], strategy.sketches[column]
+                row[f"{column}_mean"] = stats.mean if stats.count else math.nan
+                row[f"{column}_std"] = stats.std if stats.count > 1 else math.nan
+                for q in quantiles:
+                    row[f"{column}_p{round(q * 100)}"] = sketch.quantile(q)
+            table[name] = row
+        return table
+
+    def save(self, path):
+        """Writes the aggregator to a .npz file, replacing it atomically."""
+        arrays = {"strategies": np.array(list(self.strategies), dtype=str)}
+        for i, strategy in enumerate(self.strategies.values()):
+            for column in STAT_COLUMNS:
+                arrays[f"{i}/{column}/stats"] = strategy.stats[column].to_array()
+                arrays[f"{i}/{column}/sketch"] = strategy.sketches[column].to_array()
+            if strategy.heatmap is not None:
+                arrays[f"{i}/heatmap"] = strategy.heatmap
+                arrays[f"{i}/heatmap_runs"] = np.array(strategy.heatmap_runs)
+            if strategy.obstacle_mask is not None:
+                arrays[f"{i}/obstacle_mask"] = strategy.obstacle_mask
+        tmp_path = f"{path}.tmp{os.getpid()}.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        aggregator = cls()
+        with np.load(path) as data:
+            for i, name in enumerate(data["strategies"].tolist()):
+                strategy = aggregator._strategy(name)
+                for column in STAT_COLUMNS:
+                    strategy.stats[column] = RunningStats.from_array(data[f"{i}/{column}/stats"])
+                    strategy.sketches[column] = QuantileSketch.from_array(data[f"{i}/{column}/sketch"])
+                if f"{i}/heatmap" in data.files:
+                    strategy.heatmap = data[f"{i}/heatmap"]
+                    strategy.heatmap_runs = int(data[f"{i}/heatmap_runs"])
+                if f"{i}/obstacle_mask" in data.files:
+                    strategy.obstacle_mask = data[f"{i}/obstacle_mask"]
+        return aggregator
+
+    @classmethod
+    def from_csv(cls, path="results.csv"):
+        """Builds an aggregator by streaming a results CSV one row at a time (no heatmaps)."""
+        aggregator = cls()
+        with open(path, newline="") as f:
+            first = next(csv.reader(f), [])
+            has_header = bool(first) and first[0] == RESULT_COLUMNS[0]
+            f.seek(0)
+            reader = csv.DictReader(f) if has_header else csv.DictReader(f, fieldnames=LEGACY_COLUMNS)
+            for row in reader:
+                aggregator.add_row(row)
+        return aggregator
@@ -0,0 +1,57 @@
+# sim_log.py
+# Description:
+# Leveled, sampled logging for the simulator.
+
+# Simulation modules log through loggers under the "vacuum_sim" namespace instead of
+# printing. Nothing below WARNING is shown unless configure_logging() is called, so
+# headless batch runs stay silent by default. Sampling lets noisy per-step messages
+# through only once every N occurrences.
+
+import logging
+import sys
+
+LOGGER_NAME = "vacuum_sim"
+LOG_FORMAT = "[%(levelname)s] %(message)s"
+
+
+def get_logger(name=None):
+    """Returns the simulator logger, or a child logger such as 'vacuum_sim.results'."""
+    return logging.getLogger(LOGGER_NAME if name is None else f"{LOGGER_NAME}.{name}")
+
+
+class SamplingFilter(logging.Filter):
+    """Passes one in every sample_every records per message template; WARNING and above always pass."""
+
+    def __init__(self, sample_every=1):
+        super().__init__()
+        self.sample_every = max(1, int(sample_every))
+        self.seen = {}
+
+    def filter(self, record):
+        if self.sample_every == 1 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        count = self.seen.get(key, 0)
+        self.seen[key] = count + 1
+        return count % self.sample_every == 0
+
+
+def configure_logging(level="WARNING", sample_every=1, stream=None):
+    """
+    Sets the simulator log level and output stream, replacing any earlier configuration.
+
+    Parameters:
+        level (str | int): e.g. "DEBUG", "INFO", "WARNING" or a logging level number.
+        sample_every (int): Emit only every n-th DEBUG/INFO record of each message.
+        stream: File-like object to write to (defaults to stdout).
+    """
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(SamplingFilter(sample_every))
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+    return logger
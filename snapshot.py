@@ -0,0 +1,186 @@
+# snapshot.py
+# Description:
+# Snapshots of a simulation's full state, and forks that continue from them.
+
+# WorldSnapshot.take(sim) copies everything a run's future depends on: the remaining dirt,
+# bot poses and wheel speeds, visit grids, dirt counters, the RNG state, and each bot's
+# controller (belief map, route, position along it, targets and planner search), plus the
+# path caches and task allocator they share. A snapshot holds no reference to the
+# simulation it came from, and pickles (save()/load()) into a compact file.
+
+# fork() builds a new Simulation from a snapshot without any of the random placement or
+# initial planning of a fresh one. With the snapshot's own strategy, the fork continues
+# exactly as the original run would have. With another strategy (or with message-passing
+# comms on either side), the world carries over but every bot gets a fresh controller, as
+# if that strategy's run had started in this state. Forking one snapshot into several
+# strategies therefore compares them on the same dirt layout and spawns: paired runs,
+# whose differences vary far less than those of independently seeded runs.
+# Forks share nothing mutable with the snapshot or with each other. Arrays are copied
+# when a fork is made rather than on first write: every step writes the poses and visit
+# grids, so deferring the copies would not save any.
+
+import pickle
+import time
+
+import numpy as np
+
+from multi_robot_coordination_experiment import Bot, DEFAULT_STOP_CONDITIONS, Simulation
+from planner import IncrementalPlanner
+from task_allocation import TaskAllocator
+
+POSE_COLUMNS = ("x", "y", "theta", "sl", "sr", "ll")
+
+
+class WorldSnapshot:
+    @classmethod
+    def take(cls, sim):
+        """Snapshot of sim's current state, between steps."""
+        snap = cls()
+        snap.strategy = sim.strategy
+        snap.run_id, snap.seed = sim.run_id, sim.seed
+        snap.num_bots, snap.num_dirt, snap.max_steps = sim.num_bots, sim.num_dirt, sim.max_steps
+        snap.dt, snap.world = sim.dt, sim.world
+        snap.event_driven = sim.event_driven
+        snap.flow_fields = sim.field_cache is not None
+        snap.step_count, snap.steps_to_completion = sim.step_count, sim.steps_to_completion
+        snap.dirt_collected, snap.per_bot = sim.counter.dirt_collected, dict(sim.counter.per_bot)
+        snap.rng_state = sim.rng.getstate()
+
+        snap.dirt_names = [dirt.name for dirt in sim.dirt_list]
+        snap.dirt_xy = np.array([dirt.get_location() for dirt in sim.dirt_list], dtype=np.float64).reshape(-1, 2)
+        n = sim.swarm.count
+        snap.bot_names = [bot.name for bot in sim.agents]
+        snap.poses = np.array([getattr(sim.swarm, column)[:n] for column in POSE_COLUMNS])
+        snap.visit_grids = np.array([bot.visit_grid for bot in sim.agents])
+        # Bots in the order of the bot index's buckets, so re-inserting them reproduces the
+        # order in which proximity checks find them
+        slots = {bot: i for i, bot in enumerate(sim.agents)}
+        snap.bot_index_order = [slots[bot] for bucket in sim.bot_index.cells.values() for bot in bucket]
+
+        snap.brains = None if sim.bus is not None else cls._take_brains(sim)
+        snap.allocator = None if sim.allocator is None else \
+            (sim.allocator.method, dict(sim.allocator.goals), sim.allocator.synced_version)
+        return snap
+
+    @staticmethod
+    def _take_brains(sim):
+        # Beliefs and caches shared by several brains are stored once and referred to by index
+        beliefs, caches = {}, {}
+        dirt_ids = {dirt: i for i, dirt in enumerate(sim.dirt_list)}
+        brains = []
+        for bot in sim.agents:
+            brain, planner = bot.brain, bot.brain.planner
+            belief = beliefs.setdefault(id(brain.belief), (len(beliefs), brain.belief.copy(keep_token=True)))[0]
+            state = {"belief": belief, "path": list(brain.path), "path_index": brain.path_index,
+                     "path_version": brain.path_version, "no_route": brain.no_route,
+                     "targets": [dirt_ids[dirt] for dirt in brain.targets], "goal": planner.goal}
+            if isinstance(planner, IncrementalPlanner):
+                state["search"] = planner.search.copy() if planner.search is not None else None
+                state["synced_version"] = planner.synced_version
+                if planner.cache is not None:
+                    state["cache"] = caches.setdefault(id(planner.cache), (len(caches), planner.cache.copy()))[0]
+            brains.append(state)
+        return {"beliefs": [belief for _, belief in sorted(beliefs.values(), key=lambda item: item[0])],
+                "caches": [cache for _, cache in sorted(caches.values(), key=lambda item: item[0])],
+                "shared_belief": beliefs.get(id(sim.shared_belief), (None,))[0],
+                "bots": brains}
+
+    def fork(self, strategy=None, max_steps=None, stop_conditions=DEFAULT_STOP_CONDITIONS, run_id=None,
+             timer=None, renderer=None, comms=None, event_driven=None, flow_fields=None):
+        """
+        A new Simulation that continues from this snapshot. Arguments left as None keep the
+        snapshot's values (comms=None means none); the rest are as for Simulation.
+        """
+        strategy = strategy if strategy is not None else self.strategy
+        flow_fields = flow_fields if flow_fields is not None else self.flow_fields
+        sim = Simulation(strategy, self.run_id if run_id is None else run_id, 0, 0,
+                         max_steps if max_steps is not None else self.max_steps, self.seed, dt=self.dt,
+                         stop_conditions=stop_conditions, world=self.world, timer=timer, comms=comms,
+                         event_driven=event_driven if event_driven is not None else self.event_driven,
+                         flow_fields=flow_fields)
+        start = time.perf_counter_ns()
+        sim.num_bots, sim.num_dirt = self.num_bots, self.num_dirt
+        sim.step_count, sim.steps_to_completion = self.step_count, self.steps_to_completion
+        sim.counter.dirt_collected, sim.counter.per_bot = self.dirt_collected, dict(self.per_bot)
+        sim.rng.setstate(self.rng_state)
+        dirt_list = [sim.add_dirt(float(x), float(y), name) for name, (x, y) in zip(self.dirt_names, self.dirt_xy)]
+
+        bots = [Bot(name, sim.dirt_list, sim.counter, sim.swarm, sim.dirt_index, sim.rng, sim.dirt_grid,
+                    sim.world, pose=tuple(float(v) for v in self.poses[:3, i]))
+                for i, name in enumerate(self.bot_names)]
+        for i, bot in enumerate(bots):
+            bot.sl, bot.sr, bot.ll = self.poses[3:, i]
+            bot.visit_grid[...] = self.visit_grids[i]
+        if self.brains is not None and strategy == self.strategy and comms is None:
+            self._restore_brains(sim, bots, dirt_list)
+        else:
+            for bot in bots:
+                sim.add_bot(bot)
+            if sim.allocator is not None:
+                sim.allocator.assign_all({bot.name: bot.cell() for bot in sim.agents})
+        # Re-inserted in bucket order; add_bot() inserted them in agent order
+        for i in self.bot_index_order:
+            sim.bot_index.remove(bots[i])
+            sim.bot_index.insert(bots[i], bots[i].x, bots[i].y)
+        if timer is not None:
+            timer.lap("setup", start)
+        if renderer is not None:
+            sim.renderer = renderer
+            renderer.attach(sim)
+        return sim
+
+    def _restore_brains(self, sim, bots, dirt_list):
+        beliefs = [belief.copy(keep_token=True) for belief in self.brains["beliefs"]]
+        if self.brains["shared_belief"] is not None:
+            sim.shared_belief = beliefs[self.brains["shared_belief"]]
+        if self.allocator is not None:
+            method, goals, synced_version = self.allocator
+            sim.allocator = TaskAllocator(sim.shared_belief, method)
+            sim.allocator.goals, sim.allocator.synced_version = dict(goals), synced_version
+        caches = [cache.copy() for cache in self.brains["caches"]]
+        if caches:
+            sim.path_cache = caches[0]  # All bots of a simulation share one cache
+        for bot, state in zip(bots, self.brains["bots"]):
+            brain = sim.add_bot(bot, belief=beliefs[state["belief"]], path=list(state["path"]))
+            brain.path_index, brain.path_version = state["path_index"], state["path_version"]
+            brain.no_route = state["no_route"]
+            brain.targets = [dirt_list[i] for i in state["targets"]]
+            planner = brain.planner
+            planner.goal = state["goal"]
+            if isinstance(planner, IncrementalPlanner) and "synced_version" in state:
+                planner.search = state["search"].copy() if state["search"] is not None else None
+                planner.synced_version = state["synced_version"]
+                if "cache" in state:
+                    planner.cache = caches[state["cache"]]
+            elif isinstance(planner, IncrementalPlanner):
+                planner.search = None  # Snapshot planned with fields; the next plan() searches afresh
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def paired_runs(strategies, run_id=0, num_bots=3, num_dirt=40, max_steps=1000, seed=None, world=None,
+                warmup_steps=0, stop_conditions=DEFAULT_STOP_CONDITIONS, **options):
+    """
+    Runs every strategy from one shared starting state and returns their result dicts.
+    The state is set up (and, with warmup_steps, run that many steps) with the first strategy.
+
+    Parameters:
+        options: Further Simulation arguments for every fork (e.g. event_driven, flow_fields).
+    """
+    base = Simulation(strategies[0], run_id, num_bots, num_dirt, max_steps, seed, stop_conditions=(),
+                      world=world)
+    for _ in range(warmup_steps):
+        base.step()
+    snap = WorldSnapshot.take(base)
+    results = []
+    for strategy in strategies:
+        results.append(snap.fork(strategy, stop_conditions=stop_conditions, **options).run())
+    return results
@@ -0,0 +1,89 @@
+# spatial_index.py
+# Description:
+# Uniform-grid spatial hash for fast radius queries over dirt patches and robots.
+
+# Objects are bucketed by the grid cell containing their position, so insert, remove
+# and move are O(1) amortized and a radius query only inspects the cells the query
+# circle overlaps. Choosing cell_size close to the usual query radius keeps each
+# query to a 3x3 block of cells.
+
+import math
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.cell_size = cell_size
+        self.cells = {}      # (cx, cy) -> {obj: None}, dicts keep insertion order for deterministic queries
+        self.positions = {}  # obj -> (x, y, cell)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, obj):
+        return obj in self.positions
+
+    def _cell(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, obj, x, y):
+        if obj in self.positions:
+            self.move(obj, x, y)
+            return
+        cell = self._cell(x, y)
+        self.cells.setdefault(cell, {})[obj] = None
+        self.positions[obj] = (x, y, cell)
+
+    def remove(self, obj):
+        _, _, cell = self.positions.pop(obj)
+        bucket = self.cells[cell]
+        del bucket[obj]
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, obj, x, y):
+        _, _, old_cell = self.positions[obj]
+        cell = self._cell(x, y)
+        if cell != old_cell:
+            bucket = self.cells[old_cell]
+            del bucket[obj]
+            if not bucket:
+                del self.cells[old_cell]
+            self.cells.setdefault(cell, {})[obj] = None
+        self.positions[obj] = (x, y, cell)
+
+    def query_radius(self, x, y, radius):
+        """Returns (distance, obj) pairs for every object strictly within radius of (x, y)."""
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        hits = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self.cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for obj in bucket:
+                    ox, oy, _ = self.positions[obj]
+                    distance = math.hypot(x - ox, y - oy)
+                    if distance < radius:
+                        hits.append((distance, obj))
+        return hits
+
+    def first_within(self, x, y, radius, exclude=None):
+        """Returns (obj, distance) for the first object found within radius, or (None, None)."""
+        min_cx, min_cy = self._cell(x - radius, y - radius)
+        max_cx, max_cy = self._cell(x + radius, y + radius)
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = self.cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for obj in bucket:
+                    if obj is exclude:
+                        continue
+                    ox, oy, _ = self.positions[obj]
+                    distance = math.hypot(x - ox, y - oy)
+                    if distance < radius:
+                        return obj, distance
+        return None, None
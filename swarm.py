@@ -0,0 +1,64 @@
+# swarm.py
+# Description:
+# Structure-of-arrays store for robot poses and a vectorized differential-drive step.
+
+# Every robot's x, y, theta and wheel speeds live in one contiguous float array per field,
+# so a whole swarm is advanced with a handful of NumPy operations instead of one small
+# matrix multiply per robot. The kinematics are the same ICC update as Bot.move.
+
+import math
+import numpy as np
+
+POSE_FIELDS = ("x", "y", "theta", "sl", "sr", "ll")
+
+
+class Swarm:
+    def __init__(self, capacity=8):
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.theta = np.zeros(capacity)
+        self.sl = np.zeros(capacity)
+        self.sr = np.zeros(capacity)
+        self.ll = np.zeros(capacity)  # Wheel base of each robot
+
+    def add(self, x, y, theta, ll=60):
+        """Registers a robot and returns its slot index."""
+        if self.count == len(self.x):
+            # Double the capacity so repeated adds stay amortized O(1)
+            for field in POSE_FIELDS:
+                old = getattr(self, field)
+                grown = np.zeros(max(1, 2 * len(old)))
+                grown[:len(old)] = old
+                setattr(self, field, grown)
+        slot = self.count
+        self.x[slot], self.y[slot], self.theta[slot], self.ll[slot] = x, y, theta, ll
+        self.sl[slot] = self.sr[slot] = 0.0
+        self.count += 1
+        return slot
+
+    def step(self, dt):
+        """Advances every robot by dt using the ICC differential-drive model."""
+        n = self.count
+        x, y, theta = self.x[:n], self.y[:n], self.theta[:n]
+        sl, sr, ll = self.sl[:n], self.sr[:n], self.ll[:n]
+
+        straight = sl == sr
+        omega_dt = (sl - sr) / ll * dt
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R = np.where(straight, 0.0, (ll / 2.0) * ((sr + sl) / (sl - sr)))
+        icc_x = x - R * np.sin(theta)
+        icc_y = y + R * np.cos(theta)
+
+        # Rotate each robot about its ICC by omega*dt
+        cos_w, sin_w = np.cos(omega_dt), np.sin(omega_dt)
+        rel_x, rel_y = x - icc_x, y - icc_y
+        new_x = cos_w * rel_x - sin_w * rel_y + icc_x
+        new_y = sin_w * rel_x + cos_w * rel_y + icc_y
+        new_theta = (theta + omega_dt) % (2 * math.pi)
+
+        # Straight-line motion: advance sr pixels along the heading (same as Bot.move)
+        new_x += np.where(straight, sr * np.cos(new_theta), 0.0)
+        new_y += np.where(straight, sr * np.sin(new_theta), 0.0)
+
+        self.x[:n], self.y[:n], self.theta[:n] = new_x, new_y, new_theta
@@ -0,0 +1,193 @@
+# task_allocation.py
+# Description:
+# Assigns dirty cells to bots so that bots sharing a map do not chase the same dirt.
+
+# Assignment methods work on a precomputed bot x task distance matrix:
+# - greedy: repeatedly take the closest free (bot, cell) pair.
+# - auction: Bertsekas' auction algorithm; bots bid for cells until prices settle.
+# - hungarian: exact minimum-cost assignment, used for small instances.
+# TaskAllocator keeps the assignment up to date as cells are cleaned: only bots whose
+# cell disappeared are reassigned, each to its closest unclaimed cell.
+
+import numpy as np
+
+ALLOCATION_GREEDY = "greedy"
+ALLOCATION_AUCTION = "auction"
+ALLOCATION_HUNGARIAN = "hungarian"
+ALLOCATION_AUTO = "auto"
+
+# Instances with at most this many (bot, cell) pairs are solved exactly
+HUNGARIAN_MAX_PAIRS = 2500
+
+
+def distance_matrix(bot_cells, task_cells):
+    """Grid-step (Manhattan) distances, shape (len(bot_cells), len(task_cells))."""
+    bots = np.asarray(bot_cells, dtype=np.int64).reshape(-1, 2)
+    tasks = np.asarray(task_cells, dtype=np.int64).reshape(-1, 2)
+    return np.abs(bots[:, None, :] - tasks[None, :, :]).sum(axis=2)
+
+
+def greedy_assignment(dist):
+    """Returns {bot_row: task_col}, taking the globally closest free pair each time."""
+    n_bots, n_tasks = dist.shape
+    assignment = {}
+    used_tasks = set()
+    for flat in np.argsort(dist, axis=None, kind="stable"):
+        bot, task = divmod(int(flat), n_tasks)
+        if bot in assignment or task in used_tasks:
+            continue
+        assignment[bot] = task
+        used_tasks.add(task)
+        if len(assignment) == min(n_bots, n_tasks):
+            break
+    return assignment
+
+
+def auction_assignment(dist, epsilon=None):
+    """
+    Forward auction (Bertsekas) minimising total distance; requires bots <= tasks.
+    With integer distances and epsilon < 1/n_bots the result is optimal.
+    """
+    n_bots, n_tasks = dist.shape
+    if n_bots > n_tasks:
+        raise ValueError("auction_assignment needs at least as many tasks as bots")
+    benefit = -dist.astype(np.float64)
+    epsilon = 1.0 / (n_bots + 1) if epsilon is None else epsilon
+    prices = np.zeros(n_tasks)
+    owner = np.full(n_tasks, -1)
+    assigned = np.full(n_bots, -1)
+    unassigned = list(range(n_bots))
+    while unassigned:
+        bot = unassigned.pop()
+        values = benefit[bot] - prices
+        if n_tasks == 1:
+            best, bid_increment = 0, epsilon
+        else:
+            best, second = np.argpartition(-values, 1)[:2]
+            bid_increment = values[best] - values[second] + epsilon
+        prices[best] += bid_increment
+        previous = owner[best]
+        if previous >= 0:
+            assigned[previous] = -1
+            unassigned.append(previous)
+        owner[best] = bot
+        assigned[bot] = best
+    return {bot: int(task) for bot, task in enumerate(assigned)}
+
+
+def hungarian_assignment(dist):
+    """Exact minimum-cost assignment (Kuhn-Munkres with potentials), O(n^2 m)."""
+    n_bots, n_tasks = dist.shape
+    if n_bots > n_tasks:
+        transposed = hungarian_assignment(dist.T)
+        return {bot: task for task, bot in transposed.items()}
+    cost = dist.astype(np.float64)
+    # 1-based arrays as in the classic formulation; column 0 is a sentinel
+    u = np.zeros(n_bots + 1)
+    v = np.zeros(n_tasks + 1)
+    match = np.zeros(n_tasks + 1, dtype=np.int64)  # match[task] = bot (1-based), 0 if free
+    way = np.zeros(n_tasks + 1, dtype=np.int64)
+    for bot in range(1, n_bots + 1):
+        match[0] = bot
+        task0 = 0
+        minv = np.full(n_tasks + 1, np.inf)
+        used = np.zeros(n_tasks + 1, dtype=bool)
+        while True:
+            used[task0] = True
+            bot0 = match[task0]
+            free = ~used[1:]
+            reduced = cost[bot0 - 1] - u[bot0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = task0
+            candidates = np.where(free, minv[1:], np.inf)
+            task1 = int(np.argmin(candidates)) + 1
+            delta = candidates[task1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            task0 = task1
+            if match[task0] == 0:
+                break
+        while task0:
+            task1 = way[task0]
+            match[task0] = match[task1]
+            task0 = task1
+    return {int(match[task]) - 1: task - 1 for task in range(1, n_tasks + 1) if match[task] > 0}
+
+
+def assign(dist, method=ALLOCATION_AUTO):
+    """Dispatches to one of the assignment methods; 'auto' is exact on small instances, greedy otherwise."""
+    n_bots, n_tasks = dist.shape
+    if n_bots == 0 or n_tasks == 0:
+        return {}
+    if method == ALLOCATION_AUTO:
+        method = ALLOCATION_HUNGARIAN if n_bots * n_tasks <= HUNGARIAN_MAX_PAIRS else ALLOCATION_GREEDY
+    if method == ALLOCATION_HUNGARIAN:
+        return hungarian_assignment(dist)
+    if method == ALLOCATION_AUCTION:
+        if n_bots > n_tasks:
+            # Only as many bots as tasks can win one; the rest are left for fallback
+            transposed = auction_assignment(dist.T)
+            return {bot: task for task, bot in transposed.items()}
+        return auction_assignment(dist)
+    if method == ALLOCATION_GREEDY:
+        return greedy_assignment(dist)
+    raise ValueError(f"unknown allocation method: {method}")
+
+
+class TaskAllocator:
+    """
+    Shared by all brains of one team. Goals are dirty cells of the team's BeliefMap;
+    the allocator follows the map's change log to drop cells that have been cleaned.
+    """
+
+    def __init__(self, belief, method=ALLOCATION_AUTO):
+        self.belief = belief
+        self.method = method
+        self.goals = {}      # bot name -> (row, col) goal cell
+        self.synced_version = None
+
+    def _tasks(self):
+        return [tuple(int(v) for v in cell) for cell in np.argwhere(self.belief.counts > 0)]
+
+    def assign_all(self, bot_cells):
+        """Full assignment for {bot name: current cell}, replacing any existing goals."""
+        names = list(bot_cells)
+        tasks = self._tasks()
+        self.goals = {}
+        self.synced_version = self.belief.version
+        if not tasks:
+            return self.goals
+        dist = distance_matrix([bot_cells[name] for name in names], tasks)
+        for bot, task in assign(dist, self.method).items():
+            self.goals[names[bot]] = tasks[task]
+        # Bots left over when there are fewer cells than bots share the closest cell
+        for bot, name in enumerate(names):
+            if name not in self.goals:
+                self.goals[name] = tasks[int(np.argmin(dist[bot]))]
+        return self.goals
+
+    def goal_for(self, name, cell):
+        """Returns the bot's goal cell, reassigning it only if its previous goal is gone."""
+        if self.synced_version != self.belief.version:
+            for changed in self.belief.changes_since(self.synced_version or 0):
+                if self.belief.counts[changed] <= 0:
+                    for other, goal in list(self.goals.items()):
+                        if goal == changed:
+                            del self.goals[other]
+            self.synced_version = self.belief.version
+        goal = self.goals.get(name)
+        if goal is not None and self.belief.counts[goal] > 0:
+            return goal
+
+        tasks = self._tasks()
+        if not tasks:
+            self.goals.pop(name, None)
+            return None
+        claimed = set(self.goals.values())
+        free = [task for task in tasks if task not in claimed] or tasks
+        dist = distance_matrix([cell], free)[0]
+        goal = free[int(np.argmin(dist))]
+        self.goals[name] = goal
+        return goal
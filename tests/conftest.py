@@ -0,0 +1,8 @@
+# conftest.py
+# Description:
+# Shared pytest setup: makes the top-level modules importable from the tests directory.
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
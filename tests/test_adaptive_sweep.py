@@ -0,0 +1,72 @@
+# test_adaptive_sweep.py
+# Description:
+# Stopping, budget and scheduling rules of AdaptiveSweep, and its independence from the
+# number of worker processes (see adaptive_sweep.py).
+
+import math
+
+import numpy as np
+import pytest
+
+from adaptive_sweep import AdaptiveSweep, SweepPoint, sweep_grid
+from multi_robot_coordination_experiment import STRATEGY_BASELINE, STRATEGY_SHARED_MAP
+
+GRID = sweep_grid((STRATEGY_BASELINE, STRATEGY_SHARED_MAP), num_bots=(2, 3), num_dirt=(30,), max_steps=(400,))
+
+
+def add_values(sweep, point, values):
+    for run_id, value in enumerate(values, start=sweep.stats[point].count):
+        sweep.add(point, {"run_id": run_id, "dirt_collected": value})
+
+
+def test_point_stops_once_interval_reaches_target():
+    point = SweepPoint(STRATEGY_BASELINE, 3, 40, 1000)
+    sweep = AdaptiveSweep([point], target_ci=4, min_runs=3, max_runs=50)
+    for value in (10, 16, 13, 12, 14, 13, 12, 14, 13, 13, 12, 14):
+        add_values(sweep, point, [value])
+        stats = sweep.stats[point]
+        done = stats.count >= 3 and stats.half_width(sweep.confidence) <= 2
+        assert sweep.status(point) == ("ci_width" if done else None)
+        if done:
+            break
+    assert sweep.status(point) == "ci_width"
+    assert sweep.next_point() is None
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_budget_caps_simulations(workers):
+    sweep = AdaptiveSweep(GRID, target_ci=0.01, min_runs=2, max_runs=20, budget=7, base_seed=5)
+    rows = sweep.run(workers=workers, csv_path=None)
+    assert sweep.simulated == 7
+    assert sum(row["runs"] for row in rows) <= 7  # Runs finishing after their point stopped are left out
+    assert "open" in {row["status"] for row in rows}
+
+
+def test_unseparated_strategies_go_first():
+    separated = [SweepPoint(strategy, 2, 40, 1000) for strategy in (STRATEGY_BASELINE, STRATEGY_SHARED_MAP)]
+    unseparated = [SweepPoint(strategy, 3, 40, 1000) for strategy in (STRATEGY_BASELINE, STRATEGY_SHARED_MAP)]
+    sweep = AdaptiveSweep(separated + unseparated, target_ci=0.5, min_runs=5)
+    # The separated pair has the wider intervals, so it would go first on width alone
+    add_values(sweep, separated[0], [0, 20, 40, 60, 80])
+    add_values(sweep, separated[1], [100, 120, 140, 160, 180])
+    add_values(sweep, unseparated[0], [0, 2, 4, 6, 8])
+    add_values(sweep, unseparated[1], [1, 1, 5, 5, 9])
+    assert [sweep.separated[point] for point in separated + unseparated] == [True, True, False, False]
+    assert sweep.next_point() in unseparated
+
+
+def test_summary_interval_is_nan_below_two_runs():
+    points = [SweepPoint(STRATEGY_BASELINE, 3, 40, 1000), SweepPoint(STRATEGY_SHARED_MAP, 3, 40, 1000)]
+    sweep = AdaptiveSweep(points, target_ci=4)
+    add_values(sweep, points[1], [12])
+    for row in sweep.summary():
+        assert math.isnan(row["ci_low"]) and math.isnan(row["ci_high"])
+
+
+def test_summary_does_not_depend_on_workers():
+    summaries = []
+    for workers in (1, 2):
+        sweep = AdaptiveSweep(GRID, target_ci=3, min_runs=3, max_runs=12, base_seed=5)
+        summaries.append(sweep.run(workers=workers, csv_path=None))
+    assert len({row["runs"] for row in summaries[0]}) > 1  # Points stopped after different numbers of runs
+    np.testing.assert_equal(summaries[1], summaries[0])
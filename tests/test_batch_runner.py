@@ -0,0 +1,57 @@
+# test_batch_runner.py
+# Description:
+# Batch results must not depend on the number of worker processes, and statistics that
+# cannot be merged into results_stats.npz must not overwrite it (see batch_runner.py).
+
+import numpy as np
+
+from batch_runner import _save_stats, derive_seed, run_batch
+from multi_robot_coordination_experiment import STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION
+from results_stats import ResultsAggregator
+
+STRATEGIES = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION)
+TIMING_KEYS = ("elapsed_time", "steps_per_sec")
+
+
+def batch_results(directory, workers, monkeypatch):
+    directory.mkdir()
+    monkeypatch.chdir(directory)  # The batch writes its results and visit grids to the working directory
+    results = run_batch(STRATEGIES, num_runs=3, max_steps=300, workers=workers, base_seed=7)
+    return [{key: value for key, value in result.items() if key not in TIMING_KEYS} for result in results]
+
+
+def test_results_do_not_depend_on_workers(tmp_path, monkeypatch):
+    serial = batch_results(tmp_path / "serial", 1, monkeypatch)
+    parallel = batch_results(tmp_path / "parallel", 2, monkeypatch)
+    assert len(serial) == len(STRATEGIES) * 3
+    np.testing.assert_equal(parallel, serial)
+    assert [result["seed"] for result in serial] == [derive_seed(result["strategy"], result["run_id"], 7)
+                                                     for result in serial]
+
+
+def test_derive_seed_values_are_fixed():
+    # Changing these changes every recorded run's seed, and so its results
+    assert derive_seed(STRATEGY_BASELINE, 0, 0) == 3137314734
+    assert derive_seed(STRATEGY_SHARED_MAP, 3, 0) == 2661652780
+    assert derive_seed(STRATEGY_COORDINATION, 2, 7) == 3515213074
+    seeds = {derive_seed(strategy, run_id) for strategy in STRATEGIES for run_id in range(10)}
+    assert len(seeds) == len(STRATEGIES) * 10
+
+
+def aggregator_with_world(size, dirt):
+    stats = ResultsAggregator()
+    stats.add({"strategy": STRATEGY_BASELINE, "dirt_collected": dirt,
+               "visit_grids": [np.ones((size, size), dtype=np.int64)]})
+    return stats
+
+
+def test_incompatible_stats_file_is_kept(tmp_path):
+    stats_path = str(tmp_path / "results_stats.npz")
+    _save_stats(aggregator_with_world(4, 10), stats_path)
+    _save_stats(aggregator_with_world(6, 20), stats_path)  # Different world size: cannot be merged
+    legacy = ResultsAggregator.load(str(tmp_path / "results_stats.legacy.npz"))
+    assert legacy.strategies[STRATEGY_BASELINE].heatmap.shape == (4, 4)
+    assert legacy.strategies[STRATEGY_BASELINE].stats["dirt_collected"].mean == 10
+    current = ResultsAggregator.load(stats_path)
+    assert current.strategies[STRATEGY_BASELINE].heatmap.shape == (6, 6)
+    assert current.strategies[STRATEGY_BASELINE].runs == 1
@@ -0,0 +1,37 @@
+# test_event_driven.py
+# Description:
+# Event-driven stepping must reproduce fixed stepping exactly (see Simulation._event_horizon).
+
+import numpy as np
+import pytest
+
+from multi_robot_coordination_experiment import (
+    Simulation, STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION
+)
+from world import WorldConfig
+
+STRATEGIES = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION)
+OUTCOME_KEYS = ("steps", "steps_to_completion", "stop_reason", "dirt_collected", "per_bot_dirt")
+WORLDS = {
+    "open": None,
+    "obstacles": WorldConfig(20, 20, 50, [(5, col) for col in range(3, 15)]),
+}
+
+
+def run(strategy, world, flow_fields, event_driven, seed=1, num_bots=4):
+    sim = Simulation(strategy, 0, num_bots, 60, 1500, seed, world=world, record=True,
+                     event_driven=event_driven, flow_fields=flow_fields)
+    return sim.run(), sim.recorder.rows()
+
+
+@pytest.mark.parametrize("flow_fields", (False, True), ids=("dstar", "fields"))
+@pytest.mark.parametrize("world", WORLDS, ids=str)
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_event_driven_matches_fixed_steps(strategy, world, flow_fields):
+    fixed, fixed_rows = run(strategy, WORLDS[world], flow_fields, event_driven=False)
+    event, event_rows = run(strategy, WORLDS[world], flow_fields, event_driven=True)
+    assert {key: event[key] for key in OUTCOME_KEYS} == {key: fixed[key] for key in OUTCOME_KEYS}
+    for event_grid, fixed_grid in zip(event["visit_grids"], fixed["visit_grids"]):
+        np.testing.assert_array_equal(event_grid, fixed_grid)
+    # Every recorded pose and pickup, bit for bit
+    np.testing.assert_array_equal(event_rows, fixed_rows)
@@ -0,0 +1,90 @@
+# test_planner.py
+# Description:
+# DStarLite and IncrementalPlanner must find paths as cheap as a fresh A* search,
+# including after cells change between plans (see planner.py).
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from aStar import aStarPlan, dirtCostGrid
+from planner import BeliefMap, DStarLite, IncrementalPlanner, PathCache
+
+
+def path_cost(path, cost, start, goal):
+    """Cost of entering every cell after the first; fails if the path is not a legal route."""
+    assert path[0] == tuple(start) and path[-1] == tuple(goal)
+    total = 0.0
+    for (row, col), (nr, nc) in zip(path, path[1:]):
+        dr, dc = nr - row, nc - col
+        assert max(abs(dr), abs(dc)) == 1
+        assert cost[nr, nc] != math.inf
+        if dr and dc:
+            assert cost[row, nc] != math.inf and cost[nr, col] != math.inf  # No corner cutting
+        total += math.hypot(dr, dc) * cost[nr, nc]
+    return total
+
+
+def free_cell(rng, cost):
+    rows, cols = cost.shape
+    while True:
+        cell = (rng.randrange(rows), rng.randrange(cols))
+        if cost[cell] != math.inf:
+            return cell
+
+
+def reference_plan(cost, start, goal, connectivity=4):
+    blocked = np.isinf(cost)
+    return aStarPlan(np.where(blocked, 1.0, cost), start, goal, connectivity, blocked)
+
+
+@pytest.mark.parametrize("connectivity", (4, 8))
+def test_dstar_lite_matches_astar_after_updates(connectivity):
+    rng = random.Random(connectivity)
+    for _ in range(10):
+        cost = np.array([[rng.uniform(0.2, 1.0) for _ in range(14)] for _ in range(12)])
+        cost[np.array([[rng.random() < 0.2 for _ in range(14)] for _ in range(12)])] = math.inf
+        start, goal = free_cell(rng, cost), free_cell(rng, cost)
+        search = DStarLite(cost, start, goal, connectivity)
+        for _ in range(25):
+            path, expected = search.plan(start), reference_plan(cost, start, goal, connectivity)
+            assert bool(path) == bool(expected)
+            if path:
+                assert path_cost(path, cost, start, goal) == pytest.approx(path_cost(expected, cost, start, goal))
+                start = path[min(2, len(path) - 1)]  # Move along the route, as a bot does
+            # Block, unblock and reprice a few cells, never the bot's or the goal's
+            for _ in range(4):
+                cell = (rng.randrange(cost.shape[0]), rng.randrange(cost.shape[1]))
+                if cell in (start, goal):
+                    continue
+                cost[cell] = rng.choice((math.inf, rng.uniform(0.1, 1.0), rng.uniform(0.2, 1.0)))
+                search.update_cell(cell, cost[cell])
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("cache", (False, True), ids=("uncached", "cached"))
+def test_incremental_planner_matches_astar_as_dirt_is_cleaned(cache, seed):
+    rng = random.Random(seed)
+    counts = np.array([[rng.choice((0, 0, 1, 2, 5)) for _ in range(15)] for _ in range(10)], dtype=np.int16)
+    blocked = np.zeros(counts.shape, dtype=bool)
+    blocked[4, 2:12] = True
+    counts[blocked] = 0
+    belief = BeliefMap(counts)
+    planner = IncrementalPlanner(belief, PathCache() if cache else None, blocked)
+    # A far goal keeps the same D* Lite search in use while cells on its route change
+    start, goal = (9, 0), (0, 14)
+    while start != goal:
+        path = planner.plan(start, goal)
+        cost = np.where(blocked, math.inf, dirtCostGrid(belief.counts))
+        expected = aStarPlan(dirtCostGrid(belief.counts), start, goal, blocked=blocked)
+        assert path_cost(path, cost, start, goal) == pytest.approx(path_cost(expected, cost, start, goal))
+        # Walk part of the way, cleaning dirt on and off the rest of the route
+        start = path[min(2, len(path) - 1)]
+        belief.clean(start)
+        for cell in path[3:-1:3]:
+            belief.clear(cell)
+        dirty = list(zip(*np.nonzero(belief.counts)))
+        if dirty:
+            belief.clear(tuple(int(v) for v in rng.choice(dirty)))
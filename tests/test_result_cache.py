@@ -0,0 +1,72 @@
+# test_result_cache.py
+# Description:
+# Cached results must be the results a fresh run produces, keys must change with every
+# parameter that affects a run, and eviction must drop the least recently used results
+# (see result_cache.py).
+
+import os
+
+import numpy as np
+
+from batch_runner import run_batch
+from comms import CommsConfig
+from multi_robot_coordination_experiment import STRATEGY_BASELINE, STRATEGY_SHARED_MAP
+from result_cache import ResultCache, run_key
+from world import WorldConfig
+
+TIMING_KEYS = ("elapsed_time", "steps_per_sec")
+TASK = {"strategy": STRATEGY_SHARED_MAP, "run_id": 0, "num_bots": 3, "num_dirt": 40, "max_steps": 500,
+        "seed": 17, "world": None, "comms": None, "event_driven": False, "flow_fields": False}
+
+
+def untimed(results):
+    return [{key: value for key, value in result.items() if key not in TIMING_KEYS} for result in results]
+
+
+def test_cached_results_match_fresh_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The batch writes its results and visit grids to the working directory
+    cache = ResultCache(str(tmp_path / "cache"))
+    strategies = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP)
+    fresh = run_batch(strategies, num_runs=2, max_steps=300, workers=1, base_seed=3, cache=cache)
+    assert cache.hits == 0
+    served = run_batch(strategies, num_runs=2, max_steps=300, workers=1, base_seed=3, cache=cache)
+    assert cache.hits == len(fresh)
+    np.testing.assert_equal(untimed(served), untimed(fresh))
+
+
+def test_run_key_follows_run_parameters():
+    key = run_key(TASK, version="v1")
+    # Equal parameters give equal keys; run ids and event-driven stepping do not change results
+    assert run_key(dict(TASK), version="v1") == key
+    assert run_key(dict(TASK, run_id=5, event_driven=True), version="v1") == key
+    changes = [{"strategy": STRATEGY_BASELINE}, {"seed": 18}, {"num_bots": 4}, {"num_dirt": 41},
+               {"max_steps": 501}, {"world": WorldConfig.square(12)},
+               {"world": WorldConfig(obstacles=[(3, 3)])}, {"comms": CommsConfig()},
+               {"flow_fields": True}]
+    keys = {run_key(dict(TASK, **change), version="v1") for change in changes}
+    assert len(keys) == len(changes) and key not in keys
+    assert run_key(TASK, version="v2") != key
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=None)
+    payload = {"dirt_collected": 3, "visit_grids": [np.zeros((10, 10), dtype=np.int32)]}
+    keys = [f"{i:02x}" * 32 for i in range(5)]
+    for i, key in enumerate(keys):
+        cache.put(key, dict(payload, run_id=i))
+        os.utime(cache._path(key), (1000 + i, 1000 + i))  # Oldest first, whatever the clock resolution
+    assert cache.get(keys[0])["run_id"] == 0  # Now the most recently used
+    entry_bytes = os.path.getsize(cache._path(keys[0]))
+    assert cache.evict(3 * entry_bytes) == 2
+    assert [key in cache for key in keys] == [True, False, False, True, True]
+    assert cache.total_bytes == 3 * entry_bytes
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    key = run_key(TASK, version="v1")
+    cache.put(key, {"dirt_collected": 1})
+    with open(cache._path(key), "wb") as f:
+        f.write(b"not a pickle")
+    assert cache.get(key) is None
+    assert key not in cache  # Deleted, so the run is simulated again
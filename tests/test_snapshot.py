@@ -0,0 +1,60 @@
+# test_snapshot.py
+# Description:
+# A fork of a snapshot, taken in memory or saved and loaded, must continue exactly like
+# the simulation it was taken from (see snapshot.py).
+
+import numpy as np
+import pytest
+
+from multi_robot_coordination_experiment import (
+    Simulation, STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION
+)
+from snapshot import WorldSnapshot, paired_runs
+from world import WorldConfig
+
+STRATEGIES = (STRATEGY_BASELINE, STRATEGY_SHARED_MAP, STRATEGY_COORDINATION, STRATEGY_TASK_ALLOCATION)
+OUTCOME_KEYS = ("steps", "steps_to_completion", "stop_reason", "dirt_collected", "per_bot_dirt")
+WORLD = WorldConfig(20, 20, 50, [(5, col) for col in range(3, 15)])
+SNAPSHOT_STEP = 300
+
+
+def simulation(strategy, flow_fields, seed=2):
+    return Simulation(strategy, 0, 5, 60, 1200, seed, stop_conditions=(), world=WORLD,
+                      flow_fields=flow_fields)
+
+
+def assert_same_run(result, expected):
+    assert {key: result[key] for key in OUTCOME_KEYS} == {key: expected[key] for key in OUTCOME_KEYS}
+    for grid, expected_grid in zip(result["visit_grids"], expected["visit_grids"]):
+        np.testing.assert_array_equal(grid, expected_grid)
+
+
+@pytest.mark.parametrize("flow_fields", (False, True), ids=("dstar", "fields"))
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_fork_continues_like_uninterrupted_run(strategy, flow_fields, tmp_path):
+    expected = simulation(strategy, flow_fields).run()
+
+    sim = simulation(strategy, flow_fields)
+    for _ in range(SNAPSHOT_STEP):
+        sim.step()
+    snap = WorldSnapshot.take(sim)
+    loaded = WorldSnapshot.load(snap.save(tmp_path / "snapshot.pkl"))
+
+    assert_same_run(snap.fork(stop_conditions=()).run(), expected)
+    assert_same_run(loaded.fork(stop_conditions=()).run(), expected)
+    assert_same_run(loaded.fork(stop_conditions=(), event_driven=True).run(), expected)
+    # Forking leaves the original untouched
+    assert_same_run(sim.run(), expected)
+
+
+def test_paired_runs_share_the_starting_state():
+    results = paired_runs(STRATEGIES, seed=4, world=WORLD, warmup_steps=50, max_steps=300, stop_conditions=())
+    assert [result["strategy"] for result in results] == list(STRATEGIES)
+    # The first strategy set up and warmed up the state, so its fork is its ordinary run
+    assert_same_run(results[0], Simulation(STRATEGIES[0], 0, 3, 40, 300, 4, stop_conditions=(), world=WORLD).run())
+    warm = Simulation(STRATEGIES[0], 0, 3, 40, 300, 4, stop_conditions=(), world=WORLD)
+    for _ in range(50):
+        warm.step()
+    # Every strategy keeps the dirt collected during the shared warm-up
+    assert warm.counter.dirt_collected > 0
+    assert all(result["dirt_collected"] >= warm.counter.dirt_collected for result in results)
@@ -0,0 +1,48 @@
+# test_spatial_index.py
+# Description:
+# SpatialHash queries must find exactly the objects a brute-force distance scan finds.
+
+import math
+import random
+
+from spatial_index import SpatialHash
+
+
+def brute_force(positions, x, y, radius, exclude=None):
+    return {obj for obj, (ox, oy) in positions.items()
+            if obj is not exclude and math.hypot(x - ox, y - oy) < radius}
+
+
+def test_queries_match_brute_force():
+    rng = random.Random(11)
+    index, positions = SpatialHash(25), {}
+    for step in range(3000):
+        action = rng.random()
+        if action < 0.4 or not positions:
+            obj, xy = f"obj{step}", (rng.uniform(-100, 600), rng.uniform(-100, 600))
+            index.insert(obj, *xy)
+            positions[obj] = xy
+        elif action < 0.7:
+            obj = rng.choice(list(positions))
+            x, y = positions[obj]
+            positions[obj] = xy = (x + rng.uniform(-40, 40), y + rng.uniform(-40, 40))
+            index.move(obj, *xy)
+        elif action < 0.8:
+            obj = rng.choice(list(positions))
+            index.remove(obj)
+            del positions[obj]
+        else:
+            x, y = rng.uniform(-150, 650), rng.uniform(-150, 650)
+            radius = rng.choice((5, 25, 60, 140))
+            hits = index.query_radius(x, y, radius)
+            assert {obj for _, obj in hits} == brute_force(positions, x, y, radius)
+            assert len(hits) == len({obj for _, obj in hits})
+            assert all(math.isclose(distance, math.hypot(x - positions[obj][0], y - positions[obj][1]))
+                       for distance, obj in hits)
+
+            exclude = rng.choice(list(positions))
+            expected = brute_force(positions, x, y, radius, exclude)
+            obj, distance = index.first_within(x, y, radius, exclude)
+            assert (obj in expected) if expected else (obj, distance) == (None, None)
+        assert len(index) == len(positions)
+        assert all(obj in index for obj in positions)
@@ -0,0 +1,49 @@
+# test_swarm.py
+# Description:
+# The vectorized Swarm.step must follow the same ICC kinematics as the per-bot Bot.move.
+
+import math
+import random
+
+import numpy as np
+
+from multi_robot_coordination_experiment import Bot
+from swarm import Swarm
+
+DT = 0.1
+
+
+def random_wheels(rng):
+    kind = rng.choice(("straight", "spin", "arc", "stop"))
+    speed = rng.uniform(-8, 8)
+    if kind == "straight":
+        return speed, speed
+    if kind == "spin":
+        return speed, -speed
+    if kind == "arc":
+        return speed, rng.uniform(-8, 8)
+    return 0.0, 0.0
+
+
+def test_swarm_step_matches_bot_move():
+    rng = random.Random(3)
+    poses = [(rng.uniform(0, 500), rng.uniform(0, 500), rng.uniform(0, 2 * math.pi)) for _ in range(12)]
+    swarm = Swarm(4)  # Grows while bots are added
+    for pose in poses:
+        swarm.add(*pose)
+    reference = [Bot(f"bot{i}", [], None, pose=pose) for i, pose in enumerate(poses)]
+
+    for _ in range(200):
+        for slot, bot in enumerate(reference):
+            bot.sl, bot.sr = swarm.sl[slot], swarm.sr[slot] = random_wheels(rng)
+        swarm.step(DT)
+        for bot in reference:
+            bot.move(None, DT)
+
+    n = swarm.count
+    np.testing.assert_allclose(swarm.x[:n], [bot.x for bot in reference], rtol=0, atol=1e-6)
+    np.testing.assert_allclose(swarm.y[:n], [bot.y for bot in reference], rtol=0, atol=1e-6)
+    # Headings are compared on the circle, as either side may wrap just below 2*pi to 0
+    turn = swarm.theta[:n] - np.array([bot.theta for bot in reference])
+    np.testing.assert_allclose(np.sin(turn), 0, atol=1e-9)
+    assert (np.cos(turn) > 0).all()
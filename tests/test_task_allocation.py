@@ -0,0 +1,57 @@
+# test_task_allocation.py
+# Description:
+# The exact assignment methods must match a brute-force search over every assignment
+# (see task_allocation.py).
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from task_allocation import (
+    ALLOCATION_AUCTION, ALLOCATION_GREEDY, ALLOCATION_HUNGARIAN, assign, distance_matrix
+)
+
+
+def brute_force_cost(dist):
+    """Cheapest total distance over every way of giving min(bots, tasks) bots one task each."""
+    n_bots, n_tasks = dist.shape
+    if n_bots <= n_tasks:
+        return min(sum(dist[bot, task] for bot, task in enumerate(tasks))
+                   for tasks in itertools.permutations(range(n_tasks), n_bots))
+    return brute_force_cost(dist.T)
+
+
+def checked_cost(dist, assignment):
+    """Total distance of an assignment; fails unless it pairs min(bots, tasks) bots with distinct tasks."""
+    assert len(assignment) == min(dist.shape)
+    assert len(set(assignment.values())) == len(assignment)
+    assert all(0 <= bot < dist.shape[0] and 0 <= task < dist.shape[1] for bot, task in assignment.items())
+    return sum(dist[bot, task] for bot, task in assignment.items())
+
+
+def instances(seed, count=60):
+    rng = random.Random(seed)
+    for _ in range(count):
+        n_bots, n_tasks = rng.randint(1, 6), rng.randint(1, 6)
+        cells = [(rng.randrange(10), rng.randrange(10)) for _ in range(n_bots + n_tasks)]
+        yield distance_matrix(cells[:n_bots], cells[n_bots:])
+
+
+@pytest.mark.parametrize("method", (ALLOCATION_HUNGARIAN, ALLOCATION_AUCTION))
+def test_exact_methods_match_brute_force(method):
+    for dist in instances(seed=1):
+        assert checked_cost(dist, assign(dist, method)) == brute_force_cost(dist)
+
+
+def test_hungarian_is_exact_for_real_costs():
+    rng = np.random.default_rng(2)
+    for _ in range(40):
+        dist = rng.uniform(0, 10, size=tuple(rng.integers(1, 7, size=2)))
+        assert checked_cost(dist, assign(dist, ALLOCATION_HUNGARIAN)) == pytest.approx(brute_force_cost(dist))
+
+
+def test_greedy_is_a_valid_assignment():
+    for dist in instances(seed=3):
+        assert checked_cost(dist, assign(dist, ALLOCATION_GREEDY)) >= brute_force_cost(dist)
@@ -0,0 +1,234 @@
+# trajectory.py
+# Description:
+# Records every bot's pose and pickups during a run, and replays recorded runs.
+
+# While a run is simulated, TrajectoryRecorder copies the swarm's pose arrays into
+# preallocated per-field buffers (a few array copies per step, no Python loop over bots).
+# At the end of the run they are written as one .npy file of fixed-dtype rows,
+# (step, bot, event, dirt, x, y, theta), with a '.json' sidecar describing the run and
+# its world. Trajectory opens that file memory-mapped, so heatmaps and GUI replays are
+# produced straight from disk without re-simulating and without loading whole runs.
+
+# Usage:
+#   python trajectory.py trajectories/baseline_run0_seed1.npy            # replay in a Tk window
+#   python trajectory.py trajectories/baseline_run0_seed1.npy --heatmap  # per-bot heatmaps only
+
+import argparse
+import json
+import numpy as np
+from renderer import BOT_COLOURS
+from world import WorldConfig
+
+TRAJECTORY_DTYPE = np.dtype([
+    ("step", "<i4"),
+    ("bot", "<i2"),     # Bot slot, -1 for rows that describe dirt only
+    ("event", "<i1"),   # One of the EVENT_* codes below
+    ("dirt", "<i4"),    # Dirt index for EVENT_DIRT and EVENT_PICKUP rows, else -1
+    ("x", "<f8"),       # Positions keep full precision so replayed heatmaps match the run exactly
+    ("y", "<f8"),
+    ("theta", "<f4"),
+])
+
+EVENT_POSE = 0    # Bot pose after the step (step 0: starting pose)
+EVENT_DIRT = 1    # Dirt patch placed at the start of the run
+EVENT_PICKUP = 2  # Bot collected the dirt patch during the step; x, y are the dirt's position
+
+
+class TrajectoryRecorder:
+    def __init__(self, num_bots, max_steps=1000):
+        """
+        Parameters:
+            num_bots (int): Bots in the run; they must occupy swarm slots 0..num_bots-1.
+            max_steps (int): Expected number of steps; buffers grow if the run is longer.
+        """
+        self.num_bots = num_bots
+        self.x = np.empty((max_steps + 1, num_bots))
+        self.y = np.empty((max_steps + 1, num_bots))
+        self.theta = np.empty((max_steps + 1, num_bots), dtype=np.float32)
+        self.steps = -1       # Last step whose poses were recorded
+        self.dirt_ids = {}    # Dirt object -> index in placement order
+        self.dirt_rows = []   # (x, y) per placed dirt patch
+        self.pickups = []     # (step, bot slot, dirt index, x, y)
+
+    def _grow(self):
+        for field in ("x", "y", "theta"):
+            old = getattr(self, field)
+            new = np.empty((2 * len(old), self.num_bots), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, field, new)
+
+    def record_dirt(self, dirt):
+        self.dirt_ids[dirt] = len(self.dirt_rows)
+        self.dirt_rows.append((dirt.centreX, dirt.centreY))
+
+    def record_poses(self, step, swarm):
+        while step >= len(self.x):
+            self._grow()
+        n = self.num_bots
+        self.x[step] = swarm.x[:n]
+        self.y[step] = swarm.y[:n]
+        self.theta[step] = swarm.theta[:n]
+        self.steps = step
+
+    def record_pose_rows(self, first_step, x, y, theta):
+        """Records poses for consecutive steps from first_step; x, y, theta are (steps, num_bots) arrays."""
+        last = first_step + len(x) - 1
+        while last >= len(self.x):
+            self._grow()
+        self.x[first_step:last + 1] = x
+        self.y[first_step:last + 1] = y
+        self.theta[first_step:last + 1] = theta
+        self.steps = last
+
+    def record_pickup(self, step, slot, dirt):
+        self.pickups.append((step, slot, self.dirt_ids.get(dirt, -1), dirt.centreX, dirt.centreY))
+
+    def rows(self):
+        """All recorded rows as one TRAJECTORY_DTYPE array, ordered by step."""
+        steps, n = self.steps + 1, self.num_bots
+        dirt = np.zeros(len(self.dirt_rows), dtype=TRAJECTORY_DTYPE)
+        dirt["bot"] = -1
+        dirt["event"] = EVENT_DIRT
+        dirt["dirt"] = np.arange(len(self.dirt_rows))
+        if self.dirt_rows:
+            dirt["x"], dirt["y"] = np.array(self.dirt_rows, dtype=np.float64).T
+
+        poses = np.zeros(steps * n, dtype=TRAJECTORY_DTYPE)
+        poses["step"] = np.repeat(np.arange(steps), n)
+        poses["bot"] = np.tile(np.arange(n), steps)
+        poses["event"] = EVENT_POSE
+        poses["dirt"] = -1
+        poses["x"] = self.x[:steps].ravel()
+        poses["y"] = self.y[:steps].ravel()
+        poses["theta"] = self.theta[:steps].ravel()
+
+        pickups = np.zeros(len(self.pickups), dtype=TRAJECTORY_DTYPE)
+        pickups["event"] = EVENT_PICKUP
+        if self.pickups:
+            step, slot, dirt_index, x, y = zip(*self.pickups)
+            pickups["step"], pickups["bot"], pickups["dirt"] = step, slot, dirt_index
+            pickups["x"], pickups["y"] = x, y
+
+        # Stable sort keeps each step's poses ahead of its pickups
+        moves = np.concatenate([poses, pickups])
+        moves = moves[np.argsort(moves["step"], kind="stable")]
+        return np.concatenate([dirt, moves])
+
+    def save(self, path, metadata=None):
+        """Writes the rows to path (.npy) and metadata plus the row count to path + '.json'."""
+        rows = self.rows()
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=TRAJECTORY_DTYPE, shape=rows.shape)
+        out[:] = rows
+        out.flush()
+        del out
+        metadata = dict(metadata or {}, num_bots=self.num_bots, steps=self.steps, rows=len(rows))
+        with open(path + ".json", "w") as f:
+            json.dump(metadata, f, indent=2)
+        return path
+
+
+def world_metadata(world):
+    return {"rows": world.rows, "cols": world.cols, "cell_size": world.cell_size,
+            "obstacles": np.argwhere(world.blocked).tolist()}
+
+
+class Trajectory:
+    """A recorded run, memory-mapped from the file written by TrajectoryRecorder.save()."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = np.load(path, mmap_mode="r")
+        with open(path + ".json") as f:
+            self.metadata = json.load(f)
+        self.num_bots = self.metadata["num_bots"]
+        self.steps = self.metadata["steps"]
+        world = self.metadata.get("world")
+        self.world = WorldConfig(world["rows"], world["cols"], world["cell_size"], world["obstacles"]) \
+            if world is not None else WorldConfig()
+        self._step_column = self.rows["step"]
+
+    def dirt(self):
+        """Rows of the dirt patches placed at the start of the run."""
+        return self.rows[self.rows["event"] == EVENT_DIRT]
+
+    def step_rows(self, step):
+        """Rows recorded for one step (poses after it, then pickups during it)."""
+        lo, hi = np.searchsorted(self._step_column, [step, step + 1])
+        rows = self.rows[lo:hi]
+        return rows[rows["event"] != EVENT_DIRT]
+
+    def poses(self, bot=None):
+        """Pose rows, for one bot or all of them, in step order."""
+        rows = self.rows[self.rows["event"] == EVENT_POSE]
+        return rows if bot is None else rows[rows["bot"] == bot]
+
+    def visit_grids(self):
+        """Per-bot cell visit counts, as Bot.record_visit would have counted them."""
+        world, grids = self.world, []
+        poses = self.poses()
+        poses = poses[poses["step"] > 0]  # Visits are counted after each step, not at the start
+        for bot in range(self.num_bots):
+            mine = poses[poses["bot"] == bot]
+            gx = np.floor_divide(mine["x"], world.cell_size).astype(np.int64)
+            gy = np.floor_divide(mine["y"], world.cell_size).astype(np.int64)
+            inside = (gx >= 0) & (gx < world.cols) & (gy >= 0) & (gy < world.rows)
+            counts = np.bincount(gy[inside] * world.cols + gx[inside], minlength=world.rows * world.cols)
+            grids.append(counts.reshape(world.shape).astype(np.int32))
+        return grids
+
+
+def replay_gui(trajectory, root=None, interval_ms=30, colours=BOT_COLOURS):
+    """Plays a Trajectory back on a Tk canvas, one recorded step every interval_ms."""
+    import tkinter as tk
+    own_root = root is None
+    root = root if root is not None else tk.Tk()
+    world = trajectory.world
+    canvas = tk.Canvas(root, width=world.width, height=world.height, bg="white")
+    canvas.pack()
+    size = world.cell_size
+    for row, col in np.argwhere(world.blocked):
+        canvas.create_rectangle(col * size, row * size, (col + 1) * size, (row + 1) * size,
+                                fill="dim gray", outline="")
+    dirt_items = {}
+    for dirt in trajectory.dirt():
+        x, y = float(dirt["x"]), float(dirt["y"])
+        dirt_items[int(dirt["dirt"])] = canvas.create_oval(x - 5, y - 5, x + 5, y + 5, fill="gray")
+    bot_items = [canvas.create_oval(0, 0, 0, 0, fill=colours[i] if i < len(colours) else "black")
+                 for i in range(trajectory.num_bots)]
+    status = canvas.create_text(world.width / 2, 20, font=("Arial", 16))
+    collected = 0
+
+    def tick(step):
+        nonlocal collected
+        for row in trajectory.step_rows(step):
+            if row["event"] == EVENT_POSE:
+                x, y = float(row["x"]), float(row["y"])
+                canvas.coords(bot_items[row["bot"]], x - 10, y - 10, x + 10, y + 10)
+            elif row["event"] == EVENT_PICKUP:
+                collected += 1
+                item = dirt_items.pop(int(row["dirt"]), None)
+                if item is not None:
+                    canvas.delete(item)
+        canvas.itemconfigure(status, text=f"Step {step} | Dirt Collected: {collected}")
+        if step < trajectory.steps:
+            root.after(interval_ms, tick, step + 1)
+        elif own_root:
+            root.after(1000, root.destroy)
+
+    tick(0)
+    if own_root:
+        root.mainloop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded trajectory.")
+    parser.add_argument("path", help="trajectory .npy file written by a recorded run")
+    parser.add_argument("--heatmap", action="store_true", help="save per-bot heatmaps instead of replaying")
+    parser.add_argument("--interval-ms", type=int, default=30, help="delay between replayed steps")
+    args = parser.parse_args()
+    recorded = Trajectory(args.path)
+    if args.heatmap:
+        from visual_tools import plot_trajectory_heatmaps
+        plot_trajectory_heatmaps(recorded)
+    else:
+        replay_gui(recorded, interval_ms=args.interval_ms)
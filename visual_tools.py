@@ -13,34 +13,81 @@
 
 # Usage:
 # Import functions (e.g., plot_avg_dirt) or call save_all_charts().
-# Requires 'results.csv' and 'visit_grid_bot{n}.npy' as input.
+# Charts and the summary are drawn from the streaming statistics in 'results_stats.npz'
+# (written by batch_runner.py), or from 'results.csv' read one row at a time when the
+# statistics file is missing. Raw rows are never loaded as a whole.
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+# Importing this module is cheap: pandas, matplotlib and seaborn are only imported,
+# and the results only read, when a plotting function is first called.
+
+import glob
 import os
 import numpy as np
+from results_sink import load_results
+from results_stats import ResultsAggregator
+from sim_log import get_logger
 
 RESULTS_CSV = "results.csv"
+RESULTS_STATS = "results_stats.npz"
 HEATMAP_DIR = "heatmap"
-os.makedirs(HEATMAP_DIR, exist_ok=True)
+OBSTACLE_MASK_FILE = "world_obstacles.npy"  # Written by save_visit_grids() for worlds with obstacles
+
+logger = get_logger("plots")
+_results = None
+_stats = None
+
+
+def get_results(path=RESULTS_CSV, reload=False):
+    """
+    Loads the raw experiment results into a DataFrame on first use and caches them.
+    Columns come from the CSV header (see results_sink.RESULT_COLUMNS); old header-less files still load.
+    The charts below do not need this; it is kept for ad-hoc analysis.
+    """
+    global _results
+    if _results is None or reload:
+        _results = load_results(path)
+        logger.debug("First few rows of results:\n%s", _results.head())
+    return _results
+
+
+def get_stats(stats_path=RESULTS_STATS, csv_path=RESULTS_CSV, reload=False):
+    """
+    Loads the per-strategy ResultsAggregator on first use and caches it.
+    Falls back to streaming csv_path when stats_path does not exist (no summed heatmaps then).
+    """
+    global _stats
+    if _stats is None or reload:
+        if os.path.exists(stats_path):
+            _stats = ResultsAggregator.load(stats_path)
+        else:
+            logger.info("%s not found; summarising %s row by row", stats_path, csv_path)
+            _stats = ResultsAggregator.from_csv(csv_path)
+    return _stats
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
 
-col_names = ["strategy", "run", "dirt", "time"]
-df = pd.read_csv(RESULTS_CSV, names=col_names) # Read experiment results with custom column names
 
-print("[DEBUG] First few rows of results:")
-print(df.head())
+def _mean_std(stats, column):
+    names = list(stats.strategies)
+    means = [stats.strategies[name].stats[column].mean for name in names]
+    # A single run has no spread; draw no error bar rather than nan
+    stds = [stats.strategies[name].stats[column].std if stats.strategies[name].stats[column].count > 1 else 0.0
+            for name in names]
+    return names, means, stds
 
 
-def plot_avg_dirt():
+def plot_avg_dirt(stats=None):
     """
     Plots the average dirt collected for each strategy, including standard deviation error bars.
     Saves the figure as 'avg_dirt.png'.
     """
-    avg = df.groupby("strategy")["dirt"].mean()
-    std = df.groupby("strategy")["dirt"].std()
+    stats, plt = stats or get_stats(), _pyplot()
+    names, avg, std = _mean_std(stats, "dirt_collected")
     plt.figure(figsize=(8, 6))
-    plt.bar(avg.index, avg, yerr=std, capsize=5, color="skyblue")
+    plt.bar(names, avg, yerr=std, capsize=5, color="skyblue")
     plt.title("Average Dirt Collected per Strategy")
     plt.ylabel("Dirt Collected")
     plt.xlabel("Strategy")
@@ -48,15 +95,15 @@ def plot_avg_dirt():
     plt.savefig("avg_dirt.png")
     plt.close()
 
-def plot_avg_time():
+def plot_avg_time(stats=None):
     """
     Plots the average runtime for each strategy, with standard deviation shown as error bars.
     Saves the figure as 'avg_time.png'.
     """
-    avg = df.groupby("strategy")["time"].mean()
-    std = df.groupby("strategy")["time"].std()
+    stats, plt = stats or get_stats(), _pyplot()
+    names, avg, std = _mean_std(stats, "elapsed_time")
     plt.figure(figsize=(8, 6))
-    plt.bar(avg.index, avg, yerr=std, capsize=5, color="salmon")
+    plt.bar(names, avg, yerr=std, capsize=5, color="salmon")
     plt.title("Average Time per Strategy")
     plt.ylabel("Time (s)")
     plt.xlabel("Strategy")
@@ -64,71 +111,134 @@ def plot_avg_time():
     plt.savefig("avg_time.png")
     plt.close()
 
-def plot_boxplot_dirt():
+def plot_boxplot_dirt(stats=None):
     """
     Creates a boxplot to show the distribution of dirt collected across all runs.
+    Box edges and median come from the quantile sketches; whiskers reach the most extreme
+    value within 1.5 IQR, approximated by clipping to the observed min and max.
     Saves the figure as 'boxplot_dirt.png'.
     """
-    plt.figure(figsize=(8, 6))
-    sns.boxplot(data=df, x="strategy", y="dirt", hue="strategy", palette="pastel")
-    plt.title("Dirt Collection Distribution")
-    plt.xlabel("Strategy")
-    plt.ylabel("Dirt Collected")
+    stats, plt = stats or get_stats(), _pyplot()
+    boxes = []
+    for name, strategy in stats.strategies.items():
+        sketch, running = strategy.sketches["dirt_collected"], strategy.stats["dirt_collected"]
+        if running.count == 0:
+            continue
+        q1, med, q3 = sketch.quantile(0.25), sketch.quantile(0.5), sketch.quantile(0.75)
+        iqr = q3 - q1
+        boxes.append({"label": name, "q1": q1, "med": med, "q3": q3, "fliers": [],
+                      "whislo": max(running.min, q1 - 1.5 * iqr), "whishi": min(running.max, q3 + 1.5 * iqr)})
+    fig, ax = plt.subplots(figsize=(8, 6))
+    ax.bxp(boxes, showfliers=False, patch_artist=True)
+    ax.set_title("Dirt Collection Distribution")
+    ax.set_xlabel("Strategy")
+    ax.set_ylabel("Dirt Collected")
+    fig.tight_layout()
+    fig.savefig("boxplot_dirt.png")
+    plt.close(fig)
+
+def _save_heatmap(grid, mask, title, filename):
+    import seaborn as sns
+    plt = _pyplot()
+    if mask is not None and mask.shape != grid.shape:
+        mask = None
+    os.makedirs(HEATMAP_DIR, exist_ok=True)
+    plt.figure(figsize=(6, 5))
+    # Blocked cells are left blank rather than shown as never visited
+    sns.heatmap(grid, mask=mask, annot=False, cmap="OrRd", cbar=True)
+    plt.title(title)
     plt.tight_layout()
-    plt.savefig("boxplot_dirt.png")
+    plt.savefig(os.path.join(HEATMAP_DIR, filename))
     plt.close()
 
+def plot_strategy_heatmaps(stats=None):
+    """
+    Plots, for each strategy, the visit counts summed over all bots in all recorded runs.
+    Saves 'heatmap/heatmap_{strategy}.png'; returns the number of heatmaps drawn.
+    """
+    stats = stats or get_stats()
+    drawn = 0
+    for name, strategy in stats.strategies.items():
+        if strategy.heatmap is None:
+            continue
+        _save_heatmap(strategy.heatmap, strategy.obstacle_mask,
+                      f"Heatmap - {name} ({strategy.heatmap_runs} runs)", f"heatmap_{name}.png")
+        drawn += 1
+    return drawn
+
 def plot_heatmap_from_grid(bot_index):
     """
     Generates a heatmap from the visited grid of a specific robot.
 
     Parameters:
-        visited_grid (np.ndarray): 2D array (10x10) recording cell visit counts.
+        visited_grid (np.ndarray): 2D array (rows x cols of the world) recording cell visit counts.
         bot_index (int): Index of the robot, used in the plot title and filename.
 
     he heatmap is saved as 'heatmaps/heatmap_bot{n}.png'.
     """
     filename = f"visit_grid_bot{bot_index}.npy"
-    print(f"[DEBUG] Looking for {filename}...")
+    logger.debug("Looking for %s...", filename)
 
     if not os.path.exists(filename):
-        print(f"[WARNING] Heatmap file {filename} not found.")
+        logger.warning("Heatmap file %s not found.", filename)
         return
     visited_grid = np.load(filename)
-    plt.figure(figsize=(6, 5))
-    sns.heatmap(visited_grid, annot=False, cmap="OrRd", cbar=True)
-    plt.title(f"Heatmap - Bot {bot_index}")
-    plt.tight_layout()
-    filename = os.path.join(HEATMAP_DIR, f"heatmap_bot{bot_index}.png")
-    plt.savefig(filename)
-    plt.close()
+    mask = np.load(OBSTACLE_MASK_FILE) if os.path.exists(OBSTACLE_MASK_FILE) else None
+    _save_heatmap(visited_grid, mask, f"Heatmap - Bot {bot_index}", f"heatmap_bot{bot_index}.png")
 
-def export_summary():
+def plot_trajectory_heatmaps(trajectory):
+    """
+    Plots each bot's heatmap from a recorded run (a trajectory.Trajectory or its file path),
+    reading the memory-mapped trajectory instead of the last run's visit_grid_bot{n}.npy.
+    Saves 'heatmap/heatmap_<run>_bot{n}.png'.
+    """
+    from trajectory import Trajectory
+    if isinstance(trajectory, str):
+        trajectory = Trajectory(trajectory)
+    run = os.path.splitext(os.path.basename(trajectory.path))[0]
+    mask = trajectory.world.blocked if trajectory.world.has_obstacles() else None
+    for i, grid in enumerate(trajectory.visit_grids()):
+        _save_heatmap(grid, mask, f"Heatmap - {run} - Bot {i}", f"heatmap_{run}_bot{i}.png")
+
+def export_summary(stats=None):
     """
-    Calculates the average and standard deviation of dirt collected and runtime by strategy.
+    Reports the average, standard deviation, median and 90th percentile of dirt collected
+    and runtime by strategy, together with the number of runs.
     Outputs the results to 'results_summary.xlsx'.
     """
-    avg = df.groupby("strategy")[["dirt", "time"]].mean()
-    std = df.groupby("strategy")[["dirt", "time"]].std()
-    summary = avg.copy()
-    summary["dirt_std"] = std["dirt"]
-    summary["time_std"] = std["time"]
+    import pandas as pd
+    stats = stats or get_stats()
+    table = stats.summary(("dirt_collected", "elapsed_time"), quantiles=(0.5, 0.9))
+    summary = pd.DataFrame.from_dict(table, orient="index")
+    summary.index.name = "strategy"
+    summary = summary.rename(columns={
+        "dirt_collected_mean": "dirt_collected", "elapsed_time_mean": "elapsed_time",
+        "dirt_collected_std": "dirt_std", "elapsed_time_std": "time_std",
+        "dirt_collected_p50": "dirt_p50", "dirt_collected_p90": "dirt_p90",
+        "elapsed_time_p50": "time_p50", "elapsed_time_p90": "time_p90",
+    })
+    summary = summary[["dirt_collected", "elapsed_time", "dirt_std", "time_std",
+                       "dirt_p50", "dirt_p90", "time_p50", "time_p90", "runs"]]
     summary.to_excel("results_summary.xlsx")
-    print("[INFO] Saved summary to results_summary.xlsx")
+    logger.info("Saved summary to results_summary.xlsx")
 
-def save_all_charts():
+def save_all_charts(stats=None):
     """
     Runs all plotting and export functions:
     - Bar charts for average dirt and time
     - Boxplot for dirt distribution
-    - Heatmaps (if implemented)
+    - Heatmaps summed per strategy (or of the last run's bots when no sums were recorded)
     - Summary table export
     """
-    print("[INFO] Generating all charts...")
-    plot_avg_dirt()
-    plot_avg_time()
-    plot_boxplot_dirt()
-    for i in range(3):
-        plot_heatmap_from_grid(i)
-    export_summary()
-    print("[INFO] Charts saved as PNGs.")
+    logger.info("Generating all charts...")
+    stats = stats or get_stats()
+    plot_avg_dirt(stats)
+    plot_avg_time(stats)
+    plot_boxplot_dirt(stats)
+    if plot_strategy_heatmaps(stats) == 0:
+        indices = [os.path.basename(name)[len("visit_grid_bot"):-len(".npy")]
+                   for name in glob.glob("visit_grid_bot*.npy")]
+        for i in sorted(int(index) for index in indices if index.isdigit()):
+            plot_heatmap_from_grid(i)
+    export_summary(stats)
+    logger.info("Charts saved as PNGs.")
@@ -0,0 +1,106 @@
+# world.py
+# Description:
+# World geometry shared by the simulator, planners, sensing, heatmaps and rendering.
+
+# A WorldConfig describes the grid of rows x cols square cells (cell_size pixels each)
+# that the dirt map, visit heatmaps and planners work on, which cells are blocked by
+# obstacles, and where robots and dirt may be placed. The defaults reproduce the
+# original 10x10 world of 100px cells on a 1000x1000 canvas.
+
+import numpy as np
+
+# Random placements give up after this many draws that land on obstacles
+MAX_PLACEMENT_ATTEMPTS = 10000
+
+
+class WorldConfig:
+    def __init__(self, rows=10, cols=10, cell_size=100, obstacles=None, spawn_range=(0.1, 0.7)):
+        """
+        Parameters:
+            rows (int): Number of cell rows (y direction).
+            cols (int): Number of cell columns (x direction).
+            cell_size (int): Width and height of a cell in canvas pixels.
+            obstacles: Blocked cells, as an iterable of (row, col) or a (rows, cols) boolean mask.
+            spawn_range (tuple): Robots start between these fractions of the width and height.
+        """
+        if rows <= 0 or cols <= 0:
+            raise ValueError(f"world must have at least one cell, got {rows}x{cols}")
+        if cell_size <= 0:
+            raise ValueError(f"cell_size must be positive, got {cell_size}")
+        self.rows = rows
+        self.cols = cols
+        self.cell_size = cell_size
+        self.spawn_range = spawn_range
+        self.blocked = np.zeros((rows, cols), dtype=bool)
+        if obstacles is not None:
+            obstacles = np.asarray(obstacles)
+            if obstacles.dtype == bool:
+                if obstacles.shape != self.blocked.shape:
+                    raise ValueError(f"obstacle mask has shape {obstacles.shape}, expected {self.blocked.shape}")
+                self.blocked[...] = obstacles
+            elif obstacles.size:
+                self.blocked[obstacles[:, 0], obstacles[:, 1]] = True
+        if self.blocked.all():
+            raise ValueError("every cell is blocked")
+
+    @classmethod
+    def square(cls, size, cell_size=100, **kwargs):
+        """A size x size world."""
+        return cls(size, size, cell_size, **kwargs)
+
+    def __repr__(self):
+        return (f"WorldConfig({self.rows}x{self.cols} cells of {self.cell_size}px, "
+                f"{int(self.blocked.sum())} blocked)")
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    @property
+    def width(self):
+        return self.cols * self.cell_size
+
+    @property
+    def height(self):
+        return self.rows * self.cell_size
+
+    def has_obstacles(self):
+        return bool(self.blocked.any())
+
+    def cell_of(self, x, y):
+        """(row, col) cell containing a canvas position, clamped to the world."""
+        return (min(max(int(y // self.cell_size), 0), self.rows - 1),
+                min(max(int(x // self.cell_size), 0), self.cols - 1))
+
+    def cell_centre(self, cell):
+        """Canvas (x, y) of the centre of a (row, col) cell."""
+        return cell[1] * self.cell_size + self.cell_size / 2, cell[0] * self.cell_size + self.cell_size / 2
+
+    def is_free(self, x, y):
+        return not self.blocked[self.cell_of(x, y)]
+
+    def zeros(self, dtype=np.int32):
+        """A fresh per-cell array, e.g. a dirt map or a visit grid."""
+        return np.zeros(self.shape, dtype=dtype)
+
+    def _sample(self, rng, low_x, high_x, low_y, high_y):
+        # Rejection sampling; without obstacles this draws exactly one (x, y) pair
+        for _ in range(MAX_PLACEMENT_ATTEMPTS):
+            x, y = rng.randint(low_x, high_x), rng.randint(low_y, high_y)
+            if self.is_free(x, y):
+                return x, y
+        raise ValueError(f"no free cell found in x {low_x}-{high_x}, y {low_y}-{high_y}")
+
+    def random_spawn(self, rng):
+        """Random free robot start position inside the spawn range."""
+        low, high = self.spawn_range
+        return self._sample(rng, int(low * self.width), int(high * self.width),
+                            int(low * self.height), int(high * self.height))
+
+    def random_dirt_position(self, rng):
+        """Random free position for a dirt patch, at least half a cell from the edge."""
+        margin = self.cell_size // 2
+        return self._sample(rng, margin, self.width - margin, margin, self.height - margin)
+
+
+DEFAULT_WORLD = WorldConfig()